@@ -0,0 +1,128 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from models import User, Admin, Quiz, Result
+from repositories import UserRepository, AdminRepository, QuizRepository, ResultRepository
+
+
+class AsyncFileIO:
+    # runs blocking repository calls on a bounded thread pool, so an event loop never waits on a disk.
+    # Identical loads in flight at the same time share one read, and writes to the same file are
+    # queued one at a time (file_lock still keeps other processes out)
+    def __init__(self, max_workers: int = 4, executor=None):
+        self.executor = executor or ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='async-io')
+        self._reads = {}
+        self._write_locks = {}
+        self.reads = 0
+
+    async def run(self, function, *args):
+        return await asyncio.get_running_loop().run_in_executor(self.executor, function, *args)
+
+    async def read(self, filepath: str, key, function, *args):
+        future = self._reads.get((filepath, key))
+        if future is None:
+            self.reads += 1
+            future = asyncio.ensure_future(self.run(function, *args))
+            self._reads[(filepath, key)] = future
+            future.add_done_callback(lambda done: self._forget(filepath, key, done))
+        # shielded so one cancelled caller does not cancel the read for everyone sharing it
+        value = await asyncio.shield(future)
+        # every caller gets its own list, since services append to what they load
+        return list(value) if isinstance(value, list) else value
+
+    def _forget(self, filepath: str, key, future):
+        if self._reads.get((filepath, key)) is future:
+            del self._reads[(filepath, key)]
+
+    async def write(self, filepath: str, function, *args):
+        lock = self._write_locks.get(filepath)
+        if lock is None:
+            lock = self._write_locks[filepath] = asyncio.Lock()
+        async with lock:
+            try:
+                return await self.run(function, *args)
+            finally:
+                # a load that started before this write may have missed it, so later loads read afresh
+                for read_key in [read_key for read_key in self._reads if read_key[0] == filepath]:
+                    del self._reads[read_key]
+
+    def shutdown(self):
+        self.executor.shutdown()
+
+
+class AsyncUserRepository:
+    def __init__(self, repository: UserRepository, io: AsyncFileIO = None):
+        self.repository = repository
+        self.io = io or AsyncFileIO()
+
+    @property
+    def filepath(self) -> str:
+        return self.repository.filepath
+
+    async def load(self) -> list:
+        return await self.io.read(self.filepath, 'load', self.repository.load)
+
+    async def save(self, user: User):
+        await self.io.write(self.filepath, self.repository.save, user)
+
+    async def update(self, user: User):
+        await self.io.write(self.filepath, self.repository.update, user)
+
+    async def save_all(self, users: list):
+        await self.io.write(self.filepath, self.repository.save_all, list(users))
+
+
+class AsyncAdminRepository:
+    def __init__(self, repository: AdminRepository, io: AsyncFileIO = None):
+        self.repository = repository
+        self.io = io or AsyncFileIO()
+
+    @property
+    def filepath(self) -> str:
+        return self.repository.filepath
+
+    async def load(self) -> list:
+        return await self.io.read(self.filepath, 'load', self.repository.load)
+
+    async def save(self, admin: Admin):
+        await self.io.write(self.filepath, self.repository.save, admin)
+
+
+class AsyncQuizRepository:
+    def __init__(self, repository: QuizRepository, io: AsyncFileIO = None):
+        self.repository = repository
+        self.io = io or AsyncFileIO()
+
+    async def load(self, filepath: str) -> Quiz:
+        return await self.io.read(filepath, 'load', self.repository.load, filepath)
+
+    async def load_questions(self, filepath: str, offsets: list) -> list:
+        return await self.io.read(filepath, ('questions', tuple(offsets)), self.repository.load_questions,
+                                  filepath, list(offsets))
+
+    async def load_header(self, filepath: str):
+        return await self.io.read(filepath, 'header', self.repository.load_header, filepath)
+
+    async def get_all_quiz_files(self) -> list:
+        return await self.io.run(self.repository.get_all_quiz_files)
+
+    async def save(self, quiz: Quiz, filepath: str):
+        await self.io.write(filepath, self.repository.save, quiz, filepath)
+
+
+class AsyncResultRepository:
+    # wraps any result repository (JSON, JSON Lines, segmented or SQLite)
+    def __init__(self, repository=None, io: AsyncFileIO = None):
+        self.repository = repository or ResultRepository()
+        self.io = io or AsyncFileIO()
+
+    def _load(self, filepath: str) -> list:
+        return list(self.repository.iter_results(filepath))
+
+    async def load(self, filepath: str) -> list:
+        return await self.io.read(filepath, 'load', self._load, filepath)
+
+    async def save(self, result: Result, filepath: str):
+        await self.io.write(filepath, self.repository.save, result, filepath)
+
+    async def save_many(self, results: list, filepath: str, fsync: bool = False):
+        await self.io.write(filepath, self.repository.save_many, list(results), filepath, fsync)
@@ -0,0 +1,74 @@
+import gc
+import json
+import glob
+import argparse
+import tracemalloc
+from datetime import date, datetime
+from models import Question, Quiz, User, Result
+
+
+class LegacyQuestion:
+    def __init__(self, text: str, options: list, correct_answers: list):
+        self.text = text
+        self.options = options
+        self.correct_answers = correct_answers
+
+
+class LegacyResult:
+    def __init__(self, user: User, quiz: Quiz, score: int):
+        self.user = user
+        self.quiz = quiz
+        self.score = score
+        self.timestamp = datetime.now().isoformat()
+
+
+def make_question_blob(count: int) -> str:
+    templates = [question for filepath in sorted(glob.glob('quizzes/*.json'))
+                 for question in json.load(open(filepath))['questions']]
+    questions = []
+    for i in range(count):
+        template = templates[i % len(templates)]
+        questions.append(dict(template, text=f"{template['text']} #{i}"))
+    return json.dumps(questions)
+
+
+def measure(build, count: int) -> float:
+    gc.collect()
+    tracemalloc.start()
+    objects = build()
+    gc.collect()
+    retained, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del objects
+    return retained / count
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure retained memory per question and per result.")
+    parser.add_argument('--count', type=int, default=100_000)
+    args = parser.parse_args()
+
+    blob = make_question_blob(args.count)
+
+    def build_questions(question_class):
+        return lambda: [question_class(q['text'], q['options'], q['correct_answers']) for q in json.loads(blob)]
+
+    user = User("user1", "123", date(1970, 1, 1))
+    quiz = Quiz("Python")
+
+    def build_results(result_class):
+        return lambda: [result_class(user, quiz, i % 21) for i in range(args.count)]
+
+    rows = [
+        ("Question", measure(build_questions(LegacyQuestion), args.count),
+         measure(build_questions(Question), args.count)),
+        ("Result", measure(build_results(LegacyResult), args.count),
+         measure(build_results(Result), args.count)),
+    ]
+    print(f"{'Model':<12}{'Before, B':>12}{'After, B':>12}{'Saved':>10}")
+    for name, before, after in rows:
+        print(f"{name:<12}{before:>12.0f}{after:>12.0f}{(1 - after / before):>10.0%}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,61 @@
+import os
+import json
+import time
+import argparse
+import tempfile
+from repositories import QuizRepository
+from services import QuizService
+
+
+class SlowQuizRepository(QuizRepository):
+    # emulates network-mounted or cold-cache storage by adding a fixed delay to every file access
+    def __init__(self, quizzes_dir: str, latency: float):
+        super().__init__(quizzes_dir)
+        self.latency = latency
+
+    def get_file_signature(self, filepath: str):
+        time.sleep(self.latency)
+        return super().get_file_signature(filepath)
+
+    def get_file_hash(self, filepath: str):
+        time.sleep(self.latency)
+        return super().get_file_hash(filepath)
+
+    def read_header(self, filepath: str):
+        time.sleep(self.latency)
+        return super().read_header(filepath)
+
+
+def write_quizzes(quizzes_dir: str, count: int):
+    with open('quizzes/quiz_python.json') as file:
+        questions = json.load(file)['questions']
+    for i in range(count):
+        with open(os.path.join(quizzes_dir, f"quiz_{i:05}.json"), 'w') as file:
+            json.dump({"title": f"Quiz {i}", "questions": questions}, file, indent=4)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare serial and parallel quiz catalog loading.")
+    parser.add_argument('--files', type=int, default=10_000)
+    parser.add_argument('--workers', type=int, default=16)
+    parser.add_argument('--latency-ms', type=float, default=1.0, help="simulated storage latency per file access")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as quizzes_dir:
+        write_quizzes(quizzes_dir, args.files)
+        quiz_repo = SlowQuizRepository(quizzes_dir, args.latency_ms / 1000)
+
+        configurations = [("serial", 1, 'thread'), ("threads", args.workers, 'thread'),
+                          ("processes", args.workers, 'process')]
+        print(f"{args.files} quiz files, {args.latency_ms} ms simulated latency per access")
+        print(f"{'Loader':<12}{'Workers':>8}{'Seconds':>10}")
+        for name, workers, pool in configurations:
+            start = time.perf_counter()
+            quiz_service = QuizService(quiz_repo, workers=workers, pool=pool)
+            elapsed = time.perf_counter() - start
+            assert len(quiz_service.quizzes) == args.files
+            print(f"{name:<12}{workers:>8}{elapsed:>10.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,133 @@
+import gc
+import os
+import time
+import heapq
+import random
+import argparse
+import tracemalloc
+from datetime import datetime, timedelta
+import result_store
+from result_store import ColumnarResultStore
+
+
+def make_results(count: int, users: int, quizzes: int, seed: int = 1):
+    rng = random.Random(seed)
+    start = datetime(2024, 1, 1)
+    for i in range(count):
+        # fresh strings per row, as json.loads produces them when the history is read back
+        yield {"user": f"user{rng.randrange(users)}", "quiz": f"Quiz {rng.randrange(quizzes)}",
+               "score": rng.randrange(21), "timestamp": (start + timedelta(seconds=i * 3)).isoformat()}
+
+
+def resident_bytes():
+    # current RSS rather than tracemalloc: tracing ten million dicts costs more memory than they do
+    try:
+        with open('/proc/self/statm') as file:
+            return int(file.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except OSError:
+        return None
+
+
+def measure(build, count: int):
+    gc.collect()
+    before = resident_bytes()
+    if before is None:
+        tracemalloc.start()
+    started = time.perf_counter()
+    objects = build()
+    elapsed = time.perf_counter() - started
+    gc.collect()
+    if before is None:
+        retained, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    else:
+        retained = resident_bytes() - before
+    return objects, retained / count, elapsed
+
+
+def timed(function, repeat: int = 3):
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        value = function()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return value, best
+
+
+def dict_queries(results: list, user: str, quiz: str, since: str):
+    key = quiz.lower()
+
+    def top():
+        return heapq.nlargest(10, (r for r in results if r['quiz'].lower() == key), key=lambda r: r['score'])
+
+    def history():
+        return sorted((r for r in results if r['user'] == user), key=lambda r: r['score'], reverse=True)
+
+    def best_per_quiz():
+        best = {}
+        for r in results:
+            if r['score'] > best.get(r['quiz'], -1):
+                best[r['quiz']] = r['score']
+        return best
+
+    def recent():
+        return [r for r in results if r['timestamp'] >= since]
+
+    return {"top-10 for quiz": top, "user history": history, "best per quiz": best_per_quiz,
+            "since filter": recent}
+
+
+def store_queries(store: ColumnarResultStore, user: str, quiz: str, since: str):
+    return {
+        "top-10 for quiz": lambda: store.rows(store.top_k(10, store.positions(quiz=quiz))),
+        "user history": lambda: store.rows(store.sort_positions(store.positions(user=user))),
+        "best per quiz": lambda: store.group_by('quiz', 'max'),
+        "since filter": lambda: store.positions(since=since),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare list-of-dicts results with the columnar result store.")
+    parser.add_argument('--count', type=int, nargs='+', default=[1_000_000])
+    parser.add_argument('--users', type=int, default=10_000)
+    parser.add_argument('--quizzes', type=int, default=50)
+    parser.add_argument('--no-baseline', action='store_true', help="skip the list-of-dicts baseline")
+    args = parser.parse_args()
+
+    print(f"NumPy: {'yes' if result_store.np is not None else 'no'}")
+    for count in args.count:
+        since = (datetime(2024, 1, 1) + timedelta(seconds=count * 3 * 0.99)).isoformat()
+        user, quiz = "user7", "Quiz 7"
+        print(f"\n{count:,} results")
+
+        def build_store():
+            store = ColumnarResultStore()
+            for result in make_results(count, args.users, args.quizzes):
+                store.append(result)
+            return store
+
+        store, store_bytes, store_build = measure(build_store, count)
+        store_times = {name: timed(query)[1] for name, query in store_queries(store, user, quiz, since).items()}
+        del store
+
+        if args.no_baseline:
+            print(f"{'columnar':<12}{store_bytes:>10.1f} B/result  built in {store_build:.1f} s")
+            for name, elapsed in store_times.items():
+                print(f"  {name:<18}{elapsed * 1000:>10.1f} ms")
+            continue
+
+        results, dict_bytes, dict_build = measure(lambda: list(make_results(count, args.users, args.quizzes)),
+                                                  count)
+        dict_times = {name: timed(query)[1] for name, query in dict_queries(results, user, quiz, since).items()}
+        del results
+
+        print(f"{'':<20}{'dicts':>12}{'columnar':>12}")
+        print(f"{'bytes/result':<20}{dict_bytes:>12.1f}{store_bytes:>12.1f}")
+        print(f"{'build (s)':<20}{dict_build:>12.1f}{store_build:>12.1f}")
+        for name in store_times:
+            print(f"{name + ' (ms)':<20}{dict_times[name] * 1000:>12.1f}{store_times[name] * 1000:>12.1f}")
+
+
+if __name__ == '__main__':
+    main()
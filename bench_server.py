@@ -0,0 +1,172 @@
+import os
+import json
+import time
+import random
+import asyncio
+import argparse
+import tempfile
+import contextlib
+from repositories import UserRepository, AdminRepository, QuizRepository, SegmentedResultRepository
+from services import UserService, QuizService, ResultService
+from result_writer import BufferedResultWriter
+from server import QuizServer
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+
+class HttpClient:
+    # one keep-alive connection speaking just enough HTTP/1.1 for the quiz server
+    def __init__(self, host: str, port: int, latencies: list):
+        self.host = host
+        self.port = port
+        self.latencies = latencies
+        self.token = None
+        self.reader = self.writer = None
+
+    async def connect(self):
+        self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+
+    async def close(self):
+        self.writer.close()
+        with contextlib.suppress(ConnectionError):
+            await self.writer.wait_closed()
+
+    async def request(self, method: str, path: str, payload: dict = None):
+        body = json.dumps(payload).encode('utf-8') if payload is not None else b''
+        head = f"{method} {path} HTTP/1.1\r\nHost: {self.host}\r\nContent-Length: {len(body)}\r\n"
+        if self.token:
+            head += f"Authorization: Bearer {self.token}\r\n"
+        started = time.perf_counter()
+        self.writer.write((head + "\r\n").encode('latin-1') + body)
+        status = int((await self.reader.readline()).split()[1])
+        length = 0
+        while True:
+            line = await self.reader.readline()
+            if line in (b'\r\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            if name.strip().lower() == 'content-length':
+                length = int(value)
+        data = json.loads(await self.reader.readexactly(length))
+        self.latencies.append(time.perf_counter() - started)
+        return status, data
+
+
+async def take_quiz(client: HttpClient, login: str, title: str, rng: random.Random, all_started, counter: list):
+    await client.connect()
+    try:
+        status, data = await client.request('POST', '/login', {"login": login, "password": "secret"})
+        if status != 200:
+            raise RuntimeError(f"Login failed for '{login}': {data}")
+        client.token = data['token']
+        status, data = await client.request('POST', '/sessions', {"quiz": title})
+        if status != 201:
+            raise RuntimeError(f"Could not start a session: {data}")
+        session, question = data['session'], data['question']
+        # every session stays open until all of them have started, so they really are concurrent
+        counter[0] += 1
+        if counter[0] == counter[1]:
+            all_started.set()
+        await all_started.wait()
+        while question is not None:
+            answer = [rng.randrange(len(question['options'])) + 1]
+            status, data = await client.request('POST', f'/sessions/{session}/answer', {"answer": answer})
+            question = data['question']
+        status, data = await client.request('POST', f'/sessions/{session}/finish')
+        return data['score']
+    finally:
+        await client.close()
+
+
+async def run_load(host: str, port: int, sessions: int, users: int, title: str, seed: int):
+    latencies = []
+    setup = HttpClient(host, port, latencies)
+    await setup.connect()
+    for i in range(users):
+        await setup.request('POST', '/register', {"login": f"load{i}", "password": "secret",
+                                                  "birth_date": "2000-01-01"})
+    if title is None:
+        _, data = await setup.request('GET', '/quizzes')
+        title = data['quizzes'][0]['title']
+    await setup.close()
+    latencies.clear()
+
+    rng = random.Random(seed)
+    all_started = asyncio.Event()
+    counter = [0, sessions]
+    started = time.perf_counter()
+    scores = await asyncio.gather(*(take_quiz(HttpClient(host, port, latencies), f"load{i % users}", title,
+                                              random.Random(rng.random()), all_started, counter)
+                                    for i in range(sessions)))
+    elapsed = time.perf_counter() - started
+    return title, scores, latencies, elapsed
+
+
+def raise_file_limit(needed: int):
+    # each concurrent session holds a client and a server socket
+    if resource is None:
+        return
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft != resource.RLIM_INFINITY and soft < needed:
+        target = needed if hard == resource.RLIM_INFINITY else min(needed, hard)
+        resource.setrlimit(resource.RLIMIT_NOFILE, (target, hard))
+
+
+async def main_async(args):
+    if args.port:
+        return await run_load(args.host, args.port, args.sessions, args.users, args.quiz, args.seed)
+
+    # no server given: host one in this process, on a scratch copy of the data
+    with tempfile.TemporaryDirectory() as directory:
+        for name in ('users.json', 'admins.json'):
+            with open(os.path.join(directory, name), 'w') as file:
+                file.write('[]')
+        result_repo = SegmentedResultRepository()
+        writer = BufferedResultWriter(result_repo, durability='none')
+        with contextlib.redirect_stdout(open(os.devnull, 'w')):
+            user_service = UserService(UserRepository(os.path.join(directory, 'users.json')),
+                                       AdminRepository(os.path.join(directory, 'admins.json')))
+            quiz_service = QuizService(QuizRepository(args.quizzes))
+        result_service = ResultService(writer, os.path.join(directory, 'results'))
+        server = QuizServer(user_service, quiz_service, result_service)
+        listener = await server.start(args.host, 0)
+        port = listener.sockets[0].getsockname()[1]
+        try:
+            with contextlib.redirect_stdout(open(os.devnull, 'w')):
+                return await run_load(args.host, port, args.sessions, args.users, args.quiz, args.seed)
+        finally:
+            listener.close()
+            await listener.wait_closed()
+            server.executor.shutdown()
+            writer.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Drive many concurrent quiz sessions against the HTTP server.")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, help="a running server (default: start one in this process)")
+    parser.add_argument('--sessions', type=int, default=2000, help="concurrent quiz sessions")
+    parser.add_argument('--users', type=int, default=20, help="accounts the sessions are spread over")
+    parser.add_argument('--quiz', help="quiz title (default: the first quiz the server lists)")
+    parser.add_argument('--quizzes', default='quizzes', help="quiz directory for the in-process server")
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    raise_file_limit(2 * args.sessions + 64)
+    title, scores, latencies, elapsed = asyncio.run(main_async(args))
+    latencies.sort()
+
+    def percentile(share: float) -> float:
+        return latencies[min(len(latencies) - 1, int(share * len(latencies)))] * 1000
+
+    print(f"{len(scores)} concurrent sessions of '{title}' finished in {elapsed:.2f} s")
+    print(f"{len(latencies)} requests, {len(latencies) / elapsed:.0f} requests/s")
+    print(f"latency p50 {percentile(0.5):.1f} ms, p99 {percentile(0.99):.1f} ms, max {latencies[-1] * 1000:.1f} ms")
+    print(f"mean score {sum(scores) / len(scores):.2f}")
+
+
+if __name__ == '__main__':
+    main()
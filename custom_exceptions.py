@@ -33,3 +33,12 @@ class InvalidInputException(Exception):
 class SavingErrorException(Exception):
     pass
 
+
+class InvalidAnswerException(Exception):
+    def __init__(self, message="Invalid answer. Please enter valid option numbers."):
+        self.message = message
+        super().__init__(self.message)
+
+
+class SessionNotFoundException(Exception):
+    pass
@@ -0,0 +1,55 @@
+import os
+import threading
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+
+@contextmanager
+def file_lock(filepath: str, shared: bool = False):
+    # the advisory lock lives on a sidecar file, because os.replace swaps the data file's inode
+    # and a lock held on the old inode would no longer exclude anyone
+    if fcntl is None:
+        yield
+        return
+    with open(filepath + '.lock', 'a') as lock_file:
+        fcntl.flock(lock_file.fileno(), fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+
+def atomic_write(filepath: str, write, fsync: bool = True):
+    # readers see either the old file or the complete new one, never a partial write
+    tmp_filepath = f"{filepath}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        with open(tmp_filepath, 'w') as file:
+            write(file)
+            if fsync:
+                file.flush()
+                os.fsync(file.fileno())
+        os.replace(tmp_filepath, filepath)
+    except BaseException:
+        try:
+            os.unlink(tmp_filepath)
+        except OSError:
+            pass
+        raise
+
+
+def append_text(filepath: str, text: str, fsync: bool = False):
+    with open(filepath, 'ab+') as file:
+        # a crash mid-append leaves a partial last line; start on a fresh line so the new
+        # records are not glued onto it
+        if file.seek(0, os.SEEK_END):
+            file.seek(-1, os.SEEK_END)
+            if file.read(1) != b'\n':
+                text = '\n' + text
+        file.write(text.encode('utf-8'))
+        if fsync:
+            file.flush()
+            os.fsync(file.fileno())
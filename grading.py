@@ -0,0 +1,49 @@
+from models import Quiz, Question
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+def answer_mask(answer) -> int:
+    # an answer is either a ready bitmask or an iterable of 0-based option indices
+    if isinstance(answer, int):
+        return answer
+    mask = 0
+    for index in answer:
+        mask |= 1 << index
+    return mask
+
+
+class GradingEngine:
+    def answer_key(self, questions: list) -> list:
+        return [question.correct_mask for question in questions]
+
+    def grade_answer(self, question: Question, answer) -> bool:
+        return answer_mask(answer) == question.correct_mask
+
+    def grade(self, questions: list, answers: list) -> int:
+        return self._grade_sheet(self.answer_key(questions), answers)
+
+    @staticmethod
+    def _sheet_masks(key: list, answers: list) -> list:
+        if len(answers) > len(key):
+            raise ValueError(f"Answer sheet has {len(answers)} answers for {len(key)} questions.")
+        # unanswered questions get an empty mask
+        return [answer_mask(answer) for answer in answers] + [0] * (len(key) - len(answers))
+
+    def _grade_sheet(self, key: list, answers: list) -> int:
+        return sum(mask == correct for mask, correct in zip(self._sheet_masks(key, answers), key))
+
+    def grade_batch(self, quiz: Quiz, submissions) -> list:
+        key = self.answer_key(quiz.questions)
+        if np is None or any(len(question.options) > 64 for question in quiz.questions):
+            return [self._grade_sheet(key, answers) for answers in submissions]
+
+        sheets = [self._sheet_masks(key, answers) for answers in submissions]
+        if not sheets:
+            return []
+        masks = np.array(sheets, dtype=np.uint64).reshape(len(sheets), len(key))
+        scores = (masks == np.array(key, dtype=np.uint64)).sum(axis=1)
+        return scores.tolist()
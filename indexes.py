@@ -0,0 +1,379 @@
+import heapq
+from array import array
+from bisect import bisect_left, bisect_right, insort
+from datetime import datetime
+from itertools import count
+from result_store import ColumnarResultStore, encode_timestamp, decode_timestamp, MISSING_TIMESTAMP
+
+WINDOWS = ('all', 'day', 'week')
+DAY = 86_400_000_000
+
+
+def window_key(window: str, micros: int) -> int:
+    day = micros // DAY
+    # epoch day 0 was a Thursday; weeks start on Monday
+    return day if window == 'day' else (day + 3) // 7
+
+
+def window_bounds(window: str, at: str = None):
+    # the half-open [since, until) range of the calendar day or week containing `at` (default: now)
+    if window not in WINDOWS[1:]:
+        raise ValueError(f"Unknown leaderboard window '{window}'.")
+    key = window_key(window, encode_timestamp(at or datetime.now().isoformat()))
+    first_day, days = (key, 1) if window == 'day' else (key * 7 - 3, 7)
+    return decode_timestamp(first_day * DAY), decode_timestamp((first_day + days) * DAY)
+
+
+class TopKIndex:
+    def __init__(self, k: int):
+        self.k = k
+        # min-heap of (score, -seq, result): the root is the entry to evict next, and among equal
+        # scores the latest result goes first, matching a stable sort of the history by score
+        self._heap = []
+
+    def __len__(self):
+        return len(self._heap)
+
+    def add(self, result: dict, seq: int):
+        entry = (result['score'], -seq, result)
+        if len(self._heap) < self.k:
+            heapq.heappush(self._heap, entry)
+        elif entry[:2] > self._heap[0][:2]:
+            heapq.heapreplace(self._heap, entry)
+
+    def min_score(self):
+        return self._heap[0][0] if self._heap else None
+
+    def top(self):
+        return [entry[2] for entry in sorted(self._heap, key=lambda entry: (-entry[0], -entry[1]))]
+
+
+class LeaderboardIndex:
+    def __init__(self, k: int):
+        self.k = k
+        self._seq = count()
+        self._by_quiz = {}
+        self._total = TopKIndex(k)
+
+    def add(self, result: dict):
+        seq = next(self._seq)
+        key = result['quiz'].lower()
+        if key not in self._by_quiz:
+            self._by_quiz[key] = TopKIndex(self.k)
+        self._by_quiz[key].add(result, seq)
+        self._total.add(result, seq)
+
+    def top(self, title: str):
+        index = self._by_quiz.get(title.lower())
+        return index.top() if index else []
+
+    def total_top(self):
+        return self._total.top()
+
+
+def describe_histogram(histogram: list) -> dict:
+    # histogram[score] is the number of results with that score
+    total = sum(histogram)
+    if not total:
+        return {"total": 0, "min": None, "max": None, "mean": None, "median": None, "histogram": []}
+    scores = [score for score, bucket_count in enumerate(histogram) if bucket_count]
+    # 1-based ranks of the two middle results, which coincide when the count is odd
+    lower_rank, upper_rank = (total + 1) // 2, total // 2 + 1
+    lower = None
+    seen = 0
+    for score, bucket_count in enumerate(histogram):
+        seen += bucket_count
+        if lower is None and seen >= lower_rank:
+            lower = score
+        if seen >= upper_rank:
+            upper = score
+            break
+    return {"total": total, "min": scores[0], "max": scores[-1],
+            "mean": sum(score * bucket_count for score, bucket_count in enumerate(histogram)) / total,
+            "median": (lower + upper) / 2, "histogram": histogram[:scores[-1] + 1]}
+
+
+class ScoreRankIndex:
+    # Fenwick tree over integer score buckets: bucket i holds the number of results with score i
+    def __init__(self, max_score: int = 32):
+        self._tree = [0] * (max_score + 2)
+        self.total = 0
+        self.max_seen = -1
+
+    def _grow(self, score: int):
+        counts = [self.count_at_most(i) - self.count_at_most(i - 1) for i in range(len(self._tree) - 1)]
+        size = len(self._tree) - 1
+        while size <= score:
+            size *= 2
+        self._tree = [0] * (size + 1)
+        for i, bucket_count in enumerate(counts, start=1):
+            j = i
+            while j <= size and bucket_count:
+                self._tree[j] += bucket_count
+                j += j & -j
+
+    def add(self, score: int):
+        if score < 0:
+            raise ValueError(f"Score must be non-negative, got {score}.")
+        if score >= len(self._tree) - 1:
+            self._grow(score)
+        i = score + 1
+        while i < len(self._tree):
+            self._tree[i] += 1
+            i += i & -i
+        self.total += 1
+        self.max_seen = max(self.max_seen, score)
+
+    def count_at_most(self, score: int) -> int:
+        i = min(score + 1, len(self._tree) - 1)
+        count = 0
+        while i > 0:
+            count += self._tree[i]
+            i -= i & -i
+        return count
+
+    def count_below(self, score: int) -> int:
+        return self.count_at_most(score - 1)
+
+    def count_above(self, score: int) -> int:
+        return self.total - self.count_at_most(score)
+
+    def histogram(self) -> list:
+        # one prefix-sum walk per bucket would be O(S log S); un-summing the tree in place is O(S)
+        counts = self._tree[1:self.max_seen + 2]
+        for i in range(len(counts), 0, -1):
+            parent = i + (i & -i)
+            if parent <= len(counts):
+                counts[parent - 1] -= counts[i - 1]
+        return counts
+
+
+class RankIndex:
+    def __init__(self):
+        self._by_quiz = {}
+
+    def add(self, result: dict):
+        key = result['quiz'].lower()
+        if key not in self._by_quiz:
+            self._by_quiz[key] = ScoreRankIndex()
+        self._by_quiz[key].add(result['score'])
+
+    def count(self, title: str) -> int:
+        index = self._by_quiz.get(title.lower())
+        return index.total if index else 0
+
+    def rank(self, title: str, score: int) -> int:
+        index = self._by_quiz.get(title.lower())
+        return index.count_above(score) + 1 if index else 1
+
+    def percentile(self, title: str, score: int) -> float:
+        index = self._by_quiz.get(title.lower())
+        if not index or not index.total:
+            return 0.0
+        return index.count_below(score) * 100 / index.total
+
+    def histogram(self, title: str) -> list:
+        index = self._by_quiz.get(title.lower())
+        return index.histogram() if index else []
+
+
+class UserHistoryIndex:
+    def __init__(self, store: ColumnarResultStore):
+        self.store = store
+        # login -> row positions in the store, in save order
+        self._by_user = {}
+
+    def add(self, result: dict, position: int):
+        positions = self._by_user.get(result['user'])
+        if positions is None:
+            positions = self._by_user[result['user']] = array('I')
+        positions.append(position)
+
+    def count(self, login: str) -> int:
+        return len(self._by_user.get(login, ()))
+
+    def user_results(self, login: str, sort: str = 'score', descending: bool = True, offset: int = 0,
+                     limit: int = None):
+        positions = self._by_user.get(login, array('I'))
+        return self.store.rows(self.store.sort_positions(positions, sort, descending, offset, limit))
+
+
+class TimestampIndex:
+    # row positions ordered by epoch timestamp, so a time range is two bisects away
+    def __init__(self):
+        self.timestamps = array('q')
+        self.positions = array('I')
+
+    def __len__(self):
+        return len(self.timestamps)
+
+    def add(self, micros: int, position: int):
+        if not self.timestamps or micros >= self.timestamps[-1]:
+            self.timestamps.append(micros)
+            self.positions.append(position)
+        else:
+            i = bisect_right(self.timestamps, micros)
+            self.timestamps.insert(i, micros)
+            self.positions.insert(i, position)
+
+    def between(self, since: int, until: int):
+        return self.positions[bisect_left(self.timestamps, since):bisect_left(self.timestamps, until)]
+
+
+class WindowedLeaderboardIndex:
+    def __init__(self, k: int, window: str):
+        self.k = k
+        self.window = window
+        # window key -> {folded quiz title, or None for all quizzes -> min-heap of (score, -position)}
+        self._buckets = {}
+
+    def add(self, quiz: str, score: int, micros: int, position: int):
+        bucket = self._buckets.setdefault(window_key(self.window, micros), {})
+        entry = (score, -position)
+        for key in (quiz.lower(), None):
+            heap = bucket.setdefault(key, [])
+            if len(heap) < self.k:
+                heapq.heappush(heap, entry)
+            elif entry > heap[0]:
+                heapq.heapreplace(heap, entry)
+
+    def top(self, micros: int, title: str = None):
+        bucket = self._buckets.get(window_key(self.window, micros), {})
+        heap = bucket.get(title.lower() if title is not None else None, [])
+        return [-position for _, position in sorted(heap, reverse=True)]
+
+
+class DistinctTopIndex:
+    # one entry per key, ordered by score descending and then by the position of the result that set it
+    def __init__(self):
+        self._entries = {}
+        self._sorted = []
+
+    def __len__(self):
+        return len(self._sorted)
+
+    def update(self, key, score: int, position: int) -> bool:
+        entry = (-score, position, key)
+        current = self._entries.get(key)
+        if current is not None:
+            if entry[0] >= current[0]:
+                return False
+            del self._sorted[bisect_left(self._sorted, current)]
+        self._entries[key] = entry
+        insort(self._sorted, entry)
+        return True
+
+    def get(self, key):
+        entry = self._entries.get(key)
+        return entry[1] if entry else None
+
+    def top(self, k: int = None):
+        return [position for _, position, _ in self._sorted[:k]]
+
+
+class BestScoreIndex:
+    # materialized best result per (user, quiz), kept current on every add
+    def __init__(self):
+        self._by_quiz = {}
+        self._by_user = {}
+        self._overall = DistinctTopIndex()
+
+    def add(self, result: dict, position: int):
+        login, quiz, score = result['user'], result['quiz'].lower(), result['score']
+        if quiz not in self._by_quiz:
+            self._by_quiz[quiz] = DistinctTopIndex()
+        if self._by_quiz[quiz].update(login, score, position):
+            if login not in self._by_user:
+                self._by_user[login] = DistinctTopIndex()
+            self._by_user[login].update(quiz, score, position)
+        self._overall.update(login, score, position)
+
+    def top(self, title: str, k: int):
+        index = self._by_quiz.get(title.lower())
+        return index.top(k) if index else []
+
+    def total_top(self, k: int):
+        return self._overall.top(k)
+
+    def user_best(self, login: str):
+        index = self._by_user.get(login)
+        return index.top() if index else []
+
+    def best(self, login: str, title: str):
+        index = self._by_quiz.get(title.lower())
+        return index.get(login) if index else None
+
+
+class ResultIndex:
+    # the columnar store is the working set of results; the other indexes answer the hot queries
+    def __init__(self, top_num: int):
+        self.store = ColumnarResultStore()
+        self.leaderboard = LeaderboardIndex(top_num)
+        self.ranks = RankIndex()
+        self.history = UserHistoryIndex(self.store)
+        self.timeline = TimestampIndex()
+        self.windows = {window: WindowedLeaderboardIndex(top_num, window) for window in WINDOWS[1:]}
+        self.best = BestScoreIndex()
+
+    def add(self, result: dict):
+        position = self.store.append(result)
+        self.leaderboard.add(result)
+        self.ranks.add(result)
+        self.history.add(result, position)
+        self.best.add(result, position)
+        micros = self.store.timestamps[position]
+        if micros != MISSING_TIMESTAMP:
+            self.timeline.add(micros, position)
+            for index in self.windows.values():
+                index.add(result['quiz'], result['score'], micros, position)
+
+    def user_results(self, login: str, sort: str = 'score', descending: bool = True, offset: int = 0,
+                     limit: int = None):
+        return self.history.user_results(login, sort, descending, offset, limit)
+
+    def user_result_count(self, login: str) -> int:
+        return self.history.count(login)
+
+    def _window_top(self, window: str, at: str, title: str, limit: int):
+        if window not in self.windows:
+            raise ValueError(f"Unknown leaderboard window '{window}'.")
+        micros = encode_timestamp(at or datetime.now().isoformat())
+        return self.store.rows(self.windows[window].top(micros, title)[:limit])
+
+    def top_results(self, title: str, limit: int, window: str = 'all', at: str = None):
+        if window == 'all':
+            return self.leaderboard.top(title)[:limit]
+        return self._window_top(window, at, title, limit)
+
+    def total_top_results(self, limit: int, window: str = 'all', at: str = None):
+        if window == 'all':
+            return self.leaderboard.total_top()[:limit]
+        return self._window_top(window, at, None, limit)
+
+    def top_results_between(self, title: str, limit: int, since: str, until: str):
+        positions = self.timeline.between(encode_timestamp(since), encode_timestamp(until))
+        if title is not None:
+            codes = set(self.store.quiz_codes(title))
+            positions = [position for position in positions if self.store.quiz_ids[position] in codes]
+        return self.store.rows(self.store.top_k(limit, positions))
+
+    def distinct_top_results(self, title: str, limit: int):
+        return self.store.rows(self.best.top(title, limit))
+
+    def distinct_total_top_results(self, limit: int):
+        return self.store.rows(self.best.total_top(limit))
+
+    def user_best_results(self, login: str):
+        return self.store.rows(self.best.user_best(login))
+
+    def count_results(self, title: str) -> int:
+        return self.ranks.count(title)
+
+    def rank(self, title: str, score: int) -> int:
+        return self.ranks.rank(title, score)
+
+    def percentile(self, title: str, score: int) -> float:
+        return self.ranks.percentile(title, score)
+
+    def score_distribution(self, title: str) -> dict:
+        return describe_histogram(self.ranks.histogram(title))
@@ -1,15 +1,38 @@
 from datetime import date
-from models import User, Result, Question, Quiz
+from models import User, Question, Quiz
 from services import UserService, QuizService, ResultService
+from grading import GradingEngine
+from sessions import SessionEngine, parse_answer
 from custom_exceptions import (UserNotFoundException, InvalidDateFormatException, InvalidChoiceException,
-                               QuizNotFoundException, InvalidInputException)
+                               QuizNotFoundException, InvalidInputException, InvalidAnswerException,
+                               UserAlreadyExistsException)
+
+LEADERBOARD_WINDOWS = {'1': ('all', "all time"), '2': ('week', "this week"), '3': ('day', "today"),
+                       '4': ('players', "all time, best result per player")}
+
+
+def print_distribution(title: str, distribution: dict, marker: int = None, width: int = 40):
+    if not distribution['total']:
+        print(f"\nNo results for quiz '{title}' yet.")
+        return
+    print(f"\nScore distribution for quiz '{title}' ({distribution['total']} results):")
+    print(f"Mean: {distribution['mean']:.1f}   Median: {distribution['median']:g}   "
+          f"Best: {distribution['max']}   Lowest: {distribution['min']}")
+    largest = max(distribution['histogram'])
+    for score, bucket_count in enumerate(distribution['histogram']):
+        bar = '#' * round(bucket_count * width / largest)
+        suffix = "  <- you" if score == marker else ""
+        print(f"{score:>5} | {bar:<{width}} {bucket_count}{suffix}")
 
 
 class UserMenu:
-    def __init__(self, user_service: UserService, quiz_service: QuizService, result_service: ResultService):
+    def __init__(self, user_service: UserService, quiz_service: QuizService, result_service: ResultService,
+                 grading_engine: GradingEngine = None, session_engine: SessionEngine = None):
         self.user_service = user_service
         self.quiz_service = quiz_service
         self.result_service = result_service
+        self.grading_engine = grading_engine or GradingEngine()
+        self.session_engine = session_engine or SessionEngine(quiz_service, result_service, self.grading_engine)
         self.current_user = None
 
     def authenticate(self):
@@ -39,6 +62,8 @@ class UserMenu:
             self.user_service.register_user(new_user)
         except ValueError:
             raise InvalidDateFormatException()
+        except UserAlreadyExistsException as e:
+            print(e)
 
     def log_in(self):
         while True:
@@ -69,6 +94,8 @@ class UserMenu:
                 print("3. View Top-20 Results for Quiz")
                 print("4. View Total Top-20 Results for all Quizzes")
                 print("5. Settings")
+                print("6. View My Best per Quiz")
+                print("7. View Score Distribution for Quiz")
                 print("0. Logout")
 
                 choice = input("Select an option: ")
@@ -82,6 +109,10 @@ class UserMenu:
                     self.view_total_top_results()
                 elif choice == '5':
                     self.change_settings()
+                elif choice == '6':
+                    self.view_best_results()
+                elif choice == '7':
+                    self.view_distribution()
                 elif choice == '0':
                     print("See you again!")
                     self.current_user = None
@@ -98,74 +129,91 @@ class UserMenu:
 
         title = input("Enter quiz title (or 'mix' for a mixed quiz): ")
 
-        quiz = None
-
-        if title.lower() == 'mix':
-            questions = self.quiz_service.get_mixed_quiz_questions()
-            quiz_title = "Mix"
-        else:
-            try:
-                quiz = self.quiz_service.get_quiz_by_title(title)
-                questions = quiz.questions
-                quiz_title = quiz.title
-            except QuizNotFoundException as e:
-                print(e)
-                return
-
-        score = 0
-        for i, question in enumerate(questions, start=1):
-            print(f"\nQuestion {i}: {question.text}")
-            for j, option in enumerate(question.options, start=1):
-                print(f"{j}. {option}")
-
+        try:
+            session = self.session_engine.start(self.current_user, title)
             while True:
-                user_answer = input("Your answer (comma separated for multiple answers): ").split(',')
-                try:
-                    user_answer_indices = [int(num.strip()) - 1 for num in user_answer]
-                    if all(0 <= index < len(question.options) for index in user_answer_indices):
+                question = self.session_engine.next_question(session.session_id)
+                if question is None:
+                    break
+                print(f"\nQuestion {session.number}: {question.text}")
+                for j, option in enumerate(question.options, start=1):
+                    print(f"{j}. {option}")
+
+                while True:
+                    user_answer = input("Your answer (comma separated for multiple answers): ")
+                    try:
+                        self.session_engine.submit_answer(session.session_id, parse_answer(user_answer))
                         break
-                    else:
-                        print("Invalid answer. Please enter valid option numbers.")
-                except ValueError:
-                    print(InvalidInputException())
-
-            user_answer = [question.options[index] for index in user_answer_indices]
-
-            if set(user_answer) == set(question.correct_answers):
-                score += 1
-
-        print(f"\nQuiz completed! Your score: {score}/{len(questions)}")
-
-        result = Result(self.current_user, quiz, score)
-        self.result_service.save_result(result)
-
-        top_results = self.result_service.get_top_results(quiz_title)
-        user_rank = next((index + 1 for index, res in enumerate(top_results) if res['user'] == self.current_user.login),
-                         None)
+                    except (InvalidInputException, InvalidAnswerException) as e:
+                        print(e)
+        except QuizNotFoundException as e:
+            print(e)
+            return
 
-        if user_rank:
-            print(f"Your ranking: {user_rank}")
-        else:
-            print("You did not make it to the Top-20.")
+        summary = self.session_engine.finish(session.session_id)
+        print(f"\nQuiz completed! Your score: {summary['score']}/{summary['question_count']}")
+        print(f"Your ranking: {summary['rank']} of {summary['total']}")
+        print(f"You scored better than {summary['percentile']:.1f}% of results.")
+        print_distribution(summary['quiz'], self.result_service.get_score_distribution(summary['quiz']),
+                           marker=summary['score'])
 
-    def view_results(self, header="\nYour Results:"):
-        results = self.result_service.get_user_results(self.current_user, self.quiz_service.quizzes)
-        user_results = [result for result in results if result['user'] == self.current_user.login]
+    def view_results(self, header="\nYour Results:", page_size: int = 10):
+        total = self.result_service.get_user_result_count(self.current_user)
+        if not total:
+            print("\nNo results found.")
+            return
 
-        if user_results:
+        sort, offset = 'score', 0
+        while True:
+            user_results = self.result_service.get_user_results(self.current_user, sort=sort, offset=offset,
+                                                                limit=page_size)
             print(header)
             print(f"\n{'Rank':<10}{'Quiz':<20}{'Score':<15}{'Date':<40}")
             print("-" * 85)
-            for i, result in enumerate(user_results, start=1):
+            for i, result in enumerate(user_results, start=offset + 1):
                 print(f"{i:<10}{result['quiz']:<20}{result['score']:<15}{result['timestamp']:<40}")
-        else:
+            print(f"\nShowing {offset + 1}-{offset + len(user_results)} of {total}, sorted by "
+                  f"{'score' if sort == 'score' else 'date'}.")
+
+            choice = input("n - next page, p - previous page, s - sort by score, d - sort by date, "
+                           "any other key - back: ").strip().lower()
+            if choice == 'n' and offset + page_size < total:
+                offset += page_size
+            elif choice == 'p' and offset:
+                offset -= page_size
+            elif choice in ('s', 'd'):
+                sort, offset = ('score' if choice == 's' else 'timestamp'), 0
+            elif choice not in ('n', 'p'):
+                break
+
+    def view_best_results(self):
+        best_results = self.result_service.get_user_best_results(self.current_user)
+        if not best_results:
             print("\nNo results found.")
+            return
+        print("\nYour best result per quiz:")
+        print(f"\n{'Quiz':<20}{'Score':<15}{'Date':<40}")
+        print("-" * 75)
+        for result in best_results:
+            print(f"{result['quiz']:<20}{result['score']:<15}{result['timestamp']:<40}")
+
+    def view_distribution(self):
+        title = input("Enter quiz title to view its score distribution: ")
+        print_distribution(title, self.result_service.get_score_distribution(title))
+
+    def choose_window(self):
+        choice = input("Period (1 - all time, 2 - this week, 3 - today, 4 - best per player): ").strip()
+        return LEADERBOARD_WINDOWS.get(choice, LEADERBOARD_WINDOWS['1'])
 
     def view_top_results(self):
         title = input("Enter quiz title to view top results: ")
+        window, label = self.choose_window()
         try:
-            top_results = self.result_service.get_top_results(title)
-            print(f"\nTOP-20 results for quiz '{title}':")
+            if window == 'players':
+                top_results = self.result_service.get_distinct_top_results(title)
+            else:
+                top_results = self.result_service.get_top_results(title, window)
+            print(f"\nTOP-20 results for quiz '{title}' ({label}):")
             print(f"\n{'Rank':<10}{'User':<15}{'Score':<15}{'Timestamp':<40}")
             print("-" * 80)
             for i, result in enumerate(top_results, start=1):
@@ -173,9 +221,13 @@ class UserMenu:
         except QuizNotFoundException as e:
             print(e)
 
-    def view_total_top_results(self, header="\nTOP-20 results for all quizzes:"):
-        top_results = self.result_service.get_total_top_results()
-        print(header)
+    def view_total_top_results(self, header="\nTOP-20 results for all quizzes"):
+        window, label = self.choose_window()
+        if window == 'players':
+            top_results = self.result_service.get_distinct_total_top_results()
+        else:
+            top_results = self.result_service.get_total_top_results(window)
+        print(f"{header} ({label}):")
         print(f"\n{'Rank':<10}{'User':<15}{'Quiz':<20}{'Score':<15}{'Timestamp':<40}")
         print("-" * 100)
         for i, result in enumerate(top_results, start=1):
@@ -241,6 +293,7 @@ class AdminMenu:
                 print("1. Authenticate")
                 print("2. Create Quiz")
                 print("3. Edit Quiz")
+                print("4. View Score Distribution")
                 print("0. Exit")
 
                 choice = input("Select an option: ")
@@ -256,6 +309,11 @@ class AdminMenu:
                         self.edit_quiz()
                     else:
                         print("Please authenticate first.")
+                elif choice == '4':
+                    if self.current_admin:
+                        self.view_distribution()
+                    else:
+                        print("Please authenticate first.")
                 elif choice == '0':
                     self.current_admin = None
                     print("Logged out of the admin account.")
@@ -265,6 +323,13 @@ class AdminMenu:
             except InvalidChoiceException as e:
                 print(e)
 
+    def view_distribution(self):
+        print("\nQuizzes:")
+        for quiz in self.quiz_service.quizzes:
+            print(f"---> {quiz.title}")
+        title = input("Enter quiz title to view its score distribution: ")
+        print_distribution(title, self.result_service.get_score_distribution(title))
+
     def create_quiz(self):
         title = input("Enter quiz title: ")
         if not title:
@@ -299,6 +364,8 @@ class AdminMenu:
                     break
                 elif not correct_answer:
                     print("Invalid input.")
+                elif correct_answer not in options:
+                    print("Correct answer must match one of the options.")
                 else:
                     correct_answers.append(correct_answer)
 
@@ -354,10 +421,10 @@ class AdminMenu:
                         correct_answer = input("Enter new correct answer (or 'end' to finish): ")
                         if correct_answer.lower() == 'end':
                             break
-                        try:
+                        elif correct_answer not in options:
+                            print("Correct answer must match one of the options.")
+                        else:
                             correct_answers.append(correct_answer)
-                        except InvalidInputException as e:
-                            print(e)
 
                     quiz.questions[question_index] = Question(question_text, options, correct_answers)
                 else:
@@ -366,6 +433,5 @@ class AdminMenu:
                 print(InvalidInputException())
 
         self.quiz_service.save_quiz(quiz)
-        self.quiz_service.refresh_quizzes()
         print(f"Quiz '{title}' updated successfully!")
 
@@ -0,0 +1,95 @@
+import json
+
+WHITESPACE = ' \t\n\r'
+DELIMITERS = ',]}' + WHITESPACE
+
+_decoder = json.JSONDecoder()
+
+
+class JsonStream:
+    def __init__(self, file, chunk_size: int = 65536):
+        self.file = file
+        self.chunk_size = chunk_size
+        self.data = ''
+        self.pos = 0
+        self.eof = False
+
+    def _fill(self) -> bool:
+        if self.eof:
+            return False
+        chunk = self.file.read(self.chunk_size)
+        if not chunk:
+            self.eof = True
+            return False
+        # drop what has been consumed so the buffer never holds more than the current value plus one chunk
+        self.data = self.data[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self) -> str:
+        while True:
+            while self.pos < len(self.data) and self.data[self.pos] in WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.data):
+                return self.data[self.pos]
+            if not self._fill():
+                return ''
+
+    def expect(self, char: str):
+        if self.peek() != char:
+            raise json.JSONDecodeError(f"Expecting '{char}'", self.data, self.pos)
+        self.pos += 1
+
+    def skip(self, char: str) -> bool:
+        if self.peek() == char:
+            self.pos += 1
+            return True
+        return False
+
+    def value(self):
+        self.peek()
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self.data, self.pos)
+            except json.JSONDecodeError:
+                if not self._fill():
+                    raise
+                continue
+            # a number cut at the chunk boundary still decodes ("1." as 1, "1e" as 1), so a number is only
+            # trusted once the character after it is a delimiter
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                complete = end < len(self.data) and self.data[end] in DELIMITERS
+            else:
+                complete = end < len(self.data)
+            if not complete and self._fill():
+                continue
+            self.pos = end
+            return value
+
+
+def iter_json_array(file, key: str, fields: dict = None, chunk_size: int = 65536):
+    # yields the items of the `key` array of a top-level JSON object one at a time;
+    # every other member of the object is decoded into `fields` as it is passed
+    fields = fields if fields is not None else {}
+    stream = JsonStream(file, chunk_size)
+    stream.expect('{')
+    if stream.skip('}'):
+        return
+    while True:
+        name = stream.value()
+        if not isinstance(name, str):
+            raise json.JSONDecodeError("Expecting property name", stream.data, stream.pos)
+        stream.expect(':')
+        if name == key:
+            stream.expect('[')
+            if not stream.skip(']'):
+                while True:
+                    yield stream.value()
+                    if not stream.skip(','):
+                        stream.expect(']')
+                        break
+        else:
+            fields[name] = stream.value()
+        if not stream.skip(','):
+            stream.expect('}')
+            return
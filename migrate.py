@@ -0,0 +1,35 @@
+import os
+import argparse
+from repositories import (UserRepository, AdminRepository, QuizRepository, ResultRepository, JsonlResultRepository,
+                          SegmentedResultRepository)
+from sqlite_repositories import import_json
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import the JSON data files into a SQLite database.")
+    parser.add_argument('db_path', nargs='?', default='quiz.db')
+    parser.add_argument('--users', default='user_credentials.json')
+    parser.add_argument('--admins', default='admin_credentials.json')
+    parser.add_argument('--quizzes', default='quizzes')
+    parser.add_argument('--results', default=None,
+                        help="results directory or file (defaults to the first of results, results.jsonl "
+                             "and results.json that exists)")
+    args = parser.parse_args()
+
+    results_filepath = args.results
+    if results_filepath is None:
+        results_filepath = next((path for path in ('results', 'results.jsonl') if os.path.exists(path)), 'results.json')
+    if os.path.isdir(results_filepath):
+        result_repo = SegmentedResultRepository()
+    elif results_filepath.endswith('.jsonl'):
+        result_repo = JsonlResultRepository()
+    else:
+        result_repo = ResultRepository()
+
+    import_json(args.db_path, UserRepository(args.users), AdminRepository(args.admins), QuizRepository(args.quizzes),
+                result_repo, results_filepath)
+    print(f"Imported JSON data into '{args.db_path}'.")
+
+
+if __name__ == '__main__':
+    main()
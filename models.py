@@ -1,21 +1,37 @@
+import sys
 from datetime import date, datetime
 
 
 class Question:
+    __slots__ = ('text', 'options', 'correct_mask')
+
     def __init__(self, text: str, options: list, correct_answers: list):
         self.text = text
-        self.options = options
-        self.correct_answers = correct_answers
+        # option strings repeat across questions ("True", "None of the above"), so they are interned;
+        # correct answers are kept as a bitmask of option indices instead of a second list of strings
+        self.options = tuple(sys.intern(option) for option in options)
+        self.correct_mask = 0
+        for answer in correct_answers:
+            try:
+                self.correct_mask |= 1 << self.options.index(answer)
+            except ValueError:
+                raise ValueError(f"Correct answer '{answer}' is not one of the options.") from None
+
+    @property
+    def correct_answers(self) -> list:
+        return [option for i, option in enumerate(self.options) if self.correct_mask >> i & 1]
 
     def to_dict(self):
         return {
             "text": self.text,
-            "options": self.options,
+            "options": list(self.options),
             "correct_answers": self.correct_answers
         }
 
 
 class Quiz:
+    __slots__ = ('title', 'questions')
+
     def __init__(self, title: str):
         self.title = title
         self.questions = []
@@ -31,6 +47,8 @@ class Quiz:
 
 
 class User:
+    __slots__ = ('login', 'password', 'birth_date')
+
     def __init__(self, login: str, password: str, birth_date: date):
         self.login = login
         self.password = password
@@ -45,6 +63,8 @@ class User:
 
 
 class Admin:
+    __slots__ = ('login', 'password')
+
     def __init__(self, login: str, password: str):
         self.login = login
         self.password = password
@@ -57,16 +77,18 @@ class Admin:
 
 
 class Result:
+    __slots__ = ('login', 'quiz_title', 'score', 'timestamp')
+
     def __init__(self, user: User, quiz: Quiz, score: int):
-        self.user = user
-        self.quiz = quiz
+        self.login = user.login
+        self.quiz_title = quiz.title if quiz else ""
         self.score = score
         self.timestamp = datetime.now().isoformat()
 
     def to_dict(self):
         return {
-            "user": self.user.login,
-            "quiz": self.quiz.title if self.quiz else "",
+            "user": self.login,
+            "quiz": self.quiz_title,
             "score": self.score,
             "timestamp": self.timestamp
         }
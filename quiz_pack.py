@@ -0,0 +1,159 @@
+import os
+import sys
+import mmap
+import struct
+import argparse
+from array import array
+from models import Quiz, Question
+
+PACK_FILENAME = 'quizzes.pack'
+MAGIC = b'QPK1'
+
+# header: magic, string count, quiz count, question count, index count
+HEADER = struct.Struct('<4sIIII')
+# quiz: source name, title, first question, question count, source mtime_ns, source size, source hash
+QUIZ_RECORD = struct.Struct('<IIIIqQ16s')
+# question: text, first option, option count, first correct answer, correct answer count
+QUESTION_RECORD = struct.Struct('<IIIII')
+
+# Pack layout, every section 4-byte aligned:
+#   header | string offsets (u32 * (string count + 1)) | quiz records | question records
+#   | index array (u32 string ids of options and correct answers) | UTF-8 string blob
+
+
+class QuizPack:
+    def __init__(self, filepath: str):
+        if sys.byteorder != 'little':
+            raise ValueError("Quiz packs can only be memory-mapped on little-endian hosts.")
+        self.filepath = filepath
+        with open(filepath, 'rb') as file:
+            self._mmap = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        self._buffer = memoryview(self._mmap)
+
+        magic, string_count, quiz_count, question_count, index_count = HEADER.unpack_from(self._buffer, 0)
+        if magic != MAGIC:
+            self.close()
+            raise ValueError(f"'{filepath}' is not a quiz pack.")
+
+        offset = HEADER.size
+        self._string_offsets, offset = self._section(offset, (string_count + 1) * 4, 'I')
+        self._quizzes, offset = self._section(offset, quiz_count * QUIZ_RECORD.size)
+        self._questions, offset = self._section(offset, question_count * QUESTION_RECORD.size)
+        self._indices, offset = self._section(offset, index_count * 4, 'I')
+        self._strings = self._buffer[offset:]
+
+        self._sources = {}
+        for quiz_id in range(quiz_count):
+            source, *_ = QUIZ_RECORD.unpack_from(self._quizzes, quiz_id * QUIZ_RECORD.size)
+            self._sources[self.string(source)] = quiz_id
+
+    def _section(self, offset: int, size: int, fmt: str = None):
+        section = self._buffer[offset:offset + size]
+        if len(section) != size:
+            self.close()
+            raise ValueError(f"Quiz pack '{self.filepath}' is truncated.")
+        return (section.cast(fmt) if fmt else section), offset + size
+
+    def close(self):
+        for name in ('_string_offsets', '_quizzes', '_questions', '_indices', '_strings', '_buffer'):
+            view = self.__dict__.pop(name, None)
+            if view is not None:
+                view.release()
+        self._mmap.close()
+
+    def string(self, string_id: int) -> str:
+        return str(self._strings[self._string_offsets[string_id]:self._string_offsets[string_id + 1]], 'utf-8')
+
+    def get_entry(self, source: str):
+        quiz_id = self._sources.get(source)
+        if quiz_id is None:
+            return None
+        _, _, _, _, mtime_ns, size, digest = QUIZ_RECORD.unpack_from(self._quizzes, quiz_id * QUIZ_RECORD.size)
+        return quiz_id, (mtime_ns, size), digest.hex()
+
+    def load_header(self, quiz_id: int):
+        _, title, _, question_count, *_ = QUIZ_RECORD.unpack_from(self._quizzes, quiz_id * QUIZ_RECORD.size)
+        return self.string(title), question_count
+
+    def get_question(self, quiz_id: int, offset: int) -> Question:
+        _, _, first_question, question_count, *_ = QUIZ_RECORD.unpack_from(self._quizzes,
+                                                                            quiz_id * QUIZ_RECORD.size)
+        if not 0 <= offset < question_count:
+            raise IndexError(f"Question {offset} is out of range for quiz {quiz_id}.")
+        text, first_option, option_count, first_answer, answer_count = QUESTION_RECORD.unpack_from(
+            self._questions, (first_question + offset) * QUESTION_RECORD.size)
+        options = [self.string(i) for i in self._indices[first_option:first_option + option_count]]
+        correct_answers = [self.string(i) for i in self._indices[first_answer:first_answer + answer_count]]
+        return Question(self.string(text), options, correct_answers)
+
+    def load_quiz(self, quiz_id: int) -> Quiz:
+        title, question_count = self.load_header(quiz_id)
+        quiz = Quiz(title)
+        for offset in range(question_count):
+            quiz.add_question(self.get_question(quiz_id, offset))
+        return quiz
+
+
+def compile_pack(quiz_repository, pack_filepath: str = None) -> int:
+    pack_filepath = pack_filepath or os.path.join(quiz_repository.quizzes_dir, PACK_FILENAME)
+    strings = {}
+
+    def intern(value: str) -> int:
+        if value not in strings:
+            strings[value] = len(strings)
+        return strings[value]
+
+    quiz_records, question_records, indices = [], [], []
+    for filepath in sorted(quiz_repository.get_all_quiz_files()):
+        signature = quiz_repository.get_file_signature(filepath)
+        digest = quiz_repository.get_file_hash(filepath)
+        quiz = quiz_repository.load_json(filepath)
+        if quiz is None or signature is None:
+            continue
+        quiz_records.append((intern(os.path.basename(filepath)), intern(quiz.title), len(question_records),
+                             len(quiz.questions), signature[0], signature[1], bytes.fromhex(digest)))
+        for question in quiz.questions:
+            first_option = len(indices)
+            indices.extend(intern(option) for option in question.options)
+            first_answer = len(indices)
+            indices.extend(intern(answer) for answer in question.correct_answers)
+            question_records.append((intern(question.text), first_option, len(question.options),
+                                     first_answer, len(question.correct_answers)))
+
+    encoded = [value.encode('utf-8') for value in strings]
+    string_offsets = array('I', [0])
+    for value in encoded:
+        string_offsets.append(string_offsets[-1] + len(value))
+    indices = array('I', indices)
+    if sys.byteorder != 'little':
+        string_offsets.byteswap()
+        indices.byteswap()
+
+    tmp_filepath = pack_filepath + '.tmp'
+    with open(tmp_filepath, 'wb') as file:
+        file.write(HEADER.pack(MAGIC, len(encoded), len(quiz_records), len(question_records), len(indices)))
+        file.write(string_offsets.tobytes())
+        for record in quiz_records:
+            file.write(QUIZ_RECORD.pack(*record))
+        for record in question_records:
+            file.write(QUESTION_RECORD.pack(*record))
+        file.write(indices.tobytes())
+        file.write(b''.join(encoded))
+    os.replace(tmp_filepath, pack_filepath)
+    return len(quiz_records)
+
+
+def main():
+    from repositories import QuizRepository
+
+    parser = argparse.ArgumentParser(description="Compile a quiz directory into a memory-mappable quiz pack.")
+    parser.add_argument('quizzes_dir', nargs='?', default='quizzes')
+    parser.add_argument('--output', default=None, help=f"pack path (defaults to <quizzes_dir>/{PACK_FILENAME})")
+    args = parser.parse_args()
+
+    quiz_count = compile_pack(QuizRepository(args.quizzes_dir), args.output)
+    print(f"Compiled {quiz_count} quizzes from '{args.quizzes_dir}'.")
+
+
+if __name__ == '__main__':
+    main()
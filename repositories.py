@@ -1,8 +1,15 @@
 import os
+import gzip
 import json
+import struct
+import hashlib
 from datetime import date
-from custom_exceptions import SavingErrorException
+from custom_exceptions import SavingErrorException, UserAlreadyExistsException
 from models import User, Admin, Quiz, Question, Result
+from quiz_pack import QuizPack, PACK_FILENAME
+from json_stream import iter_json_array
+from file_locks import file_lock, atomic_write, append_text
+from indexes import TopKIndex
 
 
 class UserRepository:
@@ -25,20 +32,39 @@ class UserRepository:
             print(f"Error decoding JSON from '{self.filepath}'.")
         return users
 
+    def _write(self, users: list):
+        atomic_write(self.filepath, lambda file: json.dump([u.to_dict() for u in users], file, indent=4))
+
     def save(self, user: User):
-        users = self.load()
-        users.append(user)
         try:
-            with open(self.filepath, 'w') as file:
-                json.dump([u.to_dict() for u in users], file, indent=4)
-        except SavingErrorException as e:
+            with file_lock(self.filepath):
+                users = self.load()
+                # checked again under the lock: another process may have registered the login since
+                # this one loaded its accounts
+                key = user.login.casefold()
+                if any(u.login.casefold() == key for u in users):
+                    raise UserAlreadyExistsException(f"User '{user.login}' already exists.")
+                users.append(user)
+                self._write(users)
+        except (OSError, SavingErrorException) as e:
+            print(f"Error saving user: {e}.")
+
+    def update(self, user: User):
+        # re-read under the lock so users registered by other processes are kept
+        try:
+            with file_lock(self.filepath):
+                users = self.load()
+                key = user.login.casefold()
+                users = [user if u.login.casefold() == key else u for u in users]
+                self._write(users)
+        except (OSError, SavingErrorException) as e:
             print(f"Error saving user: {e}.")
 
     def save_all(self, users: list):
         try:
-            with open(self.filepath, 'w') as file:
-                json.dump([u.to_dict() for u in users], file, indent=4)
-        except SavingErrorException as e:
+            with file_lock(self.filepath):
+                self._write(users)
+        except (OSError, SavingErrorException) as e:
             print(f"Error saving users: {e}.")
 
 
@@ -62,21 +88,97 @@ class AdminRepository:
         return admins
 
     def save(self, admin: Admin):
-        admins = self.load()
-        admins.append(admin)
         try:
-            with open(self.filepath, 'w') as file:
-                json.dump([a.to_dict() for a in admins], file, indent=4)
-        except SavingErrorException as e:
+            with file_lock(self.filepath):
+                admins = self.load()
+                admins.append(admin)
+                atomic_write(self.filepath, lambda file: json.dump([a.to_dict() for a in admins], file, indent=4))
+        except (OSError, SavingErrorException) as e:
             print(f"Error saving admin: {e}.")
 
 
 class QuizRepository:
-    def __init__(self, quizzes_dir: str):
+    def __init__(self, quizzes_dir: str, pack_filepath: str = None):
         self.quizzes_dir = quizzes_dir
+        self.pack_filepath = pack_filepath or os.path.join(quizzes_dir, PACK_FILENAME)
+        self._pack = None
+        self._pack_signature = None
         os.makedirs(self.quizzes_dir, exist_ok=True)
 
+    def __getstate__(self):
+        # the memory-mapped pack cannot cross process boundaries; workers reopen it on demand
+        state = self.__dict__.copy()
+        state['_pack'] = None
+        state['_pack_signature'] = None
+        return state
+
+    def _get_pack(self):
+        signature = self.get_file_signature(self.pack_filepath)
+        if signature != self._pack_signature:
+            if self._pack is not None:
+                self._pack.close()
+                self._pack = None
+            self._pack_signature = signature
+            if signature is not None:
+                try:
+                    self._pack = QuizPack(self.pack_filepath)
+                except (OSError, ValueError, struct.error) as e:
+                    print(f"Error reading quiz pack '{self.pack_filepath}': {e}.")
+        return self._pack
+
+    def _find_in_pack(self, filepath: str):
+        # a pack entry is only used while the JSON source still has the mtime and size it was compiled from
+        pack = self._get_pack()
+        if pack is None:
+            return None, None
+        entry = pack.get_entry(os.path.basename(filepath))
+        if entry is None or entry[1] != self.get_file_signature(filepath):
+            return None, None
+        return pack, entry
+
     def load(self, filepath: str):
+        pack, entry = self._find_in_pack(filepath)
+        if pack is not None:
+            try:
+                return pack.load_quiz(entry[0])
+            except (ValueError, KeyError) as e:
+                print(f"Invalid quiz '{filepath}' in pack: {e}.")
+                return None
+        return self.load_json(filepath)
+
+    def iter_questions(self, filepath: str):
+        pack, entry = self._find_in_pack(filepath)
+        if pack is not None:
+            _, question_count = pack.load_header(entry[0])
+            for offset in range(question_count):
+                yield pack.get_question(entry[0], offset)
+            return
+        with open(filepath, 'r') as file:
+            for question_data in iter_json_array(file, 'questions'):
+                yield Question(question_data['text'], question_data['options'], question_data['correct_answers'])
+
+    def load_questions(self, filepath: str, offsets: list):
+        if not offsets:
+            return []
+        wanted = set(offsets)
+        last = max(offsets)
+        questions = {}
+        try:
+            # stop reading as soon as the last wanted question has been seen
+            for offset, question in enumerate(self.iter_questions(filepath)):
+                if offset in wanted:
+                    questions[offset] = question
+                if offset >= last:
+                    break
+        except FileNotFoundError:
+            print(f"Quiz file '{filepath}' not found.")
+        except json.JSONDecodeError:
+            print(f"Error decoding JSON from '{filepath}'.")
+        except (ValueError, KeyError, TypeError) as e:
+            print(f"Invalid question in '{filepath}': {e}.")
+        return [questions[offset] for offset in offsets if offset in questions]
+
+    def load_json(self, filepath: str):
         try:
             with open(filepath, 'r') as file:
                 quiz_data = json.load(file)
@@ -91,17 +193,60 @@ class QuizRepository:
         except json.JSONDecodeError:
             print(f"Error decoding JSON from '{filepath}'.")
             return None
+        except (ValueError, KeyError, TypeError) as e:
+            # e.g. a correct answer that is not one of the options, which the header scan cannot see
+            print(f"Invalid quiz '{filepath}': {e}.")
+            return None
+
+    def read_header(self, filepath: str):
+        pack, entry = self._find_in_pack(filepath)
+        if pack is not None:
+            return pack.load_header(entry[0])
+        fields = {}
+        with open(filepath, 'r') as file:
+            question_count = sum(1 for _ in iter_json_array(file, 'questions', fields))
+        return fields['title'], question_count
+
+    def load_header(self, filepath: str):
+        try:
+            return self.read_header(filepath)
+        except FileNotFoundError:
+            print(f"Quiz file '{filepath}' not found.")
+            return None
+        except json.JSONDecodeError:
+            print(f"Error decoding JSON from '{filepath}'.")
+            return None
 
     def save(self, quiz: Quiz, filepath: str):
         try:
-            with open(filepath, 'w') as file:
-                json.dump(quiz.to_dict(), file, indent=4, separators=(',', ': '))
-        except SavingErrorException as e:
+            with file_lock(filepath):
+                atomic_write(filepath, lambda file: json.dump(quiz.to_dict(), file, indent=4, separators=(',', ': ')))
+        except (OSError, SavingErrorException) as e:
             print(f"Error saving quiz to '{filepath}': {e}.")
 
     def get_all_quiz_files(self):
         return [os.path.join(self.quizzes_dir, file) for file in os.listdir(self.quizzes_dir) if file.endswith('.json')]
 
+    def get_file_signature(self, filepath: str):
+        try:
+            stat = os.stat(filepath)
+        except FileNotFoundError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def get_file_hash(self, filepath: str):
+        pack, entry = self._find_in_pack(filepath)
+        if pack is not None:
+            return entry[2]
+        digest = hashlib.blake2b(digest_size=16)
+        try:
+            with open(filepath, 'rb') as file:
+                for chunk in iter(lambda: file.read(65536), b''):
+                    digest.update(chunk)
+        except FileNotFoundError:
+            return None
+        return digest.hexdigest()
+
 
 class ResultRepository:
     def load(self, filepath: str):
@@ -114,12 +259,270 @@ class ResultRepository:
             print(f"Error decoding JSON from '{filepath}'.")
             return []
 
+    def iter_results(self, filepath: str):
+        yield from self.load(filepath)
+
     def save(self, result: Result, filepath: str):
         try:
-            results = self.load(filepath)
-            results.append(result.to_dict())
-            with open(filepath, 'w') as file:
-                json.dump(results, file, indent=4)
-        except SavingErrorException as e:
+            with file_lock(filepath):
+                results = self.load(filepath)
+                results.append(result.to_dict())
+                atomic_write(filepath, lambda file: json.dump(results, file, indent=4))
+        except (OSError, SavingErrorException) as e:
             print(f"Error saving result to '{filepath}': {e}.")
 
+    def save_many(self, results: list, filepath: str, fsync: bool = False):
+        try:
+            with file_lock(filepath):
+                history = self.load(filepath)
+                history.extend(results)
+                atomic_write(filepath, lambda file: json.dump(history, file, indent=4), fsync=fsync)
+        except (OSError, SavingErrorException) as e:
+            print(f"Error saving results to '{filepath}': {e}.")
+
+
+class JsonlResultRepository:
+    # append-only log with one JSON object per line, so saving a result never rewrites the history
+    def load(self, filepath: str):
+        return list(self.iter_results(filepath))
+
+    def iter_results(self, filepath: str):
+        try:
+            with open(filepath, 'r') as file:
+                for line_number, line in enumerate(file, start=1):
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        yield json.loads(line)
+                    except json.JSONDecodeError:
+                        print(f"Error decoding JSON from '{filepath}' at line {line_number}.")
+        except FileNotFoundError:
+            return
+
+    def save(self, result: Result, filepath: str):
+        self.save_many([result.to_dict()], filepath)
+
+    def save_many(self, results: list, filepath: str, fsync: bool = False):
+        # appends stay in place rather than rewriting the log; the lock keeps concurrent
+        # writers' lines whole, and the reader already skips a line truncated by a crash
+        try:
+            with file_lock(filepath):
+                append_text(filepath, ''.join(json.dumps(result) + '\n' for result in results), fsync)
+        except (OSError, SavingErrorException) as e:
+            print(f"Error saving results to '{filepath}': {e}.")
+
+    def migrate(self, source_filepath: str, filepath: str):
+        results = ResultRepository().load(source_filepath)
+        with file_lock(filepath):
+            atomic_write(filepath, lambda file: file.writelines(json.dumps(result) + '\n' for result in results))
+        return len(results)
+
+
+class SegmentedResultRepository:
+    # results are partitioned into one JSONL segment per month inside the results directory. Segments
+    # outside the hot window are compacted into gzip archives, and a manifest keeps each segment's
+    # time range and per-quiz best scores so queries can skip segments that cannot contribute.
+    MANIFEST_FILENAME = 'manifest.json'
+    UNDATED = '0000-00'
+
+    def __init__(self, hot_segments: int = 1):
+        self.hot_segments = hot_segments
+
+    @classmethod
+    def segment_key(cls, timestamp: str) -> str:
+        return timestamp[:7] if timestamp and len(timestamp) >= 7 else cls.UNDATED
+
+    def _manifest_path(self, directory: str) -> str:
+        return os.path.join(directory, self.MANIFEST_FILENAME)
+
+    def load_manifest(self, directory: str):
+        try:
+            with open(self._manifest_path(directory), 'r') as file:
+                return json.load(file)
+        except FileNotFoundError:
+            return self.rebuild_manifest(directory) if os.path.isdir(directory) else {}
+        except json.JSONDecodeError:
+            # the manifest is derived data, so a damaged one is rebuilt from the segments and
+            # written back by the next save
+            print(f"Error decoding JSON from '{self._manifest_path(directory)}', rebuilding it.")
+            return self.rebuild_manifest(directory)
+
+    def _write_manifest(self, directory: str, manifest: dict, fsync: bool = True):
+        atomic_write(self._manifest_path(directory), lambda file: json.dump(manifest, file, indent=4, sort_keys=True),
+                     fsync=fsync)
+
+    @staticmethod
+    def _new_segment(key: str):
+        return {"file": f"results-{key}.jsonl", "count": 0, "min_timestamp": None, "max_timestamp": None,
+                "best_scores": {}}
+
+    @staticmethod
+    def _update_segment(segment: dict, results: list):
+        timestamps = [result.get('timestamp', '') for result in results]
+        segment['count'] += len(results)
+        if segment['min_timestamp'] is None or min(timestamps) < segment['min_timestamp']:
+            segment['min_timestamp'] = min(timestamps)
+        if segment['max_timestamp'] is None or max(timestamps) > segment['max_timestamp']:
+            segment['max_timestamp'] = max(timestamps)
+        best_scores = segment['best_scores']
+        for result in results:
+            key = result['quiz'].lower()
+            if key not in best_scores or result['score'] > best_scores[key]:
+                best_scores[key] = result['score']
+
+    def rebuild_manifest(self, directory: str):
+        manifest = {}
+        for name in sorted(os.listdir(directory)):
+            if not name.startswith('results-') or not name.endswith(('.jsonl', '.jsonl.gz')):
+                continue
+            key = name[len('results-'):].split('.', 1)[0]
+            segment = manifest.setdefault(key, self._new_segment(key))
+            segment['file'] = name
+            results = list(self._read_segment(directory, segment))
+            if results:
+                self._update_segment(segment, results)
+        return manifest
+
+    def _read_segment(self, directory: str, segment: dict):
+        filepath = os.path.join(directory, segment['file'])
+        opener = gzip.open if filepath.endswith('.gz') else open
+        try:
+            with opener(filepath, 'rt') as file:
+                for line_number, line in enumerate(file, start=1):
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        yield json.loads(line)
+                    except json.JSONDecodeError:
+                        print(f"Error decoding JSON from '{filepath}' at line {line_number}.")
+        except FileNotFoundError:
+            return
+
+    def segments(self, directory: str, since: str = None, until: str = None, quiz: str = None):
+        manifest = self.load_manifest(directory)
+        for key in sorted(manifest):
+            segment = manifest[key]
+            if not segment['count']:
+                continue
+            if since is not None and segment['max_timestamp'] < since:
+                continue
+            if until is not None and segment['min_timestamp'] >= until:
+                continue
+            if quiz is not None and quiz.lower() not in segment['best_scores']:
+                continue
+            yield key, segment
+
+    def load(self, filepath: str):
+        return list(self.iter_results(filepath))
+
+    @staticmethod
+    def _matches(result: dict, since: str, until: str, key: str) -> bool:
+        # the time range is half-open, [since, until), like the leaderboard windows
+        timestamp = result.get('timestamp', '')
+        if since is not None and timestamp < since:
+            return False
+        if until is not None and timestamp >= until:
+            return False
+        return key is None or result['quiz'].lower() == key
+
+    def iter_results(self, filepath: str, since: str = None, until: str = None, quiz: str = None):
+        key = quiz.lower() if quiz is not None else None
+        for _, segment in self.segments(filepath, since, until, quiz):
+            for result in self._read_segment(filepath, segment):
+                if self._matches(result, since, until, key):
+                    yield result
+
+    def best_score(self, filepath: str, title: str):
+        scores = [segment['best_scores'][title.lower()] for _, segment in self.segments(filepath, quiz=title)]
+        return max(scores) if scores else None
+
+    def top_results(self, filepath: str, title: str, limit: int, since: str = None, until: str = None):
+        # only segments overlapping [since, until) are considered, read best-first, and reading stops
+        # once no remaining segment can beat the current top `limit`; sequence numbers follow segment
+        # order so ties still rank oldest first. A None title ranks all quizzes together
+        key = title.lower() if title is not None else None
+
+        def best(segment):
+            return segment['best_scores'][key] if key is not None else max(segment['best_scores'].values())
+
+        segments = list(self.segments(filepath, since, until, title))
+        ordered = sorted(enumerate(segments), key=lambda item: -best(item[1][1]))
+        index = TopKIndex(limit)
+        for position, (_, segment) in ordered:
+            if len(index) == limit and best(segment) < index.min_score():
+                break
+            for line, result in enumerate(self._read_segment(filepath, segment)):
+                if self._matches(result, since, until, key):
+                    index.add(result, (position << 32) + line)
+        return index.top()
+
+    def save(self, result: Result, filepath: str):
+        self.save_many([result.to_dict()], filepath)
+
+    def save_many(self, results: list, filepath: str, fsync: bool = False):
+        try:
+            os.makedirs(filepath, exist_ok=True)
+            with file_lock(self._manifest_path(filepath)):
+                manifest = self.load_manifest(filepath)
+                by_segment = {}
+                for result in results:
+                    by_segment.setdefault(self.segment_key(result.get('timestamp', '')), []).append(result)
+                for key, segment_results in by_segment.items():
+                    self._update_segment(manifest.setdefault(key, self._new_segment(key)), segment_results)
+                # the manifest goes first: if the append is lost it over-reports, which only costs a
+                # wasted segment read, whereas under-reporting would let queries skip real results
+                self._write_manifest(filepath, manifest, fsync)
+                for key, segment_results in by_segment.items():
+                    text = ''.join(json.dumps(result) + '\n' for result in segment_results)
+                    segment_filepath = os.path.join(filepath, manifest[key]['file'])
+                    if segment_filepath.endswith('.gz'):
+                        self._append_compressed(segment_filepath, text, fsync)
+                    else:
+                        append_text(segment_filepath, text, fsync)
+        except (OSError, SavingErrorException) as e:
+            print(f"Error saving results to '{filepath}': {e}.")
+
+    @staticmethod
+    def _append_compressed(filepath: str, text: str, fsync: bool):
+        # late results for a compacted month go in as an extra gzip member, which readers
+        # decompress transparently
+        with open(filepath, 'ab') as file:
+            with gzip.GzipFile(fileobj=file, mode='ab') as archive:
+                archive.write(text.encode('utf-8'))
+            if fsync:
+                file.flush()
+                os.fsync(file.fileno())
+
+    def compact(self, filepath: str) -> int:
+        if not os.path.isdir(filepath):
+            return 0
+        compacted = 0
+        with file_lock(self._manifest_path(filepath)):
+            manifest = self.load_manifest(filepath)
+            cold = sorted(manifest)[:-self.hot_segments] if self.hot_segments else sorted(manifest)
+            for key in cold:
+                segment = manifest[key]
+                if segment['file'].endswith('.gz'):
+                    continue
+                source = os.path.join(filepath, segment['file'])
+                archive = source + '.gz'
+                tmp_archive = archive + '.tmp'
+                try:
+                    with open(source, 'rb') as file, gzip.open(tmp_archive, 'wb') as compressed:
+                        compressed.writelines(file)
+                    os.replace(tmp_archive, archive)
+                except FileNotFoundError:
+                    continue
+                segment['file'] += '.gz'
+                self._write_manifest(filepath, manifest)
+                os.remove(source)
+                compacted += 1
+        return compacted
+
+    def migrate(self, source_filepath: str, filepath: str):
+        source = JsonlResultRepository() if source_filepath.endswith('.jsonl') else ResultRepository()
+        results = source.load(source_filepath)
+        self.save_many(results, filepath, fsync=True)
+        return len(results)
@@ -0,0 +1,207 @@
+import heapq
+from array import array
+from datetime import datetime, timedelta, timezone
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+EPOCH = datetime(1970, 1, 1)
+MICROSECOND = timedelta(microseconds=1)
+# results saved before timestamps existed (or with unparsable ones) sort before every real timestamp
+MISSING_TIMESTAMP = -2 ** 63
+SORT_FIELDS = ('score', 'timestamp')
+AGGREGATES = ('count', 'sum', 'max')
+
+
+def encode_timestamp(timestamp: str) -> int:
+    try:
+        moment = datetime.fromisoformat(timestamp)
+    except (TypeError, ValueError):
+        return MISSING_TIMESTAMP
+    if moment.tzinfo is not None:
+        moment = moment.astimezone(timezone.utc).replace(tzinfo=None)
+    delta = moment - EPOCH
+    return (delta.days * 86400 + delta.seconds) * 1_000_000 + delta.microseconds
+
+
+def decode_timestamp(micros: int) -> str:
+    if micros == MISSING_TIMESTAMP:
+        return ''
+    return (EPOCH + micros * MICROSECOND).isoformat()
+
+
+class ColumnarResultStore:
+    # one row per result, one typed array per column: users and quizzes are dictionary-encoded,
+    # scores fit in 16 bits and timestamps are int64 epoch microseconds
+    def __init__(self):
+        self.user_ids = array('I')
+        self.quiz_ids = array('I')
+        self.scores = array('H')
+        self.timestamps = array('q')
+        self.users = []
+        self.quizzes = []
+        self._user_codes = {}
+        self._quiz_codes = {}
+        # folded quiz title -> ids of every spelling seen, since quiz lookups are case-insensitive
+        self._quiz_keys = {}
+
+    def __len__(self):
+        return len(self.scores)
+
+    @staticmethod
+    def _encode(value: str, values: list, codes: dict) -> int:
+        code = codes.get(value)
+        if code is None:
+            code = codes[value] = len(values)
+            values.append(value)
+        return code
+
+    def append(self, result: dict) -> int:
+        position = len(self.scores)
+        # the score goes first so an out-of-range one is rejected before any other column grows
+        self.scores.append(result['score'])
+        quiz = result['quiz']
+        if quiz not in self._quiz_codes:
+            self._quiz_keys.setdefault(quiz.lower(), []).append(len(self.quizzes))
+        self.quiz_ids.append(self._encode(quiz, self.quizzes, self._quiz_codes))
+        self.user_ids.append(self._encode(result['user'], self.users, self._user_codes))
+        self.timestamps.append(encode_timestamp(result.get('timestamp', '')))
+        return position
+
+    def row(self, position: int) -> dict:
+        return {"user": self.users[self.user_ids[position]], "quiz": self.quizzes[self.quiz_ids[position]],
+                "score": self.scores[position], "timestamp": decode_timestamp(self.timestamps[position])}
+
+    def rows(self, positions) -> list:
+        return [self.row(position) for position in positions]
+
+    def quiz_codes(self, title: str) -> list:
+        return self._quiz_keys.get(title.lower(), [])
+
+    def _column(self, name: str):
+        # a zero-copy view; it must not outlive the query, because an array cannot grow while viewed
+        column = getattr(self, name)
+        return np.frombuffer(column, dtype=column.typecode) if len(column) else np.array([], dtype=column.typecode)
+
+    def positions(self, user: str = None, quiz: str = None, since: str = None, until: str = None) -> list:
+        user_code = self._user_codes.get(user) if user is not None else None
+        quiz_codes = self.quiz_codes(quiz) if quiz is not None else None
+        if (user is not None and user_code is None) or (quiz is not None and not quiz_codes):
+            return []
+        since = encode_timestamp(since) if since is not None else None
+        until = encode_timestamp(until) if until is not None else None
+
+        if np is not None:
+            mask = np.ones(len(self), dtype=bool)
+            if user_code is not None:
+                mask &= self._column('user_ids') == user_code
+            if quiz_codes is not None:
+                mask &= np.isin(self._column('quiz_ids'), quiz_codes)
+            if since is not None or until is not None:
+                timestamps = self._column('timestamps')
+                if since is not None:
+                    mask &= timestamps >= since
+                if until is not None:
+                    mask &= timestamps <= until
+            return np.flatnonzero(mask).tolist()
+
+        quiz_codes = set(quiz_codes) if quiz_codes is not None else None
+        return [position for position in range(len(self))
+                if (user_code is None or self.user_ids[position] == user_code)
+                and (quiz_codes is None or self.quiz_ids[position] in quiz_codes)
+                and (since is None or self.timestamps[position] >= since)
+                and (until is None or self.timestamps[position] <= until)]
+
+    def top_k(self, k: int, positions=None) -> list:
+        # highest scores first; among equal scores the earliest result wins, like a stable sort
+        if positions is None:
+            positions = range(len(self))
+        if np is None:
+            return heapq.nsmallest(k, positions, key=lambda position: (-self.scores[position], position))
+
+        candidates = np.asarray(positions, dtype=np.int64)
+        scores = self._column('scores')[candidates].astype(np.int32)
+        if len(candidates) > k > 0:
+            threshold = np.partition(scores, len(scores) - k)[len(scores) - k]
+            above = candidates[scores > threshold]
+            tied = candidates[scores == threshold]
+            candidates = np.sort(np.concatenate((above, tied[:k - len(above)])))
+            scores = self._column('scores')[candidates].astype(np.int32)
+        order = np.lexsort((candidates, -scores))
+        return candidates[order][:k].tolist()
+
+    def sort_positions(self, positions, by: str = 'score', descending: bool = True, offset: int = 0,
+                       limit: int = None) -> list:
+        if by not in SORT_FIELDS:
+            raise ValueError(f"Cannot sort results by '{by}'.")
+        column = self.scores if by == 'score' else self.timestamps
+        end = None if limit is None else offset + limit
+        if np is None:
+            return sorted(positions, key=column.__getitem__, reverse=descending)[offset:end]
+
+        positions = np.array(positions, dtype=np.int64)
+        keys = self._column('scores' if by == 'score' else 'timestamps')[positions].astype(np.int64)
+        if descending:
+            # a stable sort on the order-reversed key keeps equal rows in save order
+            keys = ~keys
+        return positions[np.argsort(keys, kind='stable')][offset:end].tolist()
+
+    @staticmethod
+    def _group_max(codes, scores, groups: int):
+        levels = int(scores.max()) + 1 if len(scores) else 1
+        if groups * levels > max(4 * len(scores), 1 << 20):
+            values = np.full(groups, -1, dtype=np.int64)
+            np.maximum.at(values, codes, scores)
+            return values
+        # scores are small integers, so a (group, score) histogram finds every group's maximum in one
+        # bincount pass, far quicker than the unbuffered np.maximum.at
+        histogram = np.bincount(codes.astype(np.int64) * levels + scores, minlength=groups * levels)
+        present = histogram.reshape(groups, levels) > 0
+        return levels - 1 - np.argmax(present[:, ::-1], axis=1)
+
+    def group_by(self, column: str = 'quiz', aggregate: str = 'count', positions=None) -> dict:
+        if column not in ('quiz', 'user'):
+            raise ValueError(f"Cannot group results by '{column}'.")
+        if aggregate not in AGGREGATES:
+            raise ValueError(f"Unknown aggregate '{aggregate}'.")
+        names = self.quizzes if column == 'quiz' else self.users
+        codes_column = 'quiz_ids' if column == 'quiz' else 'user_ids'
+
+        if np is not None:
+            codes = self._column(codes_column)
+            scores = self._column('scores')
+            if positions is not None:
+                positions = np.asarray(positions, dtype=np.int64)
+                codes, scores = codes[positions], scores[positions]
+            counts = np.bincount(codes, minlength=len(names))
+            if aggregate == 'count':
+                values = counts
+            elif aggregate == 'sum':
+                values = np.bincount(codes, weights=scores, minlength=len(names)).astype(np.int64)
+            else:
+                values = self._group_max(codes, scores, len(names))
+            by_code = {code: int(values[code]) for code in np.flatnonzero(counts).tolist()}
+        else:
+            ids = getattr(self, codes_column)
+            by_code = {}
+            for position in (range(len(self)) if positions is None else positions):
+                code, score = ids[position], self.scores[position]
+                value = 1 if aggregate == 'count' else score
+                if code not in by_code:
+                    by_code[code] = value
+                elif aggregate == 'max':
+                    by_code[code] = max(by_code[code], value)
+                else:
+                    by_code[code] += value
+
+        if column == 'user':
+            return {names[code]: value for code, value in by_code.items()}
+        # spellings of one quiz title are folded into the first one seen
+        grouped = {}
+        for codes in self._quiz_keys.values():
+            values = [by_code[code] for code in codes if code in by_code]
+            if values:
+                grouped[names[codes[0]]] = max(values) if aggregate == 'max' else sum(values)
+        return grouped
@@ -0,0 +1,86 @@
+import threading
+from models import Result
+
+DURABILITY_MODES = ('fsync', 'none')
+
+
+class BufferedResultWriter:
+    # group commit: results are queued in memory and written in batches by a background thread,
+    # so a burst of finished quizzes costs one write (and at most one fsync) instead of one per result
+    def __init__(self, result_repository, max_batch: int = 64, flush_interval: float = 1.0,
+                 durability: str = 'fsync', start: bool = True):
+        if durability not in DURABILITY_MODES:
+            raise ValueError(f"Durability must be one of {', '.join(DURABILITY_MODES)}, got '{durability}'.")
+        self.result_repository = result_repository
+        self.max_batch = max_batch
+        self.flush_interval = flush_interval
+        self.durability = durability
+        self._pending = []
+        self._condition = threading.Condition()
+        # held for the whole write so batches reach the repository in the order they were queued
+        self._write_lock = threading.Lock()
+        self._closed = False
+        self._thread = None
+        if start:
+            self._thread = threading.Thread(target=self._run, name='result-writer', daemon=True)
+            self._thread.start()
+
+    def __len__(self):
+        with self._condition:
+            return len(self._pending)
+
+    def save(self, result: Result, filepath: str):
+        with self._condition:
+            if self._closed:
+                raise RuntimeError("Result writer is closed.")
+            self._pending.append((filepath, result.to_dict()))
+            if len(self._pending) >= self.max_batch:
+                self._condition.notify()
+
+    def pending(self, filepath: str = None):
+        with self._condition:
+            return [result for path, result in self._pending if filepath is None or path == filepath]
+
+    def load(self, filepath: str):
+        return list(self.iter_results(filepath))
+
+    def iter_results(self, filepath: str, **filters):
+        # queued results are written first so the history read back includes them exactly once
+        self.flush()
+        return self.result_repository.iter_results(filepath, **filters)
+
+    def top_results(self, filepath: str, *args, **kwargs):
+        self.flush()
+        return self.result_repository.top_results(filepath, *args, **kwargs)
+
+    def flush(self):
+        with self._write_lock:
+            with self._condition:
+                batch, self._pending = self._pending, []
+            if batch:
+                self._write(batch)
+
+    def _write(self, batch: list):
+        by_file = {}
+        for filepath, result in batch:
+            by_file.setdefault(filepath, []).append(result)
+        for filepath, results in by_file.items():
+            self.result_repository.save_many(results, filepath, fsync=self.durability == 'fsync')
+
+    def _run(self):
+        while True:
+            with self._condition:
+                if not self._closed and len(self._pending) < self.max_batch:
+                    self._condition.wait(self.flush_interval)
+                closed = self._closed
+            self.flush()
+            if closed:
+                return
+
+    def close(self):
+        with self._condition:
+            self._closed = True
+            self._condition.notify()
+        if self._thread is not None:
+            self._thread.join()
+        self.flush()
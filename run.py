@@ -1,48 +1,112 @@
-from repositories import UserRepository, AdminRepository, QuizRepository, ResultRepository
+import os
+import asyncio
+import argparse
+from repositories import UserRepository, AdminRepository, QuizRepository, SegmentedResultRepository
+from sqlite_repositories import (SqliteUserRepository, SqliteAdminRepository, SqliteQuizRepository,
+                                 SqliteResultRepository)
 from services import UserService, QuizService, ResultService
+from result_writer import BufferedResultWriter
+from sessions import SessionEngine
 from interfaces import UserMenu, AdminMenu
+from server import QuizServer
 from custom_exceptions import InvalidChoiceException
 
 
 class QuizApp:
-    def __init__(self):
-        user_repo = UserRepository('user_credentials.json')
-        admin_repo = AdminRepository('admin_credentials.json')
-        quiz_repo = QuizRepository('quizzes')
-        result_repo = ResultRepository()
+    def __init__(self, storage: str = 'json', db_path: str = 'quiz.db', durability: str = 'fsync'):
+        if storage == 'sqlite':
+            user_repo = SqliteUserRepository(db_path)
+            admin_repo = SqliteAdminRepository(db_path)
+            quiz_repo = SqliteQuizRepository(db_path, 'quizzes')
+            result_repo = SqliteResultRepository(db_path)
+            result_filepath = db_path
+        else:
+            user_repo = UserRepository('user_credentials.json')
+            admin_repo = AdminRepository('admin_credentials.json')
+            quiz_repo = QuizRepository('quizzes')
+            result_repo = SegmentedResultRepository()
+            result_filepath = 'results'
+            if not os.path.exists(result_filepath):
+                for legacy_filepath in ('results.jsonl', 'results.json'):
+                    if os.path.exists(legacy_filepath):
+                        result_repo.migrate(legacy_filepath, result_filepath)
+                        break
+            result_repo.compact(result_filepath)
 
         self.user_service = UserService(user_repo, admin_repo)
         self.quiz_service = QuizService(quiz_repo)
-        self.result_service = ResultService(result_repo)
+        for filepath, error in self.quiz_service.load_errors:
+            print(f"Skipped quiz file '{filepath}': {error}")
+        if storage == 'sqlite':
+            # every SQLite commit is already a durable batch; buffering in front of it would hide results
+            # from the pushed-down queries and from other processes sharing the database
+            self.result_writer = None
+            self.result_service = ResultService(result_repo, result_filepath)
+        else:
+            self.result_writer = BufferedResultWriter(result_repo, durability=durability)
+            self.result_service = ResultService(self.result_writer, result_filepath)
 
-        self.user_menu = UserMenu(self.user_service, self.quiz_service, self.result_service)
+        self.session_engine = SessionEngine(self.quiz_service, self.result_service)
+
+        self.user_menu = UserMenu(self.user_service, self.quiz_service, self.result_service,
+                                  session_engine=self.session_engine)
         self.admin_menu = AdminMenu(self.user_service, self.quiz_service, self.result_service)
 
     def run(self):
         print("\nWelcome to the 'QuizApp'!")
 
-        while True:
-            try:
-                print("\n---> Main Menu")
-                print("1. User Interface")
-                print("2. Admin Tools")
-                print("0. Exit")
-
-                choice = input("Select an option: ")
-                if choice == '1':
-                    self.user_menu.log_in()
-                elif choice == '2':
-                    self.admin_menu.display_menu()
-                elif choice == '0':
-                    print("Goodbye!")
-                    break
-                else:
-                    raise InvalidChoiceException()
-            except InvalidChoiceException as e:
-                print(e)
+        try:
+            while True:
+                try:
+                    print("\n---> Main Menu")
+                    print("1. User Interface")
+                    print("2. Admin Tools")
+                    print("0. Exit")
+
+                    choice = input("Select an option: ")
+                    if choice == '1':
+                        self.user_menu.log_in()
+                    elif choice == '2':
+                        self.admin_menu.display_menu()
+                    elif choice == '0':
+                        print("Goodbye!")
+                        break
+                    else:
+                        raise InvalidChoiceException()
+                except InvalidChoiceException as e:
+                    print(e)
+        finally:
+            self.close()
+
+    def close(self):
+        if self.result_writer is not None:
+            self.result_writer.close()
+
+    def serve(self, host: str = '127.0.0.1', port: int = 8080):
+        server = QuizServer(self.user_service, self.quiz_service, self.result_service, self.session_engine)
+        try:
+            asyncio.run(server.serve_forever(host, port))
+        except KeyboardInterrupt:
+            print("Goodbye!")
+        finally:
+            server.executor.shutdown()
+            self.close()
 
 
 if __name__ == '__main__':
-    app = QuizApp()
-    app.run()
+    parser = argparse.ArgumentParser(description="Run the QuizApp console.")
+    parser.add_argument('--storage', choices=['json', 'sqlite'], default='json')
+    parser.add_argument('--db', default='quiz.db', help="SQLite database path (with --storage sqlite)")
+    parser.add_argument('--durability', choices=['fsync', 'none'], default='fsync',
+                        help="fsync every batch of saved results, or leave flushing to the OS (JSON storage)")
+    parser.add_argument('--serve', action='store_true', help="serve the HTTP/JSON API instead of the console")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    args = parser.parse_args()
+
+    app = QuizApp(args.storage, args.db, args.durability)
+    if args.serve:
+        app.serve(args.host, args.port)
+    else:
+        app.run()
 
@@ -0,0 +1,306 @@
+import json
+import time
+import asyncio
+import secrets
+from datetime import date
+from urllib.parse import urlsplit, parse_qs, unquote
+from concurrent.futures import ThreadPoolExecutor
+from models import User, Question
+from services import UserService, QuizService, ResultService
+from sessions import SessionEngine
+from indexes import WINDOWS
+from custom_exceptions import (UserNotFoundException, UserAlreadyExistsException, QuizNotFoundException,
+                               InvalidAnswerException, SessionNotFoundException)
+
+MAX_BODY = 64 * 1024
+REASONS = {200: 'OK', 201: 'Created', 400: 'Bad Request', 401: 'Unauthorized', 404: 'Not Found',
+           405: 'Method Not Allowed', 409: 'Conflict', 413: 'Payload Too Large', 500: 'Internal Server Error'}
+
+
+class HttpError(Exception):
+    def __init__(self, status: int, message: str):
+        self.status = status
+        self.message = message
+        super().__init__(self.message)
+
+
+def question_payload(session, question: Question):
+    if question is None:
+        return None
+    return {"number": session.number, "text": question.text, "options": list(question.options)}
+
+
+class QuizServer:
+    # a small HTTP/1.1 + JSON front-end on asyncio streams: the event loop only parses requests and
+    # keeps connections open, while every service call (and so all repository I/O) runs in the executor
+    def __init__(self, user_service: UserService, quiz_service: QuizService, result_service: ResultService,
+                 session_engine: SessionEngine = None, executor=None, workers: int = 4,
+                 session_timeout: float = 1800):
+        self.user_service = user_service
+        self.quiz_service = quiz_service
+        self.result_service = result_service
+        self.session_engine = session_engine or SessionEngine(quiz_service, result_service)
+        self.executor = executor or ThreadPoolExecutor(max_workers=workers, thread_name_prefix='quiz-server')
+        self.session_timeout = session_timeout
+        # token -> (user, last used); only touched from the event loop. A token idle for longer than
+        # session_timeout is dropped, like the quiz sessions started with it
+        self.tokens = {}
+        self.connections = 0
+
+    async def _call(self, function, *args):
+        return await asyncio.get_running_loop().run_in_executor(self.executor, function, *args)
+
+    async def start(self, host: str = '127.0.0.1', port: int = 8080):
+        return await asyncio.start_server(self._handle_connection, host, port, backlog=4096)
+
+    async def serve_forever(self, host: str = '127.0.0.1', port: int = 8080):
+        server = await self.start(host, port)
+        addresses = ', '.join(f"{sock.getsockname()[0]}:{sock.getsockname()[1]}" for sock in server.sockets)
+        print(f"QuizApp server listening on {addresses}")
+        expiry = asyncio.create_task(self._expire_sessions())
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            expiry.cancel()
+
+    async def _expire_sessions(self):
+        while True:
+            await asyncio.sleep(min(60, self.session_timeout))
+            self.expire_tokens(self.session_timeout)
+            await self._call(self.session_engine.expire, self.session_timeout)
+
+    def expire_tokens(self, idle_seconds: float) -> int:
+        cutoff = time.monotonic() - idle_seconds
+        stale = [token for token, (_, last_used) in self.tokens.items() if last_used < cutoff]
+        for token in stale:
+            del self.tokens[token]
+        return len(stale)
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.connections += 1
+        try:
+            while True:
+                try:
+                    request = await self._read_request(reader)
+                except HttpError as e:
+                    self._write_response(writer, e.status, {"error": e.message}, keep_alive=False)
+                    await writer.drain()
+                    break
+                if request is None:
+                    break
+                method, target, version, headers, body = request
+                status, payload = await self._dispatch(method, target, headers, body)
+                connection = headers.get('connection', '').lower()
+                keep_alive = connection != 'close' and (version == 'HTTP/1.1' or connection == 'keep-alive')
+                self._write_response(writer, status, payload, keep_alive)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            self.connections -= 1
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+    @staticmethod
+    async def _read_request(reader: asyncio.StreamReader):
+        try:
+            # the whole head in one read rather than a readline per header
+            head = await reader.readuntil(b'\r\n\r\n')
+        except asyncio.IncompleteReadError as e:
+            if not e.partial.strip():
+                return None
+            raise HttpError(400, "Incomplete request head.") from None
+        except asyncio.LimitOverrunError:
+            raise HttpError(400, "Request head too long.") from None
+        request_line, *lines = head.decode('latin-1').split('\r\n')
+        try:
+            method, target, version = request_line.split()
+        except ValueError:
+            raise HttpError(400, "Malformed request line.") from None
+        headers = {}
+        for line in lines:
+            name, _, value = line.partition(':')
+            if name:
+                headers[name.strip().lower()] = value.strip()
+        try:
+            length = int(headers.get('content-length', 0))
+        except ValueError:
+            raise HttpError(400, "Invalid Content-Length.") from None
+        if length > MAX_BODY:
+            raise HttpError(413, f"Request body is larger than {MAX_BODY} bytes.")
+        body = await reader.readexactly(length) if length > 0 else b''
+        return method.upper(), target, version.upper(), headers, body
+
+    @staticmethod
+    def _write_response(writer: asyncio.StreamWriter, status: int, payload, keep_alive: bool):
+        body = json.dumps(payload).encode('utf-8')
+        head = (f"HTTP/1.1 {status} {REASONS.get(status, 'Unknown')}\r\n"
+                f"Content-Type: application/json\r\n"
+                f"Content-Length: {len(body)}\r\n"
+                f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+        writer.write(head.encode('latin-1') + body)
+
+    async def _dispatch(self, method: str, target: str, headers: dict, body: bytes):
+        url = urlsplit(target)
+        parts = [unquote(part) for part in url.path.strip('/').split('/') if part]
+        query = {name: values[-1] for name, values in parse_qs(url.query).items()}
+        try:
+            data = json.loads(body) if body else {}
+            if not isinstance(data, dict):
+                raise HttpError(400, "Request body must be a JSON object.")
+        except ValueError:
+            return 400, {"error": "Request body is not valid JSON."}
+        except HttpError as e:
+            return e.status, {"error": e.message}
+
+        try:
+            return await self._route(method, parts, query, headers, data)
+        except HttpError as e:
+            return e.status, {"error": e.message}
+        except (UserNotFoundException, SessionNotFoundException, QuizNotFoundException) as e:
+            return 404, {"error": str(e)}
+        except InvalidAnswerException as e:
+            return 400, {"error": str(e)}
+        except Exception as e:
+            return 500, {"error": f"{type(e).__name__}: {e}"}
+
+    async def _route(self, method: str, parts: list, query: dict, headers: dict, data: dict):
+        if parts == ['register']:
+            self._allow(method, 'POST')
+            return await self.register(data)
+        if parts == ['login']:
+            self._allow(method, 'POST')
+            return await self.login(data)
+        if parts == ['quizzes']:
+            self._allow(method, 'GET')
+            return await self.list_quizzes()
+        if parts == ['leaderboard']:
+            self._allow(method, 'GET')
+            return await self.leaderboard(query)
+        if parts and parts[0] == 'sessions':
+            user = self._authorize(headers)
+            if len(parts) == 1:
+                self._allow(method, 'POST')
+                return await self.start_session(user, data)
+            session = self._owned_session(user, parts[1])
+            if len(parts) == 2:
+                self._allow(method, 'GET')
+                return await self.current_question(session)
+            if len(parts) == 3 and parts[2] == 'answer':
+                self._allow(method, 'POST')
+                return await self.answer(session, data)
+            if len(parts) == 3 and parts[2] == 'finish':
+                self._allow(method, 'POST')
+                return await self.finish(session)
+        raise HttpError(404, f"No such endpoint: /{'/'.join(parts)}")
+
+    @staticmethod
+    def _allow(method: str, allowed: str):
+        if method != allowed:
+            raise HttpError(405, f"Use {allowed} for this endpoint.")
+
+    @staticmethod
+    def _field(data: dict, name: str, kind=str):
+        value = data.get(name)
+        if not isinstance(value, kind):
+            raise HttpError(400, f"Field '{name}' is required.")
+        return value
+
+    def _authorize(self, headers: dict) -> User:
+        scheme, _, token = headers.get('authorization', '').partition(' ')
+        entry = self.tokens.get(token) if scheme.lower() == 'bearer' else None
+        if entry is None:
+            raise HttpError(401, "Log in first and send 'Authorization: Bearer <token>'.")
+        user = entry[0]
+        self.tokens[token] = (user, time.monotonic())
+        return user
+
+    def _owned_session(self, user: User, session_id: str):
+        session = self.session_engine.sessions.get(session_id)
+        # someone else's session is reported exactly like a missing one
+        if session is None or session.user is not user:
+            raise SessionNotFoundException(f"Quiz session '{session_id}' not found.")
+        return session
+
+    async def register(self, data: dict):
+        login, password = self._field(data, 'login'), self._field(data, 'password')
+        try:
+            birth_date = date.fromisoformat(self._field(data, 'birth_date'))
+        except ValueError:
+            raise HttpError(400, "Invalid date format. Please use YYYY-MM-DD and try again.") from None
+        try:
+            await self._call(self.user_service.register_user, User(login, password, birth_date))
+        except UserAlreadyExistsException as e:
+            raise HttpError(409, str(e)) from None
+        return 201, {"login": login}
+
+    async def login(self, data: dict):
+        login, password = self._field(data, 'login'), self._field(data, 'password')
+        try:
+            user = await self._call(self.user_service.authenticate_user, login, password)
+        except UserNotFoundException as e:
+            raise HttpError(401, str(e)) from None
+        token = secrets.token_urlsafe(24)
+        self.tokens[token] = (user, time.monotonic())
+        return 200, {"token": token, "login": user.login}
+
+    async def list_quizzes(self):
+        def quizzes():
+            return [{"title": entry.title, "questions": entry.question_count} for entry in self.quiz_service.quizzes]
+
+        return 200, {"quizzes": await self._call(quizzes)}
+
+    async def leaderboard(self, query: dict):
+        title = query.get('quiz')
+        window = query.get('window', 'all')
+        if window == 'players':
+            if title:
+                results = await self._call(self.result_service.get_distinct_top_results, title)
+            else:
+                results = await self._call(self.result_service.get_distinct_total_top_results)
+        elif window in WINDOWS:
+            if title:
+                results = await self._call(self.result_service.get_top_results, title, window)
+            else:
+                results = await self._call(self.result_service.get_total_top_results, window)
+        else:
+            raise HttpError(400, f"Window must be one of {', '.join(WINDOWS + ('players',))}.")
+        return 200, {"quiz": title, "window": window, "results": list(results)}
+
+    async def start_session(self, user: User, data: dict):
+        engine = self.session_engine
+
+        def start():
+            session = engine.start(user, self._field(data, 'quiz'))
+            return session, engine.next_question(session.session_id)
+
+        session, question = await self._call(start)
+        return 201, {"session": session.session_id, "quiz": session.quiz_title,
+                     "question": question_payload(session, question)}
+
+    async def current_question(self, session):
+        question = await self._call(self.session_engine.next_question, session.session_id)
+        return 200, {"session": session.session_id, "score": session.score,
+                     "question": question_payload(session, question)}
+
+    async def answer(self, session, data: dict):
+        answer = self._field(data, 'answer', list)
+        if not all(isinstance(number, int) and not isinstance(number, bool) for number in answer):
+            raise HttpError(400, "Field 'answer' must be a list of option numbers.")
+        engine = self.session_engine
+
+        def submit():
+            correct = engine.submit_answer(session.session_id, [number - 1 for number in answer])
+            return correct, engine.next_question(session.session_id)
+
+        correct, question = await self._call(submit)
+        return 200, {"correct": correct, "score": session.score, "question": question_payload(session, question)}
+
+    async def finish(self, session):
+        return 200, await self._call(self.session_engine.finish, session.session_id)
@@ -1,7 +1,17 @@
 import os
 import random
+import asyncio
+from bisect import bisect_right
+from itertools import accumulate, repeat
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+import threading
+from collections import OrderedDict
 from models import User, Admin, Quiz, Result
-from repositories import UserRepository, AdminRepository, QuizRepository, ResultRepository
+from rwlock import ReadWriteLock
+from indexes import ResultIndex
+from repositories import UserRepository, AdminRepository, QuizRepository, ResultRepository, SegmentedResultRepository
+from async_repositories import AsyncUserRepository, AsyncAdminRepository, AsyncResultRepository
+from sqlite_repositories import SqliteResultRepository
 from custom_exceptions import UserNotFoundException, UserAlreadyExistsException, QuizNotFoundException
 
 
@@ -9,65 +19,349 @@ class UserService:
     def __init__(self, user_repository: UserRepository, admin_repository: AdminRepository):
         self.user_repository = user_repository
         self.admin_repository = admin_repository
+        # guards the account lists and their login indexes; file I/O happens outside it
+        self._lock = ReadWriteLock()
         self.users = self.user_repository.load()
         self.admins = self.admin_repository.load()
 
+    @staticmethod
+    def _build_index(accounts: list) -> dict:
+        index = {}
+        for position, account in enumerate(accounts):
+            index.setdefault(account.login.casefold(), position)
+        return index
+
+    @property
+    def users(self) -> list:
+        return self._users
+
+    @users.setter
+    def users(self, users: list):
+        index = self._build_index(users)
+        with self._lock.write():
+            self._users = users
+            self._user_index = index
+
+    @property
+    def admins(self) -> list:
+        return self._admins
+
+    @admins.setter
+    def admins(self, admins: list):
+        index = self._build_index(admins)
+        with self._lock.write():
+            self._admins = admins
+            self._admin_index = index
+
+    def get_user(self, login: str) -> User:
+        with self._lock.read():
+            position = self._user_index.get(login.casefold())
+            if position is not None:
+                return self._users[position]
+        raise UserNotFoundException(f"User '{login}' not found.")
+
     def authenticate_user(self, login: str, password: str) -> User:
-        for user in self.users:
-            if user.login.lower() == login.lower() and user.password == password:
-                return user
+        with self._lock.read():
+            position = self._user_index.get(login.casefold())
+            if position is not None and self._users[position].password == password:
+                return self._users[position]
         raise UserNotFoundException(f"User '{login}' not found or invalid password.")
 
     def authenticate_admin(self, login: str, password: str) -> Admin:
-        for admin in self.admins:
-            if admin.login.lower() == login.lower() and admin.password == password:
-                return admin
+        with self._lock.read():
+            position = self._admin_index.get(login.casefold())
+            if position is not None and self._admins[position].password == password:
+                return self._admins[position]
         raise UserNotFoundException(f"Admin '{login}' not found or invalid password.")
 
+    def _claim_login(self, user: User):
+        # the check and the append happen under one write lock, so two threads cannot register one login
+        key = user.login.casefold()
+        with self._lock.write():
+            if key in self._user_index:
+                raise UserAlreadyExistsException(f"User '{user.login}' already exists.")
+            self._user_index[key] = len(self._users)
+            self._users.append(user)
+
+    def _release_login(self, user: User):
+        # undoes a claim whose save was refused, e.g. because another process registered the login first
+        with self._lock.write():
+            self._users = [u for u in self._users if u is not user]
+            self._user_index = self._build_index(self._users)
+
+    def _replace_user(self, user: User):
+        with self._lock.write():
+            position = self._user_index.get(user.login.casefold())
+            if position is not None:
+                self._users[position] = user
+
     def register_user(self, user: User) -> bool:
-        if any(u.login.lower() == user.login.lower() for u in self.users):
-            raise UserAlreadyExistsException(f"User '{user.login}' already exists.")
-        else:
-            print("Registration successful. You can log in now.")
-            self.users.append(user)
+        self._claim_login(user)
+        try:
             self.user_repository.save(user)
-            return True
+        except UserAlreadyExistsException:
+            self._release_login(user)
+            raise
+        print("Registration successful. You can log in now.")
+        return True
 
     def save_user(self, user: User):
-        for i, u in enumerate(self.users):
-            if u.login == user.login:
-                self.users[i] = user
-                break
-        self.user_repository.save_all(self.users)
+        self._replace_user(user)
+        self.user_repository.update(user)
 
     def save_admin(self, admin: Admin):
         self.admin_repository.save(admin)
 
 
+class AsyncUserService(UserService):
+    # lookups stay synchronous (they only touch memory); everything that reaches a file is awaited.
+    # Build it with `await AsyncUserService.create(...)`, which loads the accounts without blocking
+    def __init__(self, user_repository: AsyncUserRepository, admin_repository: AsyncAdminRepository):
+        self.user_repository = user_repository
+        self.admin_repository = admin_repository
+        self._lock = ReadWriteLock()
+        self.users = []
+        self.admins = []
+
+    @classmethod
+    async def create(cls, user_repository: AsyncUserRepository, admin_repository: AsyncAdminRepository):
+        service = cls(user_repository, admin_repository)
+        await service.reload()
+        return service
+
+    async def reload(self):
+        self.users, self.admins = await asyncio.gather(self.user_repository.load(), self.admin_repository.load())
+
+    async def register_user(self, user: User) -> bool:
+        # claimed before the write is awaited, so a second registration of the same login fails at once
+        self._claim_login(user)
+        try:
+            await self.user_repository.save(user)
+        except UserAlreadyExistsException:
+            self._release_login(user)
+            raise
+        return True
+
+    async def save_user(self, user: User):
+        self._replace_user(user)
+        await self.user_repository.update(user)
+
+    async def save_admin(self, admin: Admin):
+        await self.admin_repository.save(admin)
+
+
+class QuizCatalogEntry:
+    def __init__(self, filepath: str, signature, digest, title: str, question_count: int):
+        self.filepath = filepath
+        self.signature = signature
+        self.digest = digest
+        self.title = title
+        self.question_count = question_count
+
+
+def scan_quiz_file(quiz_repository: QuizRepository, filepath: str, entry: QuizCatalogEntry):
+    # runs in a worker: returns the (possibly new) catalog entry, whether it changed, and the error if any
+    signature = quiz_repository.get_file_signature(filepath)
+    if entry is not None and entry.signature == signature:
+        return entry, False, None
+    digest = quiz_repository.get_file_hash(filepath)
+    if entry is not None and entry.digest == digest:
+        return QuizCatalogEntry(filepath, signature, digest, entry.title, entry.question_count), False, None
+    try:
+        title, question_count = quiz_repository.read_header(filepath)
+    except Exception as e:
+        return QuizCatalogEntry(filepath, signature, digest, None, 0), True, e
+    return QuizCatalogEntry(filepath, signature, digest, title, question_count), True, None
+
+
 class QuizService:
-    def __init__(self, quiz_repository: QuizRepository):
+    def __init__(self, quiz_repository: QuizRepository, cache_size: int = 16, workers: int = 1,
+                 pool: str = 'thread', stream_threshold: int = 1000):
         self.quiz_repository = quiz_repository
-        self.quizzes = self.load_all_quizzes()
+        self.cache_size = cache_size
+        self.stream_threshold = stream_threshold
+        self.workers = workers
+        self.pool = pool
+        self.cache = OrderedDict()
+        # the LRU order changes on every hit, so even readers take this (briefly; loads happen outside it)
+        self._cache_lock = threading.Lock()
+        # refreshes are serialized with each other, but never block readers
+        self._refresh_lock = threading.Lock()
+        self.catalog = {}
+        self.load_errors = []
+        self._snapshot = ([], {}, [])
+        self.load_all_quizzes()
+
+    # copy-on-write catalog: a refresh builds new lists and publishes them with one assignment, so a
+    # reader that takes the snapshot once sees either the old catalog or the new one, never a mix
+    @property
+    def quizzes(self) -> list:
+        return self._snapshot[0]
+
+    @property
+    def titles(self) -> dict:
+        return self._snapshot[1]
+
+    @property
+    def question_offsets(self) -> list:
+        return self._snapshot[2]
 
     def load_all_quizzes(self):
+        with self._refresh_lock:
+            self.catalog = {}
+            with self._cache_lock:
+                self.cache.clear()
+            self._update_catalog()
+            return self._catalog_quizzes()
+
+    def _catalog_quizzes(self):
+        quizzes = [entry for entry in self.catalog.values() if entry.title is not None]
+        titles = {}
+        for entry in quizzes:
+            titles.setdefault(entry.title.lower(), entry)
+        # running question totals let the mixed sampler map a global question number to (quiz, offset)
+        question_offsets = list(accumulate(entry.question_count for entry in quizzes))
+        self._snapshot = (quizzes, titles, question_offsets)
+        return quizzes
+
+    def _scan_files(self, quiz_files: list):
+        entries = [self.catalog.get(filepath) for filepath in quiz_files]
+        if self.workers <= 1 or len(quiz_files) <= 1:
+            return list(map(scan_quiz_file, repeat(self.quiz_repository), quiz_files, entries))
+        executor_class = ProcessPoolExecutor if self.pool == 'process' else ThreadPoolExecutor
+        with executor_class(max_workers=self.workers) as executor:
+            # map() keeps the input order, so the catalog order does not depend on which worker finishes first
+            chunksize = max(1, len(quiz_files) // (self.workers * 4))
+            return list(executor.map(scan_quiz_file, repeat(self.quiz_repository), quiz_files, entries,
+                                     chunksize=chunksize))
+
+    def _update_catalog(self) -> bool:
+        # re-read only files whose mtime/size changed and whose content hash differs from the cached one;
+        # startup keeps just the title and question count, questions are parsed on first use
+        changed = False
+        self.load_errors = []
         quiz_files = self.quiz_repository.get_all_quiz_files()
-        quizzes = [self.quiz_repository.load(filepath) for filepath in quiz_files]
-        return [quiz for quiz in quizzes if quiz is not None]
+        for filepath in set(self.catalog) - set(quiz_files):
+            del self.catalog[filepath]
+            self._evict(filepath)
+            changed = True
+
+        for filepath, (entry, entry_changed, error) in zip(quiz_files, self._scan_files(quiz_files)):
+            self.catalog[filepath] = entry
+            if error is not None:
+                self.load_errors.append((filepath, error))
+            if entry_changed:
+                self._evict(filepath)
+                changed = True
+        return changed
+
+    def _evict(self, filepath: str):
+        with self._cache_lock:
+            self.cache.pop(filepath, None)
 
     def refresh_quizzes(self):
-        self.quizzes = self.load_all_quizzes()
+        with self._refresh_lock:
+            self._update_catalog()
+            self._catalog_quizzes()
+
+    def refresh_if_changed(self) -> bool:
+        with self._refresh_lock:
+            changed = self._update_catalog()
+            if changed:
+                self._catalog_quizzes()
+            return changed
+
+    def _cached(self, filepath: str) -> Quiz:
+        with self._cache_lock:
+            quiz = self.cache.get(filepath)
+            if quiz is not None:
+                self.cache.move_to_end(filepath)
+            return quiz
+
+    def _materialize(self, entry: QuizCatalogEntry) -> Quiz:
+        quiz = self._cached(entry.filepath)
+        if quiz is not None:
+            return quiz
+        # two threads missing at once may both load the file; the second result simply replaces the first
+        quiz = self.quiz_repository.load(entry.filepath)
+        if quiz is None:
+            raise QuizNotFoundException(f"Quiz '{entry.title}' could not be loaded.")
+        with self._cache_lock:
+            self.cache[entry.filepath] = quiz
+            if len(self.cache) > self.cache_size:
+                self.cache.popitem(last=False)
+        return quiz
 
     def get_quiz_by_title(self, title: str) -> Quiz:
-        for quiz in self.quizzes:
-            if quiz.title.lower() == title.lower():
-                return quiz
-        raise QuizNotFoundException(f"Quiz '{title}' not found.")
+        entry = self.titles.get(title.lower())
+        if entry is None:
+            raise QuizNotFoundException(f"Quiz '{title}' not found.")
+        return self._materialize(entry)
+
+    def _stream_questions(self, entry: QuizCatalogEntry):
+        try:
+            yield from self.quiz_repository.iter_questions(entry.filepath)
+        except (OSError, ValueError, KeyError) as e:
+            raise QuizNotFoundException(f"Quiz '{entry.title}' could not be read: {e}") from e
+
+    def iter_quiz_questions(self, title: str):
+        # quizzes too large to keep in the cache are streamed, so a session can start right away
+        entry = self.titles.get(title.lower())
+        if entry is None:
+            raise QuizNotFoundException(f"Quiz '{title}' not found.")
+        if entry.question_count > self.stream_threshold:
+            quiz = self._cached(entry.filepath)
+            if quiz is None:
+                return entry.title, self._stream_questions(entry)
+            return entry.title, iter(quiz.questions)
+        return entry.title, iter(self._materialize(entry).questions)
 
-    def get_mixed_quiz_questions(self):
-        all_questions = [question for quiz in self.quizzes for question in quiz.questions]
-        # return random.sample(all_questions, len(all_questions))
-        random.shuffle(all_questions)
-        return all_questions[:20]
+    def _load_questions(self, entry: QuizCatalogEntry, offsets: list) -> list:
+        quiz = self._cached(entry.filepath)
+        if quiz is not None:
+            return [quiz.questions[offset] for offset in offsets]
+        return self.quiz_repository.load_questions(entry.filepath, offsets)
+
+    def _stratified_counts(self, count: int, rng: random.Random, quizzes: list) -> list:
+        # equal share per quiz; the remainder and any share a small quiz cannot fill go to the quizzes
+        # holding the fewest questions so far (ties broken at random), so quizzes that are not
+        # exhausted never differ by more than one
+        counts = [0] * len(quizzes)
+        candidates = [i for i, entry in enumerate(quizzes) if entry.question_count]
+        remaining = count
+        while remaining and candidates:
+            share, extra = divmod(remaining, len(candidates))
+            lucky = set(sorted(candidates, key=lambda i: (counts[i], rng.random()))[:extra])
+            for i in candidates:
+                counts[i] += min(share + (i in lucky), quizzes[i].question_count - counts[i])
+            remaining = count - sum(counts)
+            candidates = [i for i in candidates if counts[i] < quizzes[i].question_count]
+        return counts
+
+    def get_mixed_quiz_questions(self, count: int = 20, stratified: bool = False, seed=None):
+        rng = random.Random(seed)
+        # one snapshot for the whole draw, so a concurrent refresh cannot shift the offsets under it
+        quizzes, _, question_offsets = self._snapshot
+        total = question_offsets[-1] if question_offsets else 0
+        count = min(count, total)
+
+        picks = {}
+        if stratified:
+            for i, quiz_count in enumerate(self._stratified_counts(count, rng, quizzes)):
+                if quiz_count:
+                    picks[i] = rng.sample(range(quizzes[i].question_count), quiz_count)
+        else:
+            # random.sample over a range draws k distinct numbers in O(k) without materializing the range
+            for position in rng.sample(range(total), count):
+                i = bisect_right(question_offsets, position)
+                start = question_offsets[i - 1] if i else 0
+                picks.setdefault(i, []).append(position - start)
+
+        questions = []
+        for i, offsets in picks.items():
+            questions.extend(self._load_questions(quizzes[i], offsets))
+        rng.shuffle(questions)
+        return questions
 
     def save_quiz(self, quiz: Quiz):
         # filename = f"quiz_{quiz.title.lower().replace(' ', '_')}.json"
@@ -77,28 +371,117 @@ class QuizService:
 
 
 class ResultService:
-    def __init__(self, result_repository: ResultRepository):
+    def __init__(self, result_repository: ResultRepository, result_filepath: str = "results.json"):
         self.result_repository = result_repository
-        self.result_filepath = "results.json"
+        self.result_filepath = result_filepath
         self.top_num = 20
+        # SQLite keeps its own indexes, so queries are pushed down to it instead of held in memory
+        self.pushdown = isinstance(result_repository, SqliteResultRepository)
+        # monthly segments answer time-bounded queries from their manifest, reading only the segments
+        # that overlap the range (for recent activity, just the hot one); the buffered writer wraps them
+        self.segmented = isinstance(getattr(result_repository, 'result_repository', result_repository),
+                                    SegmentedResultRepository)
+        # leaderboard queries share the index; a save takes it exclusively, since the columnar store
+        # cannot grow while a query holds a view of its arrays
+        self._lock = ReadWriteLock()
+        self.rebuild_indexes()
+
+    def rebuild_indexes(self):
+        if self.pushdown:
+            self.index = self.result_repository
+            return
+        # built aside and swapped in, so queries keep using the old index until the new one is complete
+        index = ResultIndex(self.top_num)
+        for result in self.result_repository.iter_results(self.result_filepath):
+            index.add(result)
+        with self._lock.write():
+            self.index = index
 
     def save_result(self, result: Result):
         self.result_repository.save(result, self.result_filepath)
+        if not self.pushdown:
+            with self._lock.write():
+                self.index.add(result.to_dict())
+
+    def get_user_results(self, user: User, quizzes=None, sort: str = 'score', descending: bool = True,
+                         offset: int = 0, limit: int = None):
+        with self._lock.read():
+            return self.index.user_results(user.login, sort, descending, offset, limit)
 
-    def get_user_results(self, user: User, quizzes):
-        results = self.result_repository.load(self.result_filepath)
-        user_results = [result for result in results if result['user'] == user.login]
-        sorted_results = sorted(user_results, key=lambda x: x["score"], reverse=True)
-        return sorted_results
+    def get_user_result_count(self, user: User) -> int:
+        with self._lock.read():
+            return self.index.user_result_count(user.login)
+
+    def get_top_results(self, title: str, window: str = 'all', at: str = None):
+        with self._lock.read():
+            return self.index.top_results(title, self.top_num, window, at)
+
+    def get_total_top_results(self, window: str = 'all', at: str = None):
+        with self._lock.read():
+            return self.index.total_top_results(self.top_num, window, at)
+
+    def get_top_results_between(self, since: str, until: str, title: str = None):
+        if self.segmented:
+            return self.result_repository.top_results(self.result_filepath, title, self.top_num, since, until)
+        with self._lock.read():
+            return self.index.top_results_between(title, self.top_num, since, until)
+
+    def get_distinct_top_results(self, title: str):
+        with self._lock.read():
+            return self.index.distinct_top_results(title, self.top_num)
+
+    def get_distinct_total_top_results(self):
+        with self._lock.read():
+            return self.index.distinct_total_top_results(self.top_num)
+
+    def get_user_best_results(self, user: User):
+        with self._lock.read():
+            return self.index.user_best_results(user.login)
+
+    def get_rank(self, title: str, score: int) -> int:
+        with self._lock.read():
+            return self.index.rank(title, score)
+
+    def get_percentile(self, title: str, score: int) -> float:
+        with self._lock.read():
+            return self.index.percentile(title, score)
+
+    def get_result_count(self, title: str) -> int:
+        with self._lock.read():
+            return self.index.count_results(title)
+
+    def get_score_distribution(self, title: str) -> dict:
+        with self._lock.read():
+            return self.index.score_distribution(title)
+
+
+class AsyncResultService(ResultService):
+    # queries are answered from the in-memory index (never pushed down to a blocking SQLite call);
+    # loading and saving are awaited. Build it with `await AsyncResultService.create(...)`
+    def __init__(self, result_repository: AsyncResultRepository, result_filepath: str = "results.json"):
+        self.result_repository = result_repository
+        self.result_filepath = result_filepath
+        self.top_num = 20
+        self.pushdown = False
+        self.segmented = False
+        self._lock = ReadWriteLock()
+        self.index = ResultIndex(self.top_num)
 
-    def get_top_results(self, title: str):
-        results = self.result_repository.load(self.result_filepath)
-        filtered_results = [result for result in results if result['quiz'].lower() == title.lower()]
-        sorted_results = sorted(filtered_results, key=lambda x: x["score"], reverse=True)
-        return sorted_results[:self.top_num]
+    @classmethod
+    async def create(cls, result_repository: AsyncResultRepository, result_filepath: str = "results.json"):
+        service = cls(result_repository, result_filepath)
+        await service.rebuild_indexes()
+        return service
 
-    def get_total_top_results(self):
-        results = self.result_repository.load(self.result_filepath)
-        sorted_results = sorted(results, key=lambda x: x["score"], reverse=True)
-        return sorted_results[:self.top_num]
+    async def rebuild_indexes(self):
+        index = ResultIndex(self.top_num)
+        for result in await self.result_repository.load(self.result_filepath):
+            index.add(result)
+        with self._lock.write():
+            self.index = index
 
+    async def save_result(self, result: Result):
+        # indexed first, so the saver's own rank already counts the result while the write is pending
+        with self._lock.write():
+            self.index.add(result.to_dict())
+        await self.result_repository.save(result, self.result_filepath)
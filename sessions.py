@@ -0,0 +1,136 @@
+import time
+import secrets
+import threading
+from models import User, Quiz, Result, Question
+from services import QuizService, ResultService
+from grading import GradingEngine
+from custom_exceptions import (QuizNotFoundException, InvalidInputException, InvalidAnswerException,
+                               SessionNotFoundException)
+
+
+def parse_answer(text: str) -> list:
+    # "1, 3" -> [0, 2]; option numbers are 1-based on the wire and 0-based everywhere else
+    try:
+        return [int(number.strip()) - 1 for number in text.split(',')]
+    except ValueError:
+        raise InvalidInputException() from None
+
+
+class QuizSession:
+    # everything one attempt needs between requests; the questions are shared with the quiz cache
+    # (or streamed), so an idle session costs about 1.5 KB including its id
+    __slots__ = ('session_id', 'user', 'quiz_title', 'questions', 'question', 'number', 'score', 'finished',
+                 'last_active', 'lock')
+
+    def __init__(self, session_id: str, user: User, quiz_title: str, questions):
+        self.session_id = session_id
+        self.user = user
+        self.quiz_title = quiz_title
+        self.questions = questions
+        self.question = None
+        self.number = 0
+        self.score = 0
+        self.finished = False
+        self.last_active = time.monotonic()
+        # requests for one session may arrive on different worker threads
+        self.lock = threading.Lock()
+
+
+class SessionEngine:
+    # the quiz-taking flow without any I/O of its own: a console menu, an HTTP handler or a load test
+    # drives it through start / next_question / submit_answer / finish
+    def __init__(self, quiz_service: QuizService, result_service: ResultService,
+                 grading_engine: GradingEngine = None):
+        self.quiz_service = quiz_service
+        self.result_service = result_service
+        self.grading_engine = grading_engine or GradingEngine()
+        self.sessions = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.sessions)
+
+    def start(self, user: User, title: str) -> QuizSession:
+        if title.lower() == 'mix':
+            quiz_title, questions = "Mix", iter(self.quiz_service.get_mixed_quiz_questions())
+        else:
+            quiz_title, questions = self.quiz_service.iter_quiz_questions(title)
+        with self._lock:
+            session_id = secrets.token_urlsafe(16)
+            while session_id in self.sessions:
+                session_id = secrets.token_urlsafe(16)
+            session = self.sessions[session_id] = QuizSession(session_id, user, quiz_title, questions)
+        return session
+
+    def get(self, session_id: str) -> QuizSession:
+        session = self.sessions.get(session_id)
+        if session is None:
+            raise SessionNotFoundException(f"Quiz session '{session_id}' not found.")
+        session.last_active = time.monotonic()
+        return session
+
+    def next_question(self, session_id: str) -> Question:
+        # returns the question awaiting an answer, or None once the quiz has run out of questions;
+        # asking again before answering returns the same question
+        session = self.get(session_id)
+        with session.lock:
+            if session.question is None and not session.finished:
+                try:
+                    session.question = next(session.questions, None)
+                except QuizNotFoundException:
+                    # a streamed quiz turned out to be damaged part-way; the attempt cannot be completed
+                    self.discard(session_id)
+                    raise
+                if session.question is None:
+                    session.finished = True
+                else:
+                    session.number += 1
+            return session.question
+
+    def submit_answer(self, session_id: str, answer: list) -> bool:
+        session = self.get(session_id)
+        with session.lock:
+            question = session.question
+            if question is None:
+                raise InvalidAnswerException("There is no question awaiting an answer.")
+            if not answer or not all(0 <= index < len(question.options) for index in answer):
+                raise InvalidAnswerException()
+            correct = self.grading_engine.grade_answer(question, answer)
+            if correct:
+                session.score += 1
+            session.question = None
+            return correct
+
+    def finish(self, session_id: str) -> dict:
+        # saves the attempt and ends the session; questions left unanswered are not counted
+        with self._lock:
+            # popped under the lock so a repeated finish cannot save the attempt twice
+            session = self.sessions.pop(session_id, None)
+        if session is None:
+            raise SessionNotFoundException(f"Quiz session '{session_id}' not found.")
+        with session.lock:
+            answered = session.number - (session.question is not None)
+            title, score = session.quiz_title, session.score
+        self.result_service.save_result(Result(session.user, Quiz(title), score))
+        return {
+            "quiz": title,
+            "score": score,
+            "question_count": answered,
+            "rank": self.result_service.get_rank(title, score),
+            "total": self.result_service.get_result_count(title),
+            "percentile": self.result_service.get_percentile(title, score),
+            "median": self.result_service.get_score_distribution(title)['median'],
+        }
+
+    def discard(self, session_id: str):
+        with self._lock:
+            self.sessions.pop(session_id, None)
+
+    def expire(self, idle_seconds: float) -> int:
+        # abandoned sessions are dropped without saving a result
+        cutoff = time.monotonic() - idle_seconds
+        with self._lock:
+            stale = [session_id for session_id, session in self.sessions.items() if session.last_active < cutoff]
+            for session_id in stale:
+                del self.sessions[session_id]
+        return len(stale)
@@ -0,0 +1,409 @@
+import json
+import sqlite3
+import threading
+from datetime import date
+from models import User, Admin, Quiz, Question, Result
+from result_store import SORT_FIELDS
+from indexes import window_bounds, describe_histogram
+from custom_exceptions import QuizNotFoundException, UserAlreadyExistsException
+
+# rows pulled per lock hold when streaming a large table
+FETCH_SIZE = 1000
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    login TEXT NOT NULL,
+    password TEXT NOT NULL,
+    birth_date TEXT NOT NULL
+);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_users_login ON users (login COLLATE NOCASE);
+
+CREATE TABLE IF NOT EXISTS admins (
+    login TEXT NOT NULL,
+    password TEXT NOT NULL
+);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_admins_login ON admins (login COLLATE NOCASE);
+
+CREATE TABLE IF NOT EXISTS quizzes (
+    id INTEGER PRIMARY KEY,
+    source TEXT NOT NULL UNIQUE,
+    title TEXT NOT NULL,
+    version INTEGER NOT NULL DEFAULT 1
+);
+CREATE INDEX IF NOT EXISTS idx_quizzes_title ON quizzes (title COLLATE NOCASE);
+
+CREATE TABLE IF NOT EXISTS questions (
+    quiz_id INTEGER NOT NULL REFERENCES quizzes (id) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    text TEXT NOT NULL,
+    options TEXT NOT NULL,
+    correct_answers TEXT NOT NULL,
+    PRIMARY KEY (quiz_id, position)
+);
+
+CREATE TABLE IF NOT EXISTS results (
+    id INTEGER PRIMARY KEY,
+    user TEXT NOT NULL,
+    quiz TEXT NOT NULL,
+    score INTEGER NOT NULL,
+    timestamp TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_results_quiz_score ON results (quiz COLLATE NOCASE, score DESC, id);
+CREATE INDEX IF NOT EXISTS idx_results_score ON results (score DESC, id);
+CREATE INDEX IF NOT EXISTS idx_results_user ON results (user, score DESC, id);
+CREATE INDEX IF NOT EXISTS idx_results_user_timestamp ON results (user, timestamp DESC, id);
+CREATE INDEX IF NOT EXISTS idx_results_timestamp ON results (timestamp);
+
+CREATE TABLE IF NOT EXISTS best_scores (
+    user TEXT NOT NULL,
+    quiz_key TEXT NOT NULL,
+    score INTEGER NOT NULL,
+    result_id INTEGER NOT NULL,
+    PRIMARY KEY (user, quiz_key)
+);
+CREATE INDEX IF NOT EXISTS idx_best_scores_quiz ON best_scores (quiz_key, score DESC, result_id);
+CREATE INDEX IF NOT EXISTS idx_best_scores_score ON best_scores (score DESC, result_id);
+
+CREATE TRIGGER IF NOT EXISTS trg_results_best_score AFTER INSERT ON results
+BEGIN
+    INSERT INTO best_scores (user, quiz_key, score, result_id) VALUES (NEW.user, lower(NEW.quiz), NEW.score, NEW.id)
+    ON CONFLICT (user, quiz_key) DO UPDATE SET score = excluded.score, result_id = excluded.result_id
+    WHERE excluded.score > best_scores.score;
+END;
+"""
+
+# databases created before the view existed are backfilled once; PRAGMA user_version records that it
+# ran, because evaluating the window over every result on each connect would cost seconds on a large table
+SCHEMA_VERSION = 1
+BACKFILL_BEST_SCORES = """
+INSERT INTO best_scores (user, quiz_key, score, result_id)
+SELECT user, quiz_key, score, id FROM (
+    SELECT user, lower(quiz) AS quiz_key, score, id,
+           ROW_NUMBER() OVER (PARTITION BY user, lower(quiz) ORDER BY score DESC, id) AS row_number
+    FROM results
+) WHERE row_number = 1 AND NOT EXISTS (SELECT 1 FROM best_scores)
+"""
+
+
+def connect(db_path: str) -> sqlite3.Connection:
+    # shared with server worker threads; SQLite's default serialized build allows that, and each
+    # repository holds its own lock around statements and transactions
+    connection = sqlite3.connect(db_path, timeout=30, check_same_thread=False)
+    connection.row_factory = sqlite3.Row
+    connection.execute("PRAGMA foreign_keys = ON")
+    # WAL lets readers in other processes proceed while one process writes
+    connection.execute("PRAGMA journal_mode = WAL")
+    connection.executescript(SCHEMA)
+    if connection.execute("PRAGMA user_version").fetchone()[0] < SCHEMA_VERSION:
+        with connection:
+            connection.execute(BACKFILL_BEST_SCORES)
+            connection.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+    return connection
+
+
+class SqliteUserRepository:
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self.connection = connect(db_path)
+        # one connection serves every thread, so statements and transactions take turns on it
+        self.lock = threading.RLock()
+
+    def load(self):
+        with self.lock:
+            rows = self.connection.execute("SELECT login, password, birth_date FROM users ORDER BY rowid").fetchall()
+        return [User(row['login'], row['password'], date.fromisoformat(row['birth_date'])) for row in rows]
+
+    def save(self, user: User):
+        try:
+            with self.lock, self.connection:
+                self.connection.execute("INSERT INTO users (login, password, birth_date) VALUES (?, ?, ?)",
+                                        (user.login, user.password, user.birth_date.isoformat()))
+        except sqlite3.IntegrityError:
+            # the unique login index caught a registration from another process
+            raise UserAlreadyExistsException(f"User '{user.login}' already exists.") from None
+        except sqlite3.Error as e:
+            print(f"Error saving user: {e}.")
+
+    def update(self, user: User):
+        try:
+            with self.lock, self.connection:
+                self.connection.execute("UPDATE users SET password = ?, birth_date = ? WHERE login = ? COLLATE NOCASE",
+                                        (user.password, user.birth_date.isoformat(), user.login))
+        except sqlite3.Error as e:
+            print(f"Error saving user: {e}.")
+
+    def save_all(self, users: list):
+        try:
+            with self.lock, self.connection:
+                self.connection.execute("DELETE FROM users")
+                self.connection.executemany("INSERT INTO users (login, password, birth_date) VALUES (?, ?, ?)",
+                                            [(u.login, u.password, u.birth_date.isoformat()) for u in users])
+        except sqlite3.Error as e:
+            print(f"Error saving users: {e}.")
+
+
+class SqliteAdminRepository:
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self.connection = connect(db_path)
+        self.lock = threading.RLock()
+
+    def load(self):
+        with self.lock:
+            rows = self.connection.execute("SELECT login, password FROM admins ORDER BY rowid").fetchall()
+        return [Admin(row['login'], row['password']) for row in rows]
+
+    def save(self, admin: Admin):
+        try:
+            with self.lock, self.connection:
+                self.connection.execute("INSERT INTO admins (login, password) VALUES (?, ?)",
+                                        (admin.login, admin.password))
+        except sqlite3.Error as e:
+            print(f"Error saving admin: {e}.")
+
+
+class SqliteQuizRepository:
+    # quizzes are keyed by the same file path QuizService would write them to, so the service
+    # does not need to know which backend it is talking to
+    def __init__(self, db_path: str, quizzes_dir: str = 'quizzes'):
+        self.db_path = db_path
+        self.quizzes_dir = quizzes_dir
+        self.connection = connect(db_path)
+        self.lock = threading.RLock()
+
+    def load(self, filepath: str):
+        with self.lock:
+            row = self.connection.execute("SELECT id, title FROM quizzes WHERE source = ?", (filepath,)).fetchone()
+            if row is None:
+                print(f"Quiz '{filepath}' not found.")
+                return None
+            questions = self.connection.execute(
+                "SELECT text, options, correct_answers FROM questions WHERE quiz_id = ? ORDER BY position",
+                (row['id'],)).fetchall()
+        quiz = Quiz(row['title'])
+        for question in questions:
+            quiz.add_question(Question(question['text'], json.loads(question['options']),
+                                       json.loads(question['correct_answers'])))
+        return quiz
+
+    def iter_questions(self, filepath: str):
+        with self.lock:
+            rows = self.connection.execute(
+                "SELECT text, options, correct_answers FROM questions "
+                "WHERE quiz_id = (SELECT id FROM quizzes WHERE source = ?) ORDER BY position", (filepath,))
+        while True:
+            # fetched in chunks under the lock, parsed outside it
+            with self.lock:
+                chunk = rows.fetchmany(FETCH_SIZE)
+            if not chunk:
+                return
+            for row in chunk:
+                yield Question(row['text'], json.loads(row['options']), json.loads(row['correct_answers']))
+
+    def load_questions(self, filepath: str, offsets: list):
+        placeholders = ", ".join("?" * len(offsets))
+        with self.lock:
+            rows = self.connection.execute(
+                "SELECT position, text, options, correct_answers FROM questions "
+                f"WHERE quiz_id = (SELECT id FROM quizzes WHERE source = ?) AND position IN ({placeholders})",
+                (filepath, *offsets)).fetchall()
+        questions = {row['position']: Question(row['text'], json.loads(row['options']),
+                                               json.loads(row['correct_answers'])) for row in rows}
+        return [questions[offset] for offset in offsets if offset in questions]
+
+    def read_header(self, filepath: str):
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT title, (SELECT COUNT(*) FROM questions WHERE quiz_id = quizzes.id) AS question_count "
+                "FROM quizzes WHERE source = ?", (filepath,)).fetchone()
+        if row is None:
+            raise QuizNotFoundException(f"Quiz '{filepath}' not found.")
+        return row['title'], row['question_count']
+
+    def load_header(self, filepath: str):
+        try:
+            return self.read_header(filepath)
+        except QuizNotFoundException as e:
+            print(e)
+            return None
+
+    def save(self, quiz: Quiz, filepath: str):
+        try:
+            with self.lock, self.connection:
+                self.connection.execute("INSERT INTO quizzes (source, title) VALUES (?, ?) "
+                                        "ON CONFLICT (source) DO UPDATE SET title = excluded.title, version = version + 1",
+                                        (filepath, quiz.title))
+                quiz_id = self.connection.execute("SELECT id FROM quizzes WHERE source = ?",
+                                                  (filepath,)).fetchone()[0]
+                self.connection.execute("DELETE FROM questions WHERE quiz_id = ?", (quiz_id,))
+                self.connection.executemany(
+                    "INSERT INTO questions (quiz_id, position, text, options, correct_answers) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    [(quiz_id, position, q.text, json.dumps(q.options), json.dumps(q.correct_answers))
+                     for position, q in enumerate(quiz.questions)])
+        except sqlite3.Error as e:
+            print(f"Error saving quiz to '{filepath}': {e}.")
+
+    def get_all_quiz_files(self):
+        with self.lock:
+            rows = self.connection.execute("SELECT source FROM quizzes ORDER BY id").fetchall()
+        return [row['source'] for row in rows]
+
+    def get_file_signature(self, filepath: str):
+        with self.lock:
+            row = self.connection.execute("SELECT version FROM quizzes WHERE source = ?", (filepath,)).fetchone()
+        return row['version'] if row else None
+
+    def get_file_hash(self, filepath: str):
+        # the row version already changes on every save, so it doubles as the content hash
+        return self.get_file_signature(filepath)
+
+
+class SqliteResultRepository:
+    # the database is the result store, so the file path the services pass around is ignored
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self.connection = connect(db_path)
+        self.lock = threading.RLock()
+
+    @staticmethod
+    def _to_dict(row):
+        return {"user": row['user'], "quiz": row['quiz'], "score": row['score'], "timestamp": row['timestamp']}
+
+    def _query(self, sql: str, parameters=()) -> list:
+        with self.lock:
+            rows = self.connection.execute(sql, parameters).fetchall()
+        return [self._to_dict(row) for row in rows]
+
+    def _scalar(self, sql: str, parameters=()):
+        with self.lock:
+            return self.connection.execute(sql, parameters).fetchone()[0]
+
+    def load(self, filepath: str = None):
+        return list(self.iter_results(filepath))
+
+    def iter_results(self, filepath: str = None):
+        with self.lock:
+            rows = self.connection.execute("SELECT user, quiz, score, timestamp FROM results ORDER BY id")
+        while True:
+            with self.lock:
+                chunk = rows.fetchmany(FETCH_SIZE)
+            if not chunk:
+                return
+            for row in chunk:
+                yield self._to_dict(row)
+
+    def save(self, result: Result, filepath: str = None):
+        try:
+            self.save_dicts([result.to_dict()])
+        except sqlite3.Error as e:
+            print(f"Error saving result to '{self.db_path}': {e}.")
+
+    def save_many(self, results: list, filepath: str = None, fsync: bool = False):
+        # a committed transaction is already synced by SQLite, so fsync needs no extra work here
+        try:
+            self.save_dicts(results)
+        except sqlite3.Error as e:
+            print(f"Error saving results to '{self.db_path}': {e}.")
+
+    def save_dicts(self, results: list):
+        rows = [{"user": r['user'], "quiz": r['quiz'], "score": r['score'], "timestamp": r.get('timestamp', '')}
+                for r in results]
+        with self.lock, self.connection:
+            self.connection.executemany(
+                "INSERT INTO results (user, quiz, score, timestamp) VALUES (:user, :quiz, :score, :timestamp)", rows)
+
+    def top_results(self, title: str, limit: int, window: str = 'all', at: str = None):
+        if window != 'all':
+            return self.top_results_between(title, limit, *window_bounds(window, at))
+        return self._query(
+            "SELECT user, quiz, score, timestamp FROM results WHERE quiz = ? COLLATE NOCASE "
+            "ORDER BY score DESC, id LIMIT ?", (title, limit))
+
+    def total_top_results(self, limit: int, window: str = 'all', at: str = None):
+        if window != 'all':
+            return self.top_results_between(None, limit, *window_bounds(window, at))
+        return self._query("SELECT user, quiz, score, timestamp FROM results ORDER BY score DESC, id LIMIT ?",
+                           (limit,))
+
+    def top_results_between(self, title: str, limit: int, since: str, until: str):
+        # ISO timestamps compare correctly as text, so the range is a plain index scan
+        return self._query(
+            "SELECT user, quiz, score, timestamp FROM results WHERE timestamp >= ? AND timestamp < ? "
+            "AND (? IS NULL OR quiz = ? COLLATE NOCASE) ORDER BY score DESC, id LIMIT ?",
+            (since, until, title, title, limit))
+
+    def distinct_top_results(self, title: str, limit: int):
+        return self._query(
+            "SELECT r.user, r.quiz, r.score, r.timestamp FROM best_scores b JOIN results r ON r.id = b.result_id "
+            "WHERE b.quiz_key = lower(?) ORDER BY b.score DESC, b.result_id LIMIT ?", (title, limit))
+
+    def distinct_total_top_results(self, limit: int):
+        return self._query(
+            "SELECT r.user, r.quiz, r.score, r.timestamp FROM ("
+            "    SELECT result_id, score, ROW_NUMBER() OVER (PARTITION BY user ORDER BY score DESC, result_id) AS n "
+            "    FROM best_scores"
+            ") b JOIN results r ON r.id = b.result_id WHERE b.n = 1 ORDER BY b.score DESC, b.result_id LIMIT ?",
+            (limit,))
+
+    def user_best_results(self, login: str):
+        return self._query(
+            "SELECT r.user, r.quiz, r.score, r.timestamp FROM best_scores b JOIN results r ON r.id = b.result_id "
+            "WHERE b.user = ? ORDER BY b.score DESC, b.result_id", (login,))
+
+    def user_results(self, login: str, sort: str = 'score', descending: bool = True, offset: int = 0,
+                     limit: int = None):
+        if sort not in SORT_FIELDS:
+            raise ValueError(f"Cannot sort results by '{sort}'.")
+        direction = "DESC" if descending else "ASC"
+        return self._query(
+            f"SELECT user, quiz, score, timestamp FROM results WHERE user = ? ORDER BY {sort} {direction}, id "
+            "LIMIT ? OFFSET ?", (login, -1 if limit is None else limit, offset))
+
+    def user_result_count(self, login: str) -> int:
+        return self._scalar("SELECT COUNT(*) FROM results WHERE user = ?", (login,))
+
+    def count_results(self, title: str) -> int:
+        return self._scalar("SELECT COUNT(*) FROM results WHERE quiz = ? COLLATE NOCASE", (title,))
+
+    def rank(self, title: str, score: int) -> int:
+        return self._scalar("SELECT COUNT(*) FROM results WHERE quiz = ? COLLATE NOCASE AND score > ?",
+                            (title, score)) + 1
+
+    def score_distribution(self, title: str) -> dict:
+        with self.lock:
+            rows = self.connection.execute(
+                "SELECT score, COUNT(*) FROM results WHERE quiz = ? COLLATE NOCASE GROUP BY score", (title,)).fetchall()
+        histogram = [0] * (max((row[0] for row in rows), default=-1) + 1)
+        for score, bucket_count in rows:
+            histogram[score] = bucket_count
+        return describe_histogram(histogram)
+
+    def percentile(self, title: str, score: int) -> float:
+        # both counts under one lock hold, so a concurrent save cannot land between them
+        with self.lock:
+            total = self.count_results(title)
+            if not total:
+                return 0.0
+            below = self._scalar("SELECT COUNT(*) FROM results WHERE quiz = ? COLLATE NOCASE AND score < ?",
+                                 (title, score))
+        return below * 100 / total
+
+
+def import_json(db_path: str, user_repository, admin_repository, quiz_repository, result_repository,
+                results_filepath: str):
+    quizzes = SqliteQuizRepository(db_path, quiz_repository.quizzes_dir)
+    connection = quizzes.connection
+    with connection:
+        for table in ("users", "admins", "questions", "quizzes", "best_scores", "results"):
+            connection.execute(f"DELETE FROM {table}")
+
+    SqliteUserRepository(db_path).save_all(user_repository.load())
+    admins = SqliteAdminRepository(db_path)
+    for admin in admin_repository.load():
+        admins.save(admin)
+    for filepath in quiz_repository.get_all_quiz_files():
+        quiz = quiz_repository.load(filepath)
+        if quiz is not None:
+            quizzes.save(quiz, filepath)
+    SqliteResultRepository(db_path).save_dicts(list(result_repository.iter_results(results_filepath)))
@@ -0,0 +1,137 @@
+import os
+import json
+import time
+import asyncio
+import tempfile
+import threading
+import unittest
+from datetime import date
+from models import User, Admin, Quiz, Question, Result
+from repositories import UserRepository, AdminRepository, QuizRepository, JsonlResultRepository
+from async_repositories import (AsyncFileIO, AsyncUserRepository, AsyncAdminRepository, AsyncQuizRepository,
+                                AsyncResultRepository)
+
+
+class TestAsyncFileIO(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.io = AsyncFileIO(max_workers=4)
+
+    async def asyncTearDown(self):
+        self.io.shutdown()
+
+    async def test_identical_loads_are_coalesced(self):
+        calls = []
+
+        def load():
+            calls.append(1)
+            time.sleep(0.05)
+            return [1, 2, 3]
+
+        values = await asyncio.gather(*(self.io.read('file', 'load', load) for _ in range(20)))
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(values, [[1, 2, 3]] * 20)
+        # each caller gets its own list
+        values[0].append(4)
+        self.assertEqual(values[1], [1, 2, 3])
+        await self.io.read('file', 'load', load)
+        self.assertEqual(len(calls), 2)
+
+    async def test_different_loads_are_not_coalesced(self):
+        await asyncio.gather(self.io.read('a', 'load', lambda: 1), self.io.read('b', 'load', lambda: 2))
+        self.assertEqual(self.io.reads, 2)
+
+    async def test_writes_to_one_file_are_serialized(self):
+        active, overlaps, lock = [0], [], threading.Lock()
+
+        def write(path):
+            with lock:
+                active[0] += 1
+                overlaps.append((path, active[0]))
+            time.sleep(0.01)
+            with lock:
+                active[0] -= 1
+
+        await asyncio.gather(*(self.io.write('same', write, 'same') for _ in range(10)))
+        self.assertEqual(max(count for _, count in overlaps), 1)
+
+        overlaps.clear()
+        await asyncio.gather(*(self.io.write(f'file{i}', write, f'file{i}') for i in range(4)))
+        self.assertGreater(max(count for _, count in overlaps), 1)
+
+    async def test_load_after_write_is_fresh(self):
+        data = {"value": 1}
+        started = threading.Event()
+
+        def load():
+            started.set()
+            time.sleep(0.05)
+            return data["value"]
+
+        def write():
+            data["value"] = 2
+
+        early = asyncio.ensure_future(self.io.read('file', 'load', load))
+        await asyncio.get_running_loop().run_in_executor(None, started.wait)
+        await self.io.write('file', write)
+        self.assertEqual(await self.io.read('file', 'load', load), 2)
+        await early
+
+
+class TestAsyncRepositories(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.io = AsyncFileIO()
+
+    async def asyncTearDown(self):
+        self.io.shutdown()
+        self.directory.cleanup()
+
+    def path(self, name):
+        return os.path.join(self.directory.name, name)
+
+    async def test_users(self):
+        with open(self.path('users.json'), 'w') as file:
+            json.dump([], file)
+        repository = AsyncUserRepository(UserRepository(self.path('users.json')), self.io)
+        await asyncio.gather(*(repository.save(User(f"user{i}", "password", date(2000, 1, 1))) for i in range(10)))
+        users = await repository.load()
+        self.assertEqual(sorted(user.login for user in users), sorted(f"user{i}" for i in range(10)))
+        await repository.update(User("user3", "changed", date(2000, 1, 1)))
+        users = {user.login: user for user in await repository.load()}
+        self.assertEqual(users["user3"].password, "changed")
+
+    async def test_admins(self):
+        with open(self.path('admins.json'), 'w') as file:
+            json.dump([], file)
+        repository = AsyncAdminRepository(AdminRepository(self.path('admins.json')), self.io)
+        await repository.save(Admin("admin", "secret"))
+        self.assertEqual([admin.login for admin in await repository.load()], ["admin"])
+
+    async def test_quizzes(self):
+        repository = AsyncQuizRepository(QuizRepository(self.directory.name), self.io)
+        quiz = Quiz("Async Quiz")
+        quiz.add_question(Question("Q1?", ["A", "B"], ["A"]))
+        quiz.add_question(Question("Q2?", ["A", "B"], ["B"]))
+        filepath = self.path('quiz_async.json')
+        await repository.save(quiz, filepath)
+        self.assertEqual(await repository.get_all_quiz_files(), [filepath])
+        self.assertEqual((await repository.load(filepath)).title, "Async Quiz")
+        self.assertEqual(await repository.load_header(filepath), ("Async Quiz", 2))
+        self.assertEqual([q.text for q in await repository.load_questions(filepath, [1])], ["Q2?"])
+
+    async def test_results(self):
+        repository = AsyncResultRepository(JsonlResultRepository(), self.io)
+        user, quiz = User("testuser", "password", date(2000, 1, 1)), Quiz("Sample Quiz")
+        filepath = self.path('results.jsonl')
+        await asyncio.gather(*(repository.save(Result(user, quiz, score), filepath) for score in range(10)))
+        await repository.save_many([Result(user, quiz, 10).to_dict()], filepath)
+        scores = [result['score'] for result in await repository.load(filepath)]
+        self.assertEqual(sorted(scores), list(range(11)))
+
+    async def test_default_result_repository(self):
+        repository = AsyncResultRepository(io=self.io)
+        self.assertEqual(await repository.load(self.path('missing.json')), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,104 @@
+import unittest
+import os
+import json
+import tempfile
+import multiprocessing
+from datetime import date
+from unittest.mock import patch
+from models import User, Quiz, Result
+from repositories import UserRepository, JsonlResultRepository
+from file_locks import file_lock, atomic_write, append_text
+import file_locks
+
+
+def register_users(filepath: str, worker: int, count: int):
+    repository = UserRepository(filepath)
+    for i in range(count):
+        with patch("builtins.print"):
+            repository.save(User(f"user{worker}-{i}", "password", date(2000, 1, 1)))
+
+
+def save_results(filepath: str, worker: int, count: int):
+    repository = JsonlResultRepository()
+    user = User(f"user{worker}", "password", date(2000, 1, 1))
+    for i in range(count):
+        repository.save(Result(user, Quiz("Python"), i), filepath)
+
+
+class TestAtomicWrite(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.filepath = os.path.join(self.tmpdir.name, "data.json")
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_replaces_file(self):
+        atomic_write(self.filepath, lambda file: file.write("old"))
+        atomic_write(self.filepath, lambda file: file.write("new"))
+        with open(self.filepath) as file:
+            self.assertEqual(file.read(), "new")
+        self.assertEqual(os.listdir(self.tmpdir.name), ["data.json"])
+
+    def test_failed_write_keeps_old_file(self):
+        atomic_write(self.filepath, lambda file: file.write("old"))
+
+        def write(file):
+            file.write("partial")
+            raise ValueError("boom")
+
+        with self.assertRaises(ValueError):
+            atomic_write(self.filepath, write)
+        with open(self.filepath) as file:
+            self.assertEqual(file.read(), "old")
+        self.assertEqual(os.listdir(self.tmpdir.name), ["data.json"])
+
+    def test_append_text(self):
+        append_text(self.filepath, "a\n")
+        append_text(self.filepath, "b\n", fsync=True)
+        with open(self.filepath) as file:
+            self.assertEqual(file.read(), "a\nb\n")
+
+    def test_lock_without_fcntl(self):
+        with patch.object(file_locks, "fcntl", None):
+            with file_lock(self.filepath):
+                atomic_write(self.filepath, lambda file: file.write("data"))
+        self.assertEqual(os.listdir(self.tmpdir.name), ["data.json"])
+
+
+@unittest.skipIf(file_locks.fcntl is None, "fcntl is not available")
+class TestConcurrentProcesses(unittest.TestCase):
+    workers = 4
+    count = 25
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def run_workers(self, target, filepath: str):
+        context = multiprocessing.get_context('fork')
+        processes = [context.Process(target=target, args=(filepath, worker, self.count))
+                     for worker in range(self.workers)]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+            self.assertEqual(process.exitcode, 0)
+
+    def test_no_lost_users(self):
+        filepath = os.path.join(self.tmpdir.name, "users.json")
+        self.run_workers(register_users, filepath)
+        with open(filepath) as file:
+            self.assertEqual(len(json.load(file)), self.workers * self.count)
+
+    def test_no_lost_results(self):
+        filepath = os.path.join(self.tmpdir.name, "results.jsonl")
+        self.run_workers(save_results, filepath)
+        results = JsonlResultRepository().load(filepath)
+        self.assertEqual(len(results), self.workers * self.count)
+
+
+if __name__ == '__main__':
+    unittest.main()
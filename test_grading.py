@@ -0,0 +1,67 @@
+import unittest
+from unittest.mock import patch
+from models import Quiz, Question
+from grading import GradingEngine, answer_mask
+import grading
+
+
+class TestAnswerMask(unittest.TestCase):
+    def test_indices(self):
+        self.assertEqual(answer_mask([0, 3]), 0b1001)
+        self.assertEqual(answer_mask([2, 2]), 0b100)
+        self.assertEqual(answer_mask([]), 0)
+
+    def test_ready_mask(self):
+        self.assertEqual(answer_mask(0b110), 0b110)
+
+
+class TestGradingEngine(unittest.TestCase):
+    def setUp(self):
+        self.engine = GradingEngine()
+        self.quiz = Quiz("Test Quiz")
+        self.quiz.add_question(Question("Single?", ["A", "B", "C"], ["B"]))
+        self.quiz.add_question(Question("Multiple?", ["A", "B", "C", "D"], ["A", "D"]))
+        self.quiz.add_question(Question("Last?", ["Yes", "No"], ["No"]))
+
+    def test_grade_answer(self):
+        self.assertTrue(self.engine.grade_answer(self.quiz.questions[0], [1]))
+        self.assertTrue(self.engine.grade_answer(self.quiz.questions[1], [3, 0]))
+        self.assertFalse(self.engine.grade_answer(self.quiz.questions[1], [0]))
+        self.assertFalse(self.engine.grade_answer(self.quiz.questions[1], [0, 1, 3]))
+
+    def test_grade(self):
+        self.assertEqual(self.engine.grade(self.quiz.questions, [[1], [0, 3], [1]]), 3)
+        self.assertEqual(self.engine.grade(self.quiz.questions, [[1], [0]]), 1)
+
+    def test_grade_rejects_long_sheet(self):
+        with self.assertRaises(ValueError):
+            self.engine.grade(self.quiz.questions, [[1], [0, 3], [1], [0]])
+
+    def test_grade_batch(self):
+        submissions = [[[1], [0, 3], [1]], [[0], [0, 3], [0]], [], [0b10, 0b1001, 0b10]]
+        self.assertEqual(self.engine.grade_batch(self.quiz, submissions), [3, 1, 0, 3])
+
+    def test_grade_batch_without_numpy(self):
+        submissions = [[[1], [0, 3], [1]], [[2]]]
+        with patch.object(grading, "np", None):
+            self.assertEqual(self.engine.grade_batch(self.quiz, submissions), [3, 0])
+
+    def test_grade_batch_empty(self):
+        self.assertEqual(self.engine.grade_batch(self.quiz, []), [])
+
+    def test_grade_batch_with_many_options(self):
+        quiz = Quiz("Wide Quiz")
+        options = [f"Option {i}" for i in range(70)]
+        quiz.add_question(Question("Wide?", options, ["Option 69"]))
+        self.assertEqual(self.engine.grade_batch(quiz, [[[69]], [[68]]]), [1, 0])
+
+    @unittest.skipIf(grading.np is None, "NumPy is not installed")
+    def test_grade_batch_matches_pure_python(self):
+        submissions = [[[i % 3], [i % 4, 3], [i % 2]] for i in range(100)]
+        vectorized = self.engine.grade_batch(self.quiz, submissions)
+        with patch.object(grading, "np", None):
+            self.assertEqual(self.engine.grade_batch(self.quiz, submissions), vectorized)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,266 @@
+import unittest
+from indexes import (TopKIndex, LeaderboardIndex, ScoreRankIndex, RankIndex, UserHistoryIndex, TimestampIndex,
+                     WindowedLeaderboardIndex, ResultIndex, DistinctTopIndex, BestScoreIndex, window_bounds,
+                     describe_histogram)
+from result_store import ColumnarResultStore, encode_timestamp
+
+
+def make_result(user, quiz, score):
+    return {"user": user, "quiz": quiz, "score": score, "timestamp": "2024-06-12T12:00:00"}
+
+
+class TestTopKIndex(unittest.TestCase):
+    def setUp(self):
+        self.index = TopKIndex(3)
+
+    def test_keeps_highest_scores(self):
+        for seq, score in enumerate([5, 1, 9, 7, 3]):
+            self.index.add(make_result(f"user{seq}", "Quiz", score), seq)
+        self.assertEqual(len(self.index), 3)
+        self.assertEqual([r["score"] for r in self.index.top()], [9, 7, 5])
+        self.assertEqual(self.index.min_score(), 5)
+
+    def test_ties_keep_earliest_results(self):
+        for seq in range(5):
+            self.index.add(make_result(f"user{seq}", "Quiz", 10), seq)
+        self.assertEqual([r["user"] for r in self.index.top()], ["user0", "user1", "user2"])
+
+    def test_matches_stable_sort(self):
+        results = [make_result(f"user{i}", "Quiz", (i * 7) % 11) for i in range(50)]
+        for seq, result in enumerate(results):
+            self.index.add(result, seq)
+        expected = sorted(results, key=lambda x: x["score"], reverse=True)[:3]
+        self.assertEqual(self.index.top(), expected)
+
+
+class TestLeaderboardIndex(unittest.TestCase):
+    def setUp(self):
+        self.leaderboard = LeaderboardIndex(2)
+        self.leaderboard.add(make_result("user1", "Python", 10))
+        self.leaderboard.add(make_result("user2", "IT", 15))
+        self.leaderboard.add(make_result("user3", "python", 12))
+        self.leaderboard.add(make_result("user4", "Python", 5))
+
+    def test_top_is_case_insensitive(self):
+        self.assertEqual([r["user"] for r in self.leaderboard.top("PYTHON")], ["user3", "user1"])
+
+    def test_top_unknown_quiz(self):
+        self.assertEqual(self.leaderboard.top("Unknown"), [])
+
+    def test_total_top(self):
+        self.assertEqual([r["user"] for r in self.leaderboard.total_top()], ["user2", "user3"])
+
+
+class TestScoreRankIndex(unittest.TestCase):
+    def setUp(self):
+        self.index = ScoreRankIndex(max_score=4)
+        self.scores = [2, 4, 4, 0, 3]
+        for score in self.scores:
+            self.index.add(score)
+
+    def test_counts(self):
+        self.assertEqual(self.index.total, 5)
+        self.assertEqual(self.index.count_at_most(3), 3)
+        self.assertEqual(self.index.count_below(4), 3)
+        self.assertEqual(self.index.count_above(2), 3)
+        self.assertEqual(self.index.count_above(100), 0)
+
+    def test_grows_for_larger_scores(self):
+        self.index.add(50)
+        self.assertEqual(self.index.count_above(4), 1)
+        self.assertEqual(self.index.count_at_most(4), 5)
+        self.assertEqual(self.index.count_at_most(50), 6)
+
+    def test_negative_score(self):
+        with self.assertRaises(ValueError):
+            self.index.add(-1)
+
+    def test_histogram(self):
+        index = ScoreRankIndex(max_score=4)
+        for score in [3, 0, 3, 9, 1, 3]:
+            index.add(score)
+        self.assertEqual(index.histogram(), [1, 1, 0, 3, 0, 0, 0, 0, 0, 1])
+        self.assertEqual(ScoreRankIndex().histogram(), [])
+
+
+class TestDescribeHistogram(unittest.TestCase):
+    def test_odd_count(self):
+        distribution = describe_histogram([1, 0, 3, 1])
+        self.assertEqual(distribution["total"], 5)
+        self.assertEqual((distribution["min"], distribution["max"]), (0, 3))
+        self.assertEqual(distribution["median"], 2)
+        self.assertAlmostEqual(distribution["mean"], 9 / 5)
+
+    def test_even_count(self):
+        self.assertEqual(describe_histogram([0, 2, 0, 0, 2, 0])["median"], 2.5)
+        self.assertEqual(describe_histogram([0, 2, 0, 0, 2, 0])["histogram"], [0, 2, 0, 0, 2])
+
+    def test_empty(self):
+        self.assertEqual(describe_histogram([0, 0])["total"], 0)
+        self.assertIsNone(describe_histogram([])["median"])
+
+
+class TestRankIndex(unittest.TestCase):
+    def setUp(self):
+        self.ranks = RankIndex()
+        for user, score in [("user1", 10), ("user2", 15), ("user3", 10), ("user4", 5)]:
+            self.ranks.add(make_result(user, "Python", score))
+
+    def test_rank_uses_competition_ranking(self):
+        self.assertEqual(self.ranks.rank("python", 15), 1)
+        self.assertEqual(self.ranks.rank("Python", 10), 2)
+        self.assertEqual(self.ranks.rank("Python", 5), 4)
+
+    def test_percentile(self):
+        self.assertEqual(self.ranks.percentile("Python", 10), 25.0)
+        self.assertEqual(self.ranks.percentile("Python", 16), 100.0)
+
+    def test_unknown_quiz(self):
+        self.assertEqual(self.ranks.rank("IT", 3), 1)
+        self.assertEqual(self.ranks.percentile("IT", 3), 0.0)
+        self.assertEqual(self.ranks.count("IT"), 0)
+
+
+class TestUserHistoryIndex(unittest.TestCase):
+    def setUp(self):
+        self.store = ColumnarResultStore()
+        self.history = UserHistoryIndex(self.store)
+        for day, (user, score) in enumerate([("alice", 5), ("bob", 9), ("alice", 8), ("alice", 5), ("alice", 2)],
+                                            start=1):
+            result = make_result(user, "Quiz", score)
+            result["timestamp"] = f"2024-06-{day:02d}T00:00:00"
+            self.history.add(result, self.store.append(result))
+
+    def test_count(self):
+        self.assertEqual(self.history.count("alice"), 4)
+        self.assertEqual(self.history.count("carol"), 0)
+
+    def test_sort_by_score(self):
+        results = self.history.user_results("alice")
+        self.assertEqual([r["score"] for r in results], [8, 5, 5, 2])
+        self.assertEqual([r["timestamp"][8:10] for r in results[1:3]], ["01", "04"])
+
+    def test_sort_by_timestamp(self):
+        results = self.history.user_results("alice", sort='timestamp')
+        self.assertEqual([r["timestamp"][8:10] for r in results], ["05", "04", "03", "01"])
+        results = self.history.user_results("alice", sort='timestamp', descending=False, limit=2)
+        self.assertEqual([r["timestamp"][8:10] for r in results], ["01", "03"])
+
+    def test_paging_matches_full_sort(self):
+        full = self.history.user_results("alice")
+        pages = self.history.user_results("alice", limit=3) + self.history.user_results("alice", offset=3, limit=3)
+        self.assertEqual(pages, full)
+        self.assertEqual(self.history.user_results("alice", offset=10, limit=3), [])
+
+    def test_unknown_sort(self):
+        with self.assertRaises(ValueError):
+            self.history.user_results("alice", sort='quiz')
+
+
+class TestWindows(unittest.TestCase):
+    def test_window_bounds(self):
+        self.assertEqual(window_bounds('day', "2024-06-12T15:30:00"), ("2024-06-12T00:00:00", "2024-06-13T00:00:00"))
+        # 2024-06-12 is a Wednesday
+        self.assertEqual(window_bounds('week', "2024-06-12T15:30:00"), ("2024-06-10T00:00:00", "2024-06-17T00:00:00"))
+        self.assertEqual(window_bounds('week', "2024-06-10T00:00:00")[0], "2024-06-10T00:00:00")
+        with self.assertRaises(ValueError):
+            window_bounds('month')
+
+    def test_timestamp_index(self):
+        index = TimestampIndex()
+        for position, timestamp in enumerate(["2024-06-01T10:00:00", "2024-06-03T10:00:00", "2024-06-02T10:00:00",
+                                              "2024-06-03T10:00:00"]):
+            index.add(encode_timestamp(timestamp), position)
+        self.assertEqual(list(index.positions), [0, 2, 1, 3])
+        self.assertEqual(list(index.between(encode_timestamp("2024-06-02"), encode_timestamp("2024-06-03T10:00:00"))),
+                         [2])
+        self.assertEqual(list(index.between(encode_timestamp("2024-06-02"), encode_timestamp("2024-07-01"))), [2, 1, 3])
+
+    def test_windowed_leaderboard(self):
+        index = WindowedLeaderboardIndex(2, 'day')
+        day = encode_timestamp("2024-06-12T00:00:00")
+        for position, (quiz, score, hour) in enumerate([("Quiz", 5, 1), ("quiz", 9, 2), ("IT", 7, 3), ("Quiz", 9, 4),
+                                                        ("Quiz", 3, 30)]):
+            index.add(quiz, score, day + hour * 3_600_000_000, position)
+        self.assertEqual(index.top(day, "QUIZ"), [1, 3])
+        self.assertEqual(index.top(day), [1, 3])
+        self.assertEqual(index.top(day + 86_400_000_000, "Quiz"), [4])
+        self.assertEqual(index.top(day - 86_400_000_000, "Quiz"), [])
+
+
+class TestResultIndexWindows(unittest.TestCase):
+    def setUp(self):
+        self.index = ResultIndex(3)
+        for user, quiz, score, timestamp in [("alice", "Quiz", 5, "2024-06-10T09:00:00"),
+                                             ("bob", "Quiz", 8, "2024-06-11T09:00:00"),
+                                             ("carol", "IT", 9, "2024-06-12T09:00:00"),
+                                             ("dave", "Quiz", 7, "2024-06-12T18:00:00"),
+                                             ("erin", "Quiz", 10, "2024-06-03T09:00:00"),
+                                             ("frank", "Quiz", 4, "")]:
+            self.index.add({"user": user, "quiz": quiz, "score": score, "timestamp": timestamp})
+
+    def test_windows(self):
+        at = "2024-06-12T20:00:00"
+        self.assertEqual([r["user"] for r in self.index.top_results("Quiz", 3)], ["erin", "bob", "dave"])
+        self.assertEqual([r["user"] for r in self.index.top_results("Quiz", 3, 'week', at)], ["bob", "dave", "alice"])
+        self.assertEqual([r["user"] for r in self.index.top_results("quiz", 3, 'day', at)], ["dave"])
+        self.assertEqual([r["user"] for r in self.index.total_top_results(2, 'day', at)], ["carol", "dave"])
+        self.assertEqual(self.index.top_results("Quiz", 3, 'day', "2024-06-13T00:00:00"), [])
+        with self.assertRaises(ValueError):
+            self.index.top_results("Quiz", 3, 'month', at)
+
+    def test_between(self):
+        top = self.index.top_results_between("Quiz", 3, "2024-06-03", "2024-06-11T09:00:00")
+        self.assertEqual([r["user"] for r in top], ["erin", "alice"])
+        top = self.index.top_results_between(None, 2, "2024-06-11", "2024-06-13")
+        self.assertEqual([r["user"] for r in top], ["carol", "bob"])
+
+
+class TestDistinctTopIndex(unittest.TestCase):
+    def test_update_keeps_best_entry_per_key(self):
+        index = DistinctTopIndex()
+        self.assertTrue(index.update("alice", 5, 0))
+        self.assertTrue(index.update("bob", 7, 1))
+        self.assertFalse(index.update("alice", 5, 2))
+        self.assertFalse(index.update("alice", 3, 3))
+        self.assertTrue(index.update("alice", 9, 4))
+        self.assertEqual(len(index), 2)
+        self.assertEqual(index.top(), [4, 1])
+        self.assertEqual(index.top(1), [4])
+        self.assertEqual(index.get("bob"), 1)
+        self.assertIsNone(index.get("carol"))
+
+
+class TestBestScoreIndex(unittest.TestCase):
+    def setUp(self):
+        self.results = [make_result("alice", "Quiz", 9), make_result("alice", "quiz", 9), make_result("alice", "Quiz", 10),
+                        make_result("bob", "Quiz", 8), make_result("alice", "IT", 4), make_result("carol", "IT", 10),
+                        make_result("bob", "IT", 12)]
+        self.index = BestScoreIndex()
+        for position, result in enumerate(self.results):
+            self.index.add(result, position)
+
+    def test_distinct_top_matches_full_scan(self):
+        for title in ("Quiz", "IT"):
+            best = {}
+            for position, result in enumerate(self.results):
+                if result["quiz"].lower() == title.lower():
+                    if result["user"] not in best or result["score"] > self.results[best[result["user"]]]["score"]:
+                        best[result["user"]] = position
+            expected = sorted(best.values(), key=lambda position: (-self.results[position]["score"], position))
+            self.assertEqual(self.index.top(title, 10), expected)
+        self.assertEqual(self.index.top("quiz", 1), [2])
+        self.assertEqual(self.index.top("Unknown", 5), [])
+
+    def test_total_top_has_one_entry_per_player(self):
+        self.assertEqual(self.index.total_top(10), [6, 2, 5])
+
+    def test_user_best(self):
+        self.assertEqual(self.index.user_best("alice"), [2, 4])
+        self.assertEqual(self.index.user_best("nobody"), [])
+        self.assertEqual(self.index.best("bob", "it"), 6)
+        self.assertIsNone(self.index.best("carol", "Quiz"))
+
+
+if __name__ == '__main__':
+    unittest.main()
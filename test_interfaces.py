@@ -3,8 +3,8 @@ from unittest.mock import patch, Mock
 from datetime import date
 from models import User, Quiz, Result, Question
 from services import UserService, QuizService, ResultService
-from interfaces import UserMenu, AdminMenu
-from custom_exceptions import UserNotFoundException, InvalidDateFormatException
+from interfaces import UserMenu, AdminMenu, print_distribution
+from custom_exceptions import UserNotFoundException, InvalidDateFormatException, QuizNotFoundException
 
 
 class TestUserMenu(unittest.TestCase):
@@ -49,8 +49,12 @@ class TestUserMenu(unittest.TestCase):
     @patch('builtins.print')
     def test_take_quiz(self, mock_print, mock_input):
         self.user_menu.current_user = self.mock_user
-        self.quiz_service.get_quiz_by_title.return_value = self.mock_quiz
-        self.result_service.get_top_results.return_value = [{'user': 'testuser', 'score': 1}]
+        self.quiz_service.iter_quiz_questions.return_value = ("Sample Quiz", iter(self.mock_quiz.questions))
+        self.result_service.get_rank.return_value = 3
+        self.result_service.get_result_count.return_value = 40
+        self.result_service.get_percentile.return_value = 92.5
+        self.result_service.get_score_distribution.return_value = {
+            "total": 40, "min": 0, "max": 1, "mean": 0.5, "median": 0.5, "histogram": [20, 20]}
         self.user_menu.take_quiz()
 
         mock_print.assert_any_call("\nAvailable Quizzes:")
@@ -59,16 +63,92 @@ class TestUserMenu(unittest.TestCase):
         mock_print.assert_any_call("1. Option 1")
         mock_print.assert_any_call("2. Option 2")
         mock_print.assert_any_call("\nQuiz completed! Your score: 1/1")
-        mock_print.assert_any_call("Your ranking: 1")
+        mock_print.assert_any_call("Your ranking: 3 of 40")
+        mock_print.assert_any_call("You scored better than 92.5% of results.")
+        mock_print.assert_any_call("Mean: 0.5   Median: 0.5   Best: 1   Lowest: 0")
+        mock_print.assert_any_call(f"    1 | {'#' * 40} 20  <- you")
+        self.result_service.get_rank.assert_called_once_with("Sample Quiz", 1)
 
-    @patch('builtins.input', side_effect=["Sample Quiz"])
+    @patch('builtins.input', side_effect=["Sample Quiz", "1"])
+    @patch('builtins.print')
+    def test_take_quiz_stream_error(self, mock_print, mock_input):
+        def questions():
+            yield self.mock_question
+            raise QuizNotFoundException("Quiz 'Sample Quiz' could not be read: truncated")
+
+        self.user_menu.current_user = self.mock_user
+        self.quiz_service.iter_quiz_questions.return_value = ("Sample Quiz", questions())
+        self.user_menu.take_quiz()
+        printed = [str(call.args[0]) for call in mock_print.call_args_list if call.args]
+        self.assertIn("Quiz 'Sample Quiz' could not be read: truncated", printed)
+        self.result_service.save_result.assert_not_called()
+
+    @patch('builtins.input', side_effect=["Sample Quiz", ""])
     @patch('builtins.print')
     def test_view_top_results(self, mock_print, mock_input):
         self.result_service.get_top_results.return_value = [
             {'user': 'testuser', 'score': 1, 'timestamp': '2024-06-11'}
         ]
         self.user_menu.view_top_results()
-        self.result_service.get_top_results.assert_called_once()
+        self.result_service.get_top_results.assert_called_once_with("Sample Quiz", 'all')
+        mock_print.assert_any_call("\nTOP-20 results for quiz 'Sample Quiz' (all time):")
+
+    @patch('builtins.input', side_effect=["3"])
+    @patch('builtins.print')
+    def test_view_total_top_results_today(self, mock_print, mock_input):
+        self.result_service.get_total_top_results.return_value = []
+        self.user_menu.view_total_top_results()
+        self.result_service.get_total_top_results.assert_called_once_with('day')
+        mock_print.assert_any_call("\nTOP-20 results for all quizzes (today):")
+
+    @patch('builtins.input', side_effect=["n", "d", ""])
+    @patch('builtins.print')
+    def test_view_results_pages(self, mock_print, mock_input):
+        self.user_menu.current_user = self.mock_user
+        self.result_service.get_user_result_count.return_value = 12
+        self.result_service.get_user_results.return_value = [self.mock_result.to_dict()]
+        self.user_menu.view_results()
+        calls = [(c.kwargs['sort'], c.kwargs['offset']) for c in self.result_service.get_user_results.call_args_list]
+        self.assertEqual(calls, [('score', 0), ('score', 10), ('timestamp', 0)])
+        mock_print.assert_any_call("\nShowing 11-11 of 12, sorted by score.")
+
+    @patch('builtins.print')
+    def test_view_results_empty(self, mock_print):
+        self.user_menu.current_user = self.mock_user
+        self.result_service.get_user_result_count.return_value = 0
+        self.user_menu.view_results()
+        mock_print.assert_called_once_with("\nNo results found.")
+        self.result_service.get_user_results.assert_not_called()
+
+    @patch('builtins.input', side_effect=["Sample Quiz", "4"])
+    @patch('builtins.print')
+    def test_view_top_results_per_player(self, mock_print, mock_input):
+        self.result_service.get_distinct_top_results.return_value = []
+        self.user_menu.view_top_results()
+        self.result_service.get_distinct_top_results.assert_called_once_with("Sample Quiz")
+        self.result_service.get_top_results.assert_not_called()
+
+    @patch('builtins.input', side_effect=["Unknown"])
+    @patch('builtins.print')
+    def test_view_distribution_empty(self, mock_print, mock_input):
+        self.result_service.get_score_distribution.return_value = {
+            "total": 0, "min": None, "max": None, "mean": None, "median": None, "histogram": []}
+        self.user_menu.view_distribution()
+        mock_print.assert_called_once_with("\nNo results for quiz 'Unknown' yet.")
+
+    @patch('builtins.print')
+    def test_print_distribution_marks_score(self, mock_print):
+        print_distribution("Quiz", {"total": 2, "min": 0, "max": 1, "mean": 0.5, "median": 0.5,
+                                    "histogram": [1, 1]}, marker=1, width=4)
+        mock_print.assert_any_call("    1 | #### 1  <- you")
+
+    @patch('builtins.print')
+    def test_view_best_results(self, mock_print):
+        self.user_menu.current_user = self.mock_user
+        self.result_service.get_user_best_results.return_value = [self.mock_result.to_dict()]
+        self.user_menu.view_best_results()
+        self.result_service.get_user_best_results.assert_called_once_with(self.mock_user)
+        mock_print.assert_any_call(f"{'Sample Quiz':<20}{1:<15}{self.mock_result.timestamp:<40}")
 
     @patch('builtins.input', side_effect=["1", "newpassword", "0"])
     def test_change_settings_password(self, mock_input):
@@ -89,6 +169,19 @@ class TestAdminMenu(unittest.TestCase):
         self.mock_question = Question("Sample Question", ["Option 1", "Option 2"], ["Option 1"])
         self.mock_quiz.add_question(self.mock_question)
 
+    @patch('builtins.input', side_effect=["Sample Quiz"])
+    @patch('builtins.print')
+    def test_view_distribution(self, mock_print, mock_input):
+        self.quiz_service.quizzes = [self.mock_quiz]
+        self.result_service.get_score_distribution.return_value = {
+            "total": 4, "min": 0, "max": 2, "mean": 1.25, "median": 1.5, "histogram": [1, 1, 2]}
+        self.admin_menu.view_distribution()
+        self.result_service.get_score_distribution.assert_called_once_with("Sample Quiz")
+        mock_print.assert_any_call("\nScore distribution for quiz 'Sample Quiz' (4 results):")
+        mock_print.assert_any_call("Mean: 1.2   Median: 1.5   Best: 2   Lowest: 0")
+        mock_print.assert_any_call(f"    2 | {'#' * 40} 2")
+        mock_print.assert_any_call(f"    0 | {'#' * 20:<40} 1")
+
     @patch('builtins.input', side_effect=["admin", "adminpass"])
     def test_authenticate_admin(self, mock_input):
         self.user_service.authenticate_admin.return_value = self.mock_admin
@@ -103,6 +196,17 @@ class TestAdminMenu(unittest.TestCase):
         self.admin_menu.create_quiz()
         self.quiz_service.save_quiz.assert_called_once()
 
+    @patch('builtins.input',
+           side_effect=["New Quiz", "New Question", "Option 1", "Option 2", "end", "Option 3", "Option 2", "end",
+                        "end"])
+    @patch('builtins.print')
+    def test_create_quiz_rejects_unknown_correct_answer(self, mock_print, mock_input):
+        self.admin_menu.current_admin = self.mock_admin
+        self.admin_menu.create_quiz()
+        mock_print.assert_any_call("Correct answer must match one of the options.")
+        quiz = self.quiz_service.save_quiz.call_args[0][0]
+        self.assertEqual(quiz.questions[0].correct_answers, ["Option 2"])
+
     @patch('builtins.input',
            side_effect=["Sample Quiz", "1", "Updated Question", "Updated Option 1", "end", "Updated Option 1", "end",
                         "end"])
@@ -111,6 +215,7 @@ class TestAdminMenu(unittest.TestCase):
         self.quiz_service.get_quiz_by_title.return_value = self.mock_quiz
         self.admin_menu.edit_quiz()
         self.quiz_service.save_quiz.assert_called_once()
+        self.quiz_service.refresh_quizzes.assert_not_called()
 
 
 if __name__ == '__main__':
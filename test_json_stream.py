@@ -0,0 +1,72 @@
+import unittest
+import io
+import json
+from json_stream import JsonStream, iter_json_array
+
+
+class TestIterJsonArray(unittest.TestCase):
+    def setUp(self):
+        self.document = {
+            "title": "Test Quiz",
+            "questions": [
+                {"text": f"Question {i}?", "options": ["Option 1", "Option 2", "Опція 3"],
+                 "correct_answers": ["Option 1"], "weight": 12345 + i}
+                for i in range(50)
+            ],
+            "version": 1234567,
+        }
+        self.text = json.dumps(self.document, indent=4)
+
+    def test_yields_items_for_every_chunk_size(self):
+        for chunk_size in (1, 2, 7, 64, 65536):
+            fields = {}
+            items = list(iter_json_array(io.StringIO(self.text), 'questions', fields, chunk_size=chunk_size))
+            self.assertEqual(items, self.document["questions"])
+            self.assertEqual(fields, {"title": "Test Quiz", "version": 1234567})
+
+    def test_numbers_cut_at_chunk_boundary(self):
+        document = {"z": 1.5, "e": -2.5e-3, "big": 12345678901234567890, "flag": True,
+                    "questions": [0.25, 1e10, -7, 3.0, {"weight": 10.125}]}
+        text = json.dumps(document)
+        for chunk_size in range(1, len(text) + 1):
+            fields = {}
+            items = list(iter_json_array(io.StringIO(text), 'questions', fields, chunk_size=chunk_size))
+            self.assertEqual(items, document["questions"], chunk_size)
+            self.assertEqual(fields, {k: v for k, v in document.items() if k != "questions"}, chunk_size)
+
+    def test_fields_before_the_array_are_available_at_first_item(self):
+        fields = {}
+        items = iter_json_array(io.StringIO(self.text), 'questions', fields, chunk_size=16)
+        next(items)
+        self.assertEqual(fields, {"title": "Test Quiz"})
+
+    def test_empty_array_and_object(self):
+        self.assertEqual(list(iter_json_array(io.StringIO('{"questions": []}'), 'questions')), [])
+        self.assertEqual(list(iter_json_array(io.StringIO(' { } '), 'questions')), [])
+
+    def test_buffer_stays_bounded(self):
+        file = io.StringIO(json.dumps({"title": "Big", "questions": self.document["questions"] * 200}))
+        stream_sizes = []
+        original_fill = JsonStream._fill
+
+        def tracking_fill(stream):
+            filled = original_fill(stream)
+            stream_sizes.append(len(stream.data))
+            return filled
+
+        JsonStream._fill = tracking_fill
+        try:
+            count = sum(1 for _ in iter_json_array(file, 'questions', chunk_size=1024))
+        finally:
+            JsonStream._fill = original_fill
+        self.assertEqual(count, 10000)
+        self.assertLess(max(stream_sizes), 2048)
+
+    def test_invalid_documents(self):
+        for text in ('[1, 2]', '{"questions": [1, 2}', '{"questions": [{"text": "cut', '{1: 2}', ''):
+            with self.assertRaises(json.JSONDecodeError):
+                list(iter_json_array(io.StringIO(text), 'questions', chunk_size=4))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -15,6 +15,28 @@ class TestQuestion(unittest.TestCase):
         }
         self.assertEqual(self.question.to_dict(), expected_dict)
 
+    def test_correct_answers_are_stored_as_bitmask(self):
+        question = Question("Which?", ["A", "B", "C", "D"], ["D", "B"])
+        self.assertEqual(question.correct_mask, 0b1010)
+        self.assertEqual(question.correct_answers, ["B", "D"])
+
+    def test_round_trip(self):
+        data = {"text": "Which?", "options": ["A", "B", "C"], "correct_answers": ["A", "C"]}
+        question = Question(data["text"], data["options"], data["correct_answers"])
+        self.assertEqual(question.to_dict(), data)
+
+    def test_correct_answer_must_be_an_option(self):
+        with self.assertRaises(ValueError):
+            Question("Which?", ["A", "B"], ["C"])
+
+    def test_options_are_interned(self):
+        other = Question("Other?", ["".join(["Option", " 1"]), "Option 3"], ["Option 3"])
+        self.assertIs(other.options[0], self.question.options[0])
+
+    def test_slots(self):
+        with self.assertRaises(AttributeError):
+            self.question.extra = True
+
 
 class TestQuiz(unittest.TestCase):
     def setUp(self):
@@ -68,7 +90,7 @@ class TestResult(unittest.TestCase):
         self.timestamp = datetime.now().isoformat()
 
     def test_to_dict(self):
-        self.result.date = datetime(2024, 6, 12, 12, 0, 0)
+        self.result.timestamp = self.timestamp
         expected_dict = {
             "user": "testuser",
             "quiz": "Test Quiz",
@@ -77,6 +99,14 @@ class TestResult(unittest.TestCase):
         }
         self.assertEqual(self.result.to_dict(), expected_dict)
 
+    def test_result_keeps_only_identifiers(self):
+        self.assertEqual(self.result.login, "testuser")
+        self.assertEqual(self.result.quiz_title, "Test Quiz")
+        self.assertFalse(hasattr(self.result, "__dict__"))
+
+    def test_to_dict_without_quiz(self):
+        self.assertEqual(Result(self.user, None, 5).to_dict()["quiz"], "")
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,99 @@
+import unittest
+import os
+import json
+import tempfile
+from unittest.mock import patch
+from repositories import QuizRepository
+from quiz_pack import QuizPack, compile_pack, PACK_FILENAME
+
+
+class TestQuizPack(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.quizzes_dir = self.tmpdir.name
+        self.write_quiz("quiz_python.json", "Python", [
+            {"text": "Sample Question?", "options": ["Option 1", "Option 2"], "correct_answers": ["Option 1"]},
+            {"text": "Ще одне питання?", "options": ["Так", "Ні", "Option 1"], "correct_answers": ["Так", "Ні"]},
+        ])
+        self.write_quiz("quiz_it.json", "IT", [
+            {"text": "What does CPU stand for?", "options": ["Central Processing Unit", "Option 2"],
+             "correct_answers": ["Central Processing Unit"]},
+        ])
+        self.quiz_repo = QuizRepository(self.quizzes_dir)
+        self.pack_filepath = os.path.join(self.quizzes_dir, PACK_FILENAME)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def write_quiz(self, filename, title, questions):
+        with open(os.path.join(self.quizzes_dir, filename), 'w') as file:
+            json.dump({"title": title, "questions": questions}, file, indent=4)
+
+    def test_compile_and_read(self):
+        self.assertEqual(compile_pack(self.quiz_repo), 2)
+        pack = QuizPack(self.pack_filepath)
+        try:
+            quiz_id, _, _ = pack.get_entry("quiz_python.json")
+            self.assertEqual(pack.load_header(quiz_id), ("Python", 2))
+            question = pack.get_question(quiz_id, 1)
+            self.assertEqual(question.text, "Ще одне питання?")
+            self.assertEqual(question.correct_answers, ["Так", "Ні"])
+            with self.assertRaises(IndexError):
+                pack.get_question(quiz_id, 2)
+            self.assertIsNone(pack.get_entry("quiz_missing.json"))
+        finally:
+            pack.close()
+
+    def test_repository_round_trip(self):
+        compile_pack(self.quiz_repo)
+        for filepath in self.quiz_repo.get_all_quiz_files():
+            self.assertEqual(self.quiz_repo.load(filepath).to_dict(), self.quiz_repo.load_json(filepath).to_dict())
+
+    def test_repository_prefers_fresh_pack(self):
+        compile_pack(self.quiz_repo)
+        filepath = os.path.join(self.quizzes_dir, "quiz_python.json")
+        with patch("json.load") as mock_json_load:
+            quiz = self.quiz_repo.load(filepath)
+            self.assertEqual(self.quiz_repo.load_header(filepath), ("Python", 2))
+            self.assertEqual(len(self.quiz_repo.get_file_hash(filepath)), 32)
+        mock_json_load.assert_not_called()
+        self.assertEqual(quiz.title, "Python")
+
+    def test_repository_loads_single_questions_from_pack(self):
+        compile_pack(self.quiz_repo)
+        filepath = os.path.join(self.quizzes_dir, "quiz_python.json")
+        with patch("json.load") as mock_json_load:
+            questions = self.quiz_repo.load_questions(filepath, [1])
+        mock_json_load.assert_not_called()
+        self.assertEqual(questions[0].text, "Ще одне питання?")
+
+    def test_repository_falls_back_to_changed_json(self):
+        compile_pack(self.quiz_repo)
+        self.write_quiz("quiz_python.json", "Python 2", [
+            {"text": "New?", "options": ["A", "B"], "correct_answers": ["B"]},
+        ])
+        filepath = os.path.join(self.quizzes_dir, "quiz_python.json")
+        os.utime(filepath, ns=(0, 0))
+        self.assertEqual(self.quiz_repo.load_header(filepath), ("Python 2", 1))
+        self.assertEqual(self.quiz_repo.load(filepath).questions[0].text, "New?")
+
+    def test_repository_reopens_recompiled_pack(self):
+        compile_pack(self.quiz_repo)
+        filepath = os.path.join(self.quizzes_dir, "quiz_it.json")
+        self.assertEqual(self.quiz_repo.load_header(filepath), ("IT", 1))
+        self.write_quiz("quiz_it.json", "IT", [])
+        compile_pack(self.quiz_repo)
+        os.utime(self.pack_filepath, ns=(1, 1))
+        self.assertEqual(self.quiz_repo.load_header(filepath), ("IT", 0))
+
+    def test_invalid_pack_is_ignored(self):
+        with open(self.pack_filepath, 'wb') as file:
+            file.write(b"not a pack at all")
+        filepath = os.path.join(self.quizzes_dir, "quiz_it.json")
+        with patch("builtins.print") as mock_print:
+            self.assertEqual(self.quiz_repo.load_header(filepath), ("IT", 1))
+        mock_print.assert_called_once()
+
+
+if __name__ == '__main__':
+    unittest.main()
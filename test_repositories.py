@@ -2,9 +2,12 @@ import unittest
 from unittest.mock import mock_open, patch, MagicMock
 from datetime import date, datetime
 import os
+import json
+import tempfile
 from models import User, Admin, Quiz, Question, Result
-from repositories import UserRepository, AdminRepository, QuizRepository, ResultRepository
-from custom_exceptions import SavingErrorException
+from repositories import (UserRepository, AdminRepository, QuizRepository, ResultRepository, JsonlResultRepository,
+                          SegmentedResultRepository)
+from custom_exceptions import SavingErrorException, UserAlreadyExistsException
 
 
 class TestUserRepository(unittest.TestCase):
@@ -12,6 +15,8 @@ class TestUserRepository(unittest.TestCase):
         self.filepath = "test_users.json"
         self.user_repo = UserRepository(self.filepath)
         self.user = User("testuser", "password", date(2000, 1, 1))
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
 
     @patch("builtins.open", new_callable=mock_open, read_data='[]')
     def test_load_empty(self, mock_file):
@@ -27,20 +32,32 @@ class TestUserRepository(unittest.TestCase):
         self.assertEqual(users[0].login, "testuser")
         mock_file.assert_called_with(self.filepath, 'r')
 
-    @patch("builtins.open", new_callable=mock_open)
-    @patch("json.dump")
-    def test_save(self, mock_json_dump, mock_file):
+    def test_save(self):
+        self.user_repo.filepath = os.path.join(self.tmpdir.name, "users.json")
+        with patch("builtins.print"):
+            self.user_repo.save(self.user)
+        self.user_repo.save(User("other", "secret", date(1999, 1, 1)))
+        self.assertEqual([u.login for u in self.user_repo.load()], ["testuser", "other"])
+        self.assertFalse([f for f in os.listdir(self.tmpdir.name) if f.endswith('.tmp')])
+
+    def test_save_duplicate_login(self):
+        self.user_repo.filepath = os.path.join(self.tmpdir.name, "users.json")
         self.user_repo.save(self.user)
-        mock_file.assert_called_with(self.filepath, 'w')
-        mock_json_dump.assert_called_once()
+        with self.assertRaises(UserAlreadyExistsException):
+            self.user_repo.save(User("TestUser", "other", date(2001, 1, 1)))
+        self.assertEqual(len(self.user_repo.load()), 1)
+
+    def test_save_all(self):
+        self.user_repo.filepath = os.path.join(self.tmpdir.name, "users.json")
+        self.user_repo.save_all([self.user])
+        self.assertEqual([u.login for u in self.user_repo.load()], ["testuser"])
 
-    @patch("builtins.open", new_callable=mock_open)
-    @patch("json.dump")
-    def test_save_all(self, mock_json_dump, mock_file):
-        users = [self.user]
-        self.user_repo.save_all(users)
-        mock_file.assert_called_with(self.filepath, 'w')
-        mock_json_dump.assert_called_once()
+    def test_update(self):
+        self.user_repo.filepath = os.path.join(self.tmpdir.name, "users.json")
+        self.user_repo.save_all([self.user, User("other", "secret", date(1999, 1, 1))])
+        self.user_repo.update(User("TestUser", "newpassword", date(2000, 1, 1)))
+        users = self.user_repo.load()
+        self.assertEqual([(u.login, u.password) for u in users], [("TestUser", "newpassword"), ("other", "secret")])
 
 
 class TestAdminRepository(unittest.TestCase):
@@ -62,12 +79,12 @@ class TestAdminRepository(unittest.TestCase):
         self.assertEqual(admins[0].login, "admin")
         mock_file.assert_called_with(self.filepath, 'r')
 
-    @patch("builtins.open", new_callable=mock_open)
-    @patch("json.dump")
-    def test_save(self, mock_json_dump, mock_file):
-        self.admin_repo.save(self.admin)
-        mock_file.assert_called_with(self.filepath, 'w')
-        mock_json_dump.assert_called_once()
+    def test_save(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            self.admin_repo.filepath = os.path.join(tmpdir, "admins.json")
+            with patch("builtins.print"):
+                self.admin_repo.save(self.admin)
+            self.assertEqual([a.login for a in self.admin_repo.load()], ["admin"])
 
 
 class TestQuizRepository(unittest.TestCase):
@@ -94,13 +111,65 @@ class TestQuizRepository(unittest.TestCase):
         self.assertEqual(len(quiz.questions), 1)
         self.assertEqual(quiz.questions[0].text, "Sample Question?")
 
-    @patch("builtins.open", new_callable=mock_open)
-    @patch("json.dump")
-    def test_save_quiz(self, mock_json_dump, mock_file):
-        filepath = os.path.join(self.quizzes_dir, "quiz_test.json")
-        self.quiz_repo.save(self.quiz, filepath)
-        mock_file.assert_called_with(filepath, 'w')
-        mock_json_dump.assert_called_once()
+    @patch("builtins.open", new_callable=mock_open, read_data='{"title": "Test Quiz", "questions": '
+                                                              '[{"text": "Sample Question?", '
+                                                              '"options": ["Option 1", "Option 2"], '
+                                                              '"correct_answers": ["Option 1"]}] }')
+    def test_load_header(self, mock_file):
+        self.assertEqual(self.quiz_repo.load_header("quiz_test.json"), ("Test Quiz", 1))
+
+    @patch("builtins.open", new_callable=mock_open, read_data='{"title": "Test Quiz", "questions": ['
+                                                              '{"text": "Q1?", "options": ["A", "B"], '
+                                                              '"correct_answers": ["A"]}, '
+                                                              '{"text": "Q2?", "options": ["A", "B"], '
+                                                              '"correct_answers": ["B"]}] }')
+    def test_load_questions(self, mock_file):
+        questions = self.quiz_repo.load_questions("quiz_test.json", [1, 0])
+        self.assertEqual([q.text for q in questions], ["Q2?", "Q1?"])
+
+    @patch("builtins.print")
+    @patch("builtins.open", new_callable=mock_open, read_data='{"title": "Test Quiz", "questions": ['
+                                                              '{"text": "Q1?", "options": ["Yes", "No"], '
+                                                              '"correct_answers": ["yes"]}] }')
+    def test_load_quiz_invalid_answer(self, mock_file, mock_print):
+        self.assertIsNone(self.quiz_repo.load("quiz_test.json"))
+        self.assertEqual(self.quiz_repo.load_questions("quiz_test.json", [0]), [])
+        self.assertIn("Invalid", mock_print.call_args_list[0].args[0])
+
+    def test_iter_questions_streams_file(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            filepath = os.path.join(tmpdir, "quiz_big.json")
+            with open(filepath, 'w') as file:
+                json.dump({"title": "Big Quiz", "questions": [
+                    {"text": f"Q{i}?", "options": ["A", "B"], "correct_answers": ["B"]} for i in range(5000)]}, file)
+            questions = self.quiz_repo.iter_questions(filepath)
+            self.assertEqual(next(questions).text, "Q0?")
+            self.assertEqual(sum(1 for _ in questions), 4999)
+            self.assertEqual(self.quiz_repo.read_header(filepath), ("Big Quiz", 5000))
+            self.assertEqual([q.text for q in self.quiz_repo.load_questions(filepath, [4999, 3])], ["Q4999?", "Q3?"])
+
+    @patch("builtins.open", side_effect=FileNotFoundError)
+    def test_load_header_not_found(self, mock_file):
+        self.assertIsNone(self.quiz_repo.load_header("non_existent_quiz.json"))
+
+    def test_save_quiz(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            filepath = os.path.join(tmpdir, "quiz_test.json")
+            self.quiz_repo.save(self.quiz, filepath)
+            self.assertEqual(self.quiz_repo.load_json(filepath).title, self.quiz.title)
+            self.assertEqual(sorted(os.listdir(tmpdir)), ["quiz_test.json", "quiz_test.json.lock"])
+
+    @patch("json.dump", side_effect=SavingErrorException("Mock Saving Error"))
+    def test_save_quiz_keeps_old_file_on_error(self, mock_json_dump):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            filepath = os.path.join(tmpdir, "quiz_test.json")
+            with open(filepath, 'w') as file:
+                file.write('{"title": "Old Quiz", "questions": []}')
+            with patch("builtins.print") as mock_print:
+                self.quiz_repo.save(self.quiz, filepath)
+            mock_print.assert_called_with(f"Error saving quiz to '{filepath}': Mock Saving Error.")
+            self.assertEqual(self.quiz_repo.load_json(filepath).title, "Old Quiz")
+            self.assertEqual(sorted(os.listdir(tmpdir)), ["quiz_test.json", "quiz_test.json.lock"])
 
     @patch("os.listdir", return_value=["quiz1.json", "quiz2.json"])
     def test_get_all_quiz_files(self, mock_listdir):
@@ -108,6 +177,24 @@ class TestQuizRepository(unittest.TestCase):
         expected_files = [os.path.join(self.quizzes_dir, "quiz1.json"), os.path.join(self.quizzes_dir, "quiz2.json")]
         self.assertEqual(quiz_files, expected_files)
 
+    def test_get_file_signature_and_hash(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            filepath = os.path.join(tmpdir, "quiz_test.json")
+            with open(filepath, 'w') as file:
+                file.write('{"title": "Test Quiz", "questions": []}')
+            signature = self.quiz_repo.get_file_signature(filepath)
+            digest = self.quiz_repo.get_file_hash(filepath)
+            self.assertEqual(signature[1], os.path.getsize(filepath))
+            self.assertEqual(digest, self.quiz_repo.get_file_hash(filepath))
+
+            with open(filepath, 'w') as file:
+                file.write('{"title": "Test Quiz 2", "questions": []}')
+            self.assertNotEqual(self.quiz_repo.get_file_hash(filepath), digest)
+
+    def test_get_file_signature_missing_file(self):
+        self.assertIsNone(self.quiz_repo.get_file_signature("non_existent_quiz.json"))
+        self.assertIsNone(self.quiz_repo.get_file_hash("non_existent_quiz.json"))
+
 
 class TestResultRepository(unittest.TestCase):
     def setUp(self):
@@ -140,24 +227,181 @@ class TestResultRepository(unittest.TestCase):
             self.assertEqual(results, [])
             mock_print.assert_called_with(f"Error decoding JSON from '{self.filepath}'.")
 
-    @patch("builtins.open", new_callable=mock_open)
-    @patch("json.dump")
-    def test_save_result(self, mock_json_dump, mock_file):
-        self.result_repo.load = MagicMock(return_value=[])
-        # self.result_repo.load = patch("repositories.ResultRepository.load", return_value=[]).start()
-        self.result_repo.save(self.result, self.filepath)
-        mock_file.assert_called_with(self.filepath, 'w')
-        mock_json_dump.assert_called_once_with([self.result.to_dict()], mock_file(), indent=4)
-        # mock_json_dump.assert_called_once()
-        # patch.stopall()
-
-    @patch("builtins.open", new_callable=mock_open)
+    def test_save_result(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            filepath = os.path.join(tmpdir, "results.json")
+            self.result_repo.save(self.result, filepath)
+            self.result_repo.save(self.result, filepath)
+            self.assertEqual(self.result_repo.load(filepath), [self.result.to_dict()] * 2)
+
     @patch("json.dump", side_effect=SavingErrorException("Mock Saving Error"))
-    def test_save_result_saving_error(self, mock_json_dump, mock_file):
+    def test_save_result_saving_error(self, mock_json_dump):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            filepath = os.path.join(tmpdir, "results.json")
+            with patch("builtins.print") as mock_print:
+                self.result_repo.save(self.result, filepath)
+                mock_print.assert_called_with(f"Error saving result to '{filepath}': Mock Saving Error.")
+                mock_json_dump.assert_called_once()
+            self.assertFalse(os.path.exists(filepath))
+
+
+class TestJsonlResultRepository(unittest.TestCase):
+    def setUp(self):
+        self.result_repo = JsonlResultRepository()
+        self.filepath = "test_results.jsonl"
+        self.user = User(login="testuser", password="password", birth_date=datetime(2000, 1, 1))
+        self.quiz = Quiz(title="testquiz")
+        self.result = Result(user=self.user, quiz=self.quiz, score=100)
+
+    @patch("builtins.open", new_callable=mock_open,
+           read_data='{"user": "testuser", "quiz": "testquiz", "score": 100, "timestamp": "2024-01-01T00:00:00"}\n'
+                     '\n'
+                     '{"user": "otheruser", "quiz": "testquiz", "score": 50, "timestamp": "2024-01-02T00:00:00"}\n')
+    def test_iter_results(self, mock_file):
+        results = list(self.result_repo.iter_results(self.filepath))
+        self.assertEqual(len(results), 2)
+        self.assertEqual(results[0]['user'], "testuser")
+        self.assertEqual(results[1]['score'], 50)
+        mock_file.assert_called_with(self.filepath, 'r')
+
+    @patch("builtins.open", side_effect=FileNotFoundError)
+    def test_load_results_file_not_found(self, mock_file):
+        self.assertEqual(self.result_repo.load(self.filepath), [])
+
+    @patch("builtins.open", new_callable=mock_open,
+           read_data='{"user": "testuser", "quiz": "testquiz", "score": 100}\n{"user": "trunc')
+    def test_iter_results_skips_truncated_line(self, mock_file):
         with patch("builtins.print") as mock_print:
-            self.result_repo.save(self.result, self.filepath)
-            mock_print.assert_called_with(f"Error saving result to '{self.filepath}': Mock Saving Error.")
-            mock_json_dump.assert_called_once()
+            results = self.result_repo.load(self.filepath)
+            self.assertEqual(len(results), 1)
+            mock_print.assert_called_with(f"Error decoding JSON from '{self.filepath}' at line 2.")
+
+    def test_save_result_appends_single_line(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            filepath = os.path.join(tmpdir, "results.jsonl")
+            self.result_repo.save(self.result, filepath)
+            with open(filepath) as file:
+                self.assertEqual(file.read(), json.dumps(self.result.to_dict()) + '\n')
+
+    @patch("file_locks.os.fsync")
+    def test_save_many_writes_batch_once(self, mock_fsync):
+        results = [self.result.to_dict(), self.result.to_dict()]
+        with tempfile.TemporaryDirectory() as tmpdir:
+            filepath = os.path.join(tmpdir, "results.jsonl")
+            self.result_repo.save_many(results, filepath, fsync=True)
+            self.assertEqual(self.result_repo.load(filepath), results)
+        mock_fsync.assert_called_once()
+
+    @patch("file_locks.os.fsync")
+    def test_save_many_without_fsync(self, mock_fsync):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            self.result_repo.save_many([self.result.to_dict()], os.path.join(tmpdir, "results.jsonl"))
+        mock_fsync.assert_not_called()
+
+    def test_save_after_truncated_line_starts_new_line(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            filepath = os.path.join(tmpdir, "results.jsonl")
+            with open(filepath, 'w') as file:
+                file.write('{"user": "testuser", "quiz": "testquiz", "score": 100}\n{"user": "trunc')
+            self.result_repo.save(self.result, filepath)
+            with patch("builtins.print"):
+                results = self.result_repo.load(filepath)
+            self.assertEqual([r["score"] for r in results], [100, 100])
+            self.assertEqual(results[1], self.result.to_dict())
+
+    def test_migrate(self):
+        legacy = [{"user": "testuser", "quiz": "testquiz", "score": 100, "timestamp": "2024-01-01T00:00:00"},
+                  {"user": "otheruser", "quiz": "testquiz", "score": 50, "timestamp": "2024-01-02T00:00:00"}]
+        with tempfile.TemporaryDirectory() as tmpdir:
+            filepath = os.path.join(tmpdir, "results.jsonl")
+            with patch.object(ResultRepository, "load", return_value=legacy):
+                migrated = self.result_repo.migrate("test_results.json", filepath)
+            self.assertEqual(migrated, 2)
+            self.assertEqual(self.result_repo.load(filepath), legacy)
+
+
+class TestSegmentedResultRepository(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.directory = os.path.join(self.tmpdir.name, "results")
+        self.result_repo = SegmentedResultRepository()
+        self.results = [
+            {"user": "user1", "quiz": "Python", "score": 10, "timestamp": "2024-01-10T00:00:00"},
+            {"user": "user2", "quiz": "IT", "score": 30, "timestamp": "2024-01-20T00:00:00"},
+            {"user": "user3", "quiz": "python", "score": 25, "timestamp": "2024-02-05T00:00:00"},
+            {"user": "user4", "quiz": "Python", "score": 10, "timestamp": "2024-03-01T00:00:00"},
+            {"user": "user5", "quiz": "IT", "score": 5, "timestamp": "2024-03-15T00:00:00"},
+        ]
+        self.result_repo.save_many(self.results, self.directory)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_partitions_by_month(self):
+        files = sorted(f for f in os.listdir(self.directory) if f.startswith("results-"))
+        self.assertEqual(files, ["results-2024-01.jsonl", "results-2024-02.jsonl", "results-2024-03.jsonl"])
+        self.assertEqual(self.result_repo.load(self.directory), self.results)
+
+    def test_manifest(self):
+        manifest = self.result_repo.load_manifest(self.directory)
+        self.assertEqual(manifest["2024-01"]["count"], 2)
+        self.assertEqual(manifest["2024-01"]["min_timestamp"], "2024-01-10T00:00:00")
+        self.assertEqual(manifest["2024-01"]["max_timestamp"], "2024-01-20T00:00:00")
+        self.assertEqual(manifest["2024-03"]["best_scores"], {"python": 10, "it": 5})
+        self.assertEqual(self.result_repo.best_score(self.directory, "PYTHON"), 25)
+        self.assertIsNone(self.result_repo.best_score(self.directory, "Unknown"))
+
+    def test_queries_skip_segments(self):
+        self.assertEqual([key for key, _ in self.result_repo.segments(self.directory, since="2024-02-10")],
+                         ["2024-03"])
+        self.assertEqual([key for key, _ in self.result_repo.segments(self.directory, quiz="python", until="2024-02")],
+                         ["2024-01"])
+        recent = list(self.result_repo.iter_results(self.directory, since="2024-03-10"))
+        self.assertEqual([r["user"] for r in recent], ["user5"])
+
+    def test_top_results(self):
+        top = self.result_repo.top_results(self.directory, "Python", 2)
+        self.assertEqual([(r["user"], r["score"]) for r in top], [("user3", 25), ("user1", 10)])
+
+    def test_recent_top_results_read_only_the_hot_segment(self):
+        with patch.object(self.result_repo, "_read_segment", wraps=self.result_repo._read_segment) as read:
+            top = self.result_repo.top_results(self.directory, None, 5, since="2024-03-01")
+        self.assertEqual([(r["user"], r["score"]) for r in top], [("user4", 10), ("user5", 5)])
+        self.assertEqual([c.args[1]["file"] for c in read.call_args_list], ["results-2024-03.jsonl"])
+        top = self.result_repo.top_results(self.directory, "Python", 5, "2024-01-01", "2024-03-01")
+        self.assertEqual([r["user"] for r in top], ["user3", "user1"])
+
+    def test_top_results_reads_only_contributing_segments(self):
+        with patch.object(self.result_repo, "_read_segment", wraps=self.result_repo._read_segment) as read:
+            self.result_repo.top_results(self.directory, "IT", 1)
+        self.assertEqual([c.args[1]["file"] for c in read.call_args_list], ["results-2024-01.jsonl"])
+
+    def test_compact_keeps_hot_segment(self):
+        self.assertEqual(self.result_repo.compact(self.directory), 2)
+        files = sorted(f for f in os.listdir(self.directory) if f.startswith("results-"))
+        self.assertEqual(files, ["results-2024-01.jsonl.gz", "results-2024-02.jsonl.gz", "results-2024-03.jsonl"])
+        self.assertEqual(self.result_repo.load(self.directory), self.results)
+        self.assertEqual(self.result_repo.compact(self.directory), 0)
+
+    def test_save_into_compacted_segment(self):
+        self.result_repo.compact(self.directory)
+        late = {"user": "user6", "quiz": "Python", "score": 40, "timestamp": "2024-01-31T00:00:00"}
+        self.result_repo.save_many([late], self.directory)
+        self.assertEqual(list(self.result_repo.iter_results(self.directory, until="2024-01-31T23:59:59"))[-1], late)
+        self.assertEqual(self.result_repo.best_score(self.directory, "Python"), 40)
+
+    def test_missing_manifest_is_rebuilt(self):
+        self.result_repo.compact(self.directory)
+        os.remove(os.path.join(self.directory, SegmentedResultRepository.MANIFEST_FILENAME))
+        self.assertEqual(self.result_repo.load(self.directory), self.results)
+        self.assertEqual(self.result_repo.best_score(self.directory, "IT"), 30)
+
+    def test_migrate(self):
+        source = os.path.join(self.tmpdir.name, "results.jsonl")
+        JsonlResultRepository().save_many(self.results, source)
+        directory = os.path.join(self.tmpdir.name, "migrated")
+        self.assertEqual(self.result_repo.migrate(source, directory), 5)
+        self.assertEqual(self.result_repo.load(directory), self.results)
 
 
 if __name__ == '__main__':
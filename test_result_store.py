@@ -0,0 +1,115 @@
+import unittest
+from unittest.mock import patch
+import result_store
+from result_store import ColumnarResultStore, encode_timestamp, decode_timestamp, MISSING_TIMESTAMP
+
+RESULTS = [
+    {"user": "alice", "quiz": "Python", "score": 10, "timestamp": "2024-06-01T10:00:00"},
+    {"user": "bob", "quiz": "python", "score": 15, "timestamp": "2024-06-02T11:30:00.250000"},
+    {"user": "alice", "quiz": "IT", "score": 20, "timestamp": "2024-06-03T09:00:00"},
+    {"user": "carol", "quiz": "Python", "score": 10, "timestamp": "2024-06-04T08:00:00"},
+    {"user": "bob", "quiz": "IT", "score": 5, "timestamp": ""},
+    {"user": "alice", "quiz": "Python", "score": 15, "timestamp": "2024-06-05T12:00:00"},
+]
+
+
+class TestTimestamps(unittest.TestCase):
+    def test_round_trip(self):
+        for timestamp in ["2024-06-01T10:00:00", "2024-06-02T11:30:00.250000", "1969-12-31T23:59:59"]:
+            self.assertEqual(decode_timestamp(encode_timestamp(timestamp)), timestamp)
+
+    def test_missing(self):
+        self.assertEqual(encode_timestamp(""), MISSING_TIMESTAMP)
+        self.assertEqual(encode_timestamp(None), MISSING_TIMESTAMP)
+        self.assertEqual(decode_timestamp(MISSING_TIMESTAMP), "")
+
+    def test_aware_timestamp_is_stored_as_utc(self):
+        self.assertEqual(encode_timestamp("2024-06-01T12:00:00+02:00"), encode_timestamp("2024-06-01T10:00:00"))
+
+
+class StoreTests:
+    def setUp(self):
+        self.store = ColumnarResultStore()
+        for result in RESULTS:
+            self.store.append(result)
+
+    def test_rows_round_trip(self):
+        self.assertEqual(len(self.store), len(RESULTS))
+        self.assertEqual(self.store.rows(range(len(RESULTS))), RESULTS)
+        self.assertEqual(self.store.users, ["alice", "bob", "carol"])
+        self.assertEqual(self.store.quizzes, ["Python", "python", "IT"])
+
+    def test_score_out_of_range(self):
+        with self.assertRaises(OverflowError):
+            self.store.append({"user": "dave", "quiz": "IT", "score": 70000, "timestamp": ""})
+        self.assertEqual(len(self.store.user_ids), len(self.store.scores))
+
+    def test_positions(self):
+        self.assertEqual(self.store.positions(user="alice"), [0, 2, 5])
+        self.assertEqual(self.store.positions(quiz="PYTHON"), [0, 1, 3, 5])
+        self.assertEqual(self.store.positions(user="alice", quiz="python"), [0, 5])
+        self.assertEqual(self.store.positions(since="2024-06-02T11:30:00.250000", until="2024-06-04"), [1, 2])
+        self.assertEqual(self.store.positions(user="nobody"), [])
+        self.assertEqual(self.store.positions(quiz="Unknown"), [])
+
+    def test_top_k(self):
+        self.assertEqual(self.store.top_k(3), [2, 1, 5])
+        self.assertEqual(self.store.top_k(3, self.store.positions(quiz="Python")), [1, 5, 0])
+        self.assertEqual(self.store.top_k(10, [4, 3]), [3, 4])
+        self.assertEqual(self.store.top_k(2, []), [])
+
+    def test_top_k_ties_keep_earliest(self):
+        store = ColumnarResultStore()
+        for i in range(50):
+            store.append({"user": f"user{i}", "quiz": "Quiz", "score": i % 5, "timestamp": ""})
+        self.assertEqual(store.top_k(4), [4, 9, 14, 19])
+
+    def test_sort_positions(self):
+        positions = self.store.positions(user="alice")
+        self.assertEqual(self.store.sort_positions(positions), [2, 5, 0])
+        self.assertEqual(self.store.sort_positions(positions, 'score', descending=False), [0, 5, 2])
+        self.assertEqual(self.store.sort_positions(positions, 'timestamp', offset=1, limit=1), [2])
+        self.assertEqual(self.store.sort_positions([4, 1], 'timestamp', descending=False), [4, 1])
+        self.assertEqual(self.store.sort_positions([0, 3, 1], 'score'), [1, 0, 3])
+        with self.assertRaises(ValueError):
+            self.store.sort_positions(positions, 'quiz')
+
+    def test_group_by(self):
+        self.assertEqual(self.store.group_by('quiz', 'count'), {"Python": 4, "IT": 2})
+        self.assertEqual(self.store.group_by('quiz', 'max'), {"Python": 15, "IT": 20})
+        self.assertEqual(self.store.group_by('user', 'sum'), {"alice": 45, "bob": 20, "carol": 10})
+        self.assertEqual(self.store.group_by('user', 'max', self.store.positions(quiz="Python")),
+                         {"alice": 15, "bob": 15, "carol": 10})
+        with self.assertRaises(ValueError):
+            self.store.group_by('score')
+        with self.assertRaises(ValueError):
+            self.store.group_by('quiz', 'median')
+
+
+@unittest.skipIf(result_store.np is None, "NumPy is not installed")
+class TestColumnarResultStoreNumpy(StoreTests, unittest.TestCase):
+    def test_store_keeps_growing_after_queries(self):
+        self.store.top_k(2)
+        self.store.group_by('quiz', 'max')
+        self.store.append({"user": "dave", "quiz": "IT", "score": 1, "timestamp": ""})
+        self.assertEqual(len(self.store), len(RESULTS) + 1)
+
+    def test_group_max_with_wide_score_range(self):
+        store = ColumnarResultStore()
+        for i in range(40):
+            store.append({"user": f"user{i % 20}", "quiz": "Quiz", "score": 60000 - i, "timestamp": ""})
+        best = store.group_by('user', 'max')
+        self.assertEqual(best["user0"], 60000)
+        self.assertEqual(best["user19"], 59981)
+
+
+class TestColumnarResultStoreWithoutNumpy(StoreTests, unittest.TestCase):
+    def setUp(self):
+        patcher = patch.object(result_store, "np", None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        super().setUp()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,136 @@
+import unittest
+import os
+import tempfile
+from datetime import date
+from unittest.mock import MagicMock, patch
+from models import User, Quiz, Result
+from repositories import JsonlResultRepository, SegmentedResultRepository
+from result_writer import BufferedResultWriter
+from services import ResultService
+
+
+class TestBufferedResultWriter(unittest.TestCase):
+    def setUp(self):
+        self.result_repo = MagicMock()
+        self.user = User("testuser", "password", date(2000, 1, 1))
+        self.result = Result(self.user, Quiz("Python"), 10)
+
+    def test_invalid_durability(self):
+        with self.assertRaises(ValueError):
+            BufferedResultWriter(self.result_repo, durability='sometimes', start=False)
+
+    def test_save_queues_until_flush(self):
+        writer = BufferedResultWriter(self.result_repo, start=False)
+        writer.save(self.result, "a.jsonl")
+        writer.save(self.result, "b.jsonl")
+        writer.save(self.result, "a.jsonl")
+        self.assertEqual(len(writer), 3)
+        self.assertEqual(len(writer.pending("a.jsonl")), 2)
+        self.result_repo.save_many.assert_not_called()
+
+        writer.flush()
+        self.assertEqual(len(writer), 0)
+        self.assertEqual(self.result_repo.save_many.call_count, 2)
+        results, filepath = self.result_repo.save_many.call_args_list[0].args
+        self.assertEqual(filepath, "a.jsonl")
+        self.assertEqual(len(results), 2)
+        self.assertEqual(self.result_repo.save_many.call_args_list[0].kwargs, {"fsync": True})
+
+    def test_durability_none_skips_fsync(self):
+        writer = BufferedResultWriter(self.result_repo, durability='none', start=False)
+        writer.save(self.result, "a.jsonl")
+        writer.flush()
+        self.assertEqual(self.result_repo.save_many.call_args.kwargs, {"fsync": False})
+
+    def test_iter_results_flushes_first(self):
+        writer = BufferedResultWriter(self.result_repo, start=False)
+        writer.save(self.result, "a.jsonl")
+        writer.iter_results("a.jsonl")
+        self.result_repo.save_many.assert_called_once()
+        self.result_repo.iter_results.assert_called_once_with("a.jsonl")
+        writer.top_results("a.jsonl", "Python", 5, since="2024-06-01")
+        self.result_repo.top_results.assert_called_once_with("a.jsonl", "Python", 5, since="2024-06-01")
+
+    def test_background_thread_flushes_full_batch(self):
+        writer = BufferedResultWriter(self.result_repo, max_batch=2, flush_interval=60)
+        writer.save(self.result, "a.jsonl")
+        writer.save(self.result, "a.jsonl")
+        writer._thread.join(0.5)
+        self.result_repo.save_many.assert_called_once()
+        writer.close()
+
+    def test_background_thread_flushes_on_interval(self):
+        writer = BufferedResultWriter(self.result_repo, max_batch=100, flush_interval=0.01)
+        writer.save(self.result, "a.jsonl")
+        writer._thread.join(0.5)
+        self.result_repo.save_many.assert_called_once()
+        writer.close()
+
+    def test_close_flushes_and_rejects_saves(self):
+        writer = BufferedResultWriter(self.result_repo, flush_interval=60)
+        writer.save(self.result, "a.jsonl")
+        writer.close()
+        self.result_repo.save_many.assert_called_once()
+        self.assertFalse(writer._thread.is_alive())
+        with self.assertRaises(RuntimeError):
+            writer.save(self.result, "a.jsonl")
+
+
+class TestBufferedResultService(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.filepath = os.path.join(self.tmpdir.name, "results.jsonl")
+        self.writer = BufferedResultWriter(JsonlResultRepository(), flush_interval=60)
+        self.result_service = ResultService(self.writer, self.filepath)
+
+    def tearDown(self):
+        self.writer.close()
+        self.tmpdir.cleanup()
+
+    def test_leaderboard_sees_unflushed_results(self):
+        user = User("testuser", "password", date(2000, 1, 1))
+        self.result_service.save_result(Result(user, Quiz("Python"), 10))
+        self.assertEqual(len(self.writer), 1)
+        self.assertFalse(os.path.exists(self.filepath))
+        self.assertEqual(self.result_service.get_top_results("Python")[0]["user"], "testuser")
+        self.assertEqual(self.result_service.get_rank("Python", 5), 2)
+
+        self.writer.close()
+        self.result_service.rebuild_indexes()
+        self.assertEqual(self.result_service.get_result_count("Python"), 1)
+
+
+class TestSegmentedResultService(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.directory = os.path.join(self.tmpdir.name, "results")
+        self.repository = SegmentedResultRepository()
+        self.repository.save_many([
+            {"user": "old", "quiz": "Python", "score": 50, "timestamp": "2024-01-10T00:00:00"},
+            {"user": "user1", "quiz": "Python", "score": 7, "timestamp": "2024-03-02T00:00:00"},
+            {"user": "user2", "quiz": "IT", "score": 9, "timestamp": "2024-03-05T00:00:00"},
+        ], self.directory)
+        self.writer = BufferedResultWriter(self.repository, flush_interval=60)
+        self.result_service = ResultService(self.writer, self.directory)
+
+    def tearDown(self):
+        self.writer.close()
+        self.tmpdir.cleanup()
+
+    def test_top_results_between_reads_only_overlapping_segments(self):
+        self.assertTrue(self.result_service.segmented)
+        result = Result(User("user3", "password", date(2000, 1, 1)), Quiz("Python"), 8)
+        result.timestamp = "2024-03-20T00:00:00"
+        self.result_service.save_result(result)
+        with patch.object(self.repository, "_read_segment", wraps=self.repository._read_segment) as read:
+            between = self.result_service.get_top_results_between("2024-03-01", "2024-04-01")
+        self.assertEqual([r["user"] for r in between], ["user2", "user3", "user1"])
+        self.assertEqual([c.args[1]["file"] for c in read.call_args_list], ["results-2024-03.jsonl"])
+        python = self.result_service.get_top_results_between("2024-03-01", "2024-04-01", "python")
+        self.assertEqual([r["user"] for r in python], ["user3", "user1"])
+        self.assertEqual(python, self.result_service.index.top_results_between("python", 20, "2024-03-01",
+                                                                               "2024-04-01"))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,84 @@
+import time
+import threading
+import unittest
+from rwlock import ReadWriteLock
+
+
+class TestReadWriteLock(unittest.TestCase):
+    def setUp(self):
+        self.lock = ReadWriteLock()
+
+    def test_readers_share_the_lock(self):
+        inside, peak, guard = [0], [0], threading.Lock()
+        barrier = threading.Barrier(4)
+
+        def read():
+            with self.lock.read():
+                with guard:
+                    inside[0] += 1
+                    peak[0] = max(peak[0], inside[0])
+                barrier.wait(timeout=5)
+                with guard:
+                    inside[0] -= 1
+
+        threads = [threading.Thread(target=read) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(peak[0], 4)
+
+    def test_writer_excludes_readers_and_writers(self):
+        events = []
+
+        def write(name):
+            with self.lock.write():
+                events.append(f"{name} in")
+                time.sleep(0.01)
+                events.append(f"{name} out")
+
+        def read(name):
+            with self.lock.read():
+                events.append(f"{name} in")
+                time.sleep(0.01)
+                events.append(f"{name} out")
+
+        threads = [threading.Thread(target=write, args=(f"w{i}",)) for i in range(3)]
+        threads += [threading.Thread(target=read, args=(f"r{i}",)) for i in range(3)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        # nothing may happen while a writer is inside
+        for i, event in enumerate(events):
+            if event.startswith('w') and event.endswith(' in'):
+                self.assertEqual(events[i + 1], event.replace(' in', ' out'))
+
+    def test_waiting_writer_blocks_new_readers(self):
+        order = []
+        self.lock.acquire_read()
+        writer = threading.Thread(target=lambda: (self.lock.acquire_write(), order.append('write'),
+                                                  self.lock.release_write()))
+        writer.start()
+        while not self.lock._waiting_writers:
+            time.sleep(0.001)
+        reader = threading.Thread(target=lambda: (self.lock.acquire_read(), order.append('read'),
+                                                  self.lock.release_read()))
+        reader.start()
+        time.sleep(0.02)
+        self.assertEqual(order, [])
+        self.lock.release_read()
+        writer.join()
+        reader.join()
+        self.assertEqual(order, ['write', 'read'])
+
+    def test_released_on_error(self):
+        with self.assertRaises(ValueError):
+            with self.lock.write():
+                raise ValueError()
+        with self.lock.write():
+            pass
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,183 @@
+import json
+import time
+import asyncio
+import unittest
+from unittest.mock import Mock
+from datetime import date
+from models import User, Question
+from services import UserService, QuizService, ResultService, QuizCatalogEntry
+from server import QuizServer
+from custom_exceptions import UserNotFoundException, UserAlreadyExistsException, QuizNotFoundException
+
+
+class TestQuizServer(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.user = User("testuser", "password", date(2000, 1, 1))
+        self.user_service = Mock(UserService)
+        self.user_service.authenticate_user.side_effect = self.authenticate
+        self.quiz_service = Mock(QuizService)
+        self.quiz_service.quizzes = [QuizCatalogEntry("quiz_sample.json", None, None, "Sample Quiz", 2)]
+        self.questions = [Question("Q1?", ["A", "B"], ["A"]), Question("Q2?", ["A", "B"], ["B"])]
+        self.quiz_service.iter_quiz_questions.side_effect = self.iter_questions
+        self.result_service = Mock(ResultService)
+        self.result_service.get_rank.return_value = 1
+        self.result_service.get_result_count.return_value = 1
+        self.result_service.get_percentile.return_value = 0.0
+        self.result_service.get_score_distribution.return_value = {"median": 2}
+        self.server = QuizServer(self.user_service, self.quiz_service, self.result_service)
+        self.listener = await self.server.start('127.0.0.1', 0)
+        self.port = self.listener.sockets[0].getsockname()[1]
+        self.reader, self.writer = await asyncio.open_connection('127.0.0.1', self.port)
+
+    async def asyncTearDown(self):
+        self.writer.close()
+        await self.writer.wait_closed()
+        self.listener.close()
+        await self.listener.wait_closed()
+        self.server.executor.shutdown()
+
+    def authenticate(self, login, password):
+        if (login, password) == ("testuser", "password"):
+            return self.user
+        raise UserNotFoundException(f"User '{login}' not found or invalid password.")
+
+    def iter_questions(self, title):
+        if title.lower() != "sample quiz":
+            raise QuizNotFoundException(f"Quiz '{title}' not found.")
+        return "Sample Quiz", iter(self.questions)
+
+    async def request(self, method, path, payload=None, token=None, reader=None, writer=None):
+        reader, writer = reader or self.reader, writer or self.writer
+        body = json.dumps(payload).encode() if payload is not None else b''
+        head = f"{method} {path} HTTP/1.1\r\nHost: test\r\nContent-Length: {len(body)}\r\n"
+        if token:
+            head += f"Authorization: Bearer {token}\r\n"
+        writer.write(head.encode() + b"\r\n" + body)
+        status = int((await reader.readline()).split()[1])
+        length = 0
+        while (line := await reader.readline()) != b"\r\n":
+            name, _, value = line.decode().partition(':')
+            if name.lower() == 'content-length':
+                length = int(value)
+        return status, json.loads(await reader.readexactly(length))
+
+    async def login(self):
+        status, data = await self.request('POST', '/login', {"login": "testuser", "password": "password"})
+        self.assertEqual(status, 200)
+        return data['token']
+
+    async def test_quiz_flow(self):
+        token = await self.login()
+        status, data = await self.request('GET', '/quizzes')
+        self.assertEqual((status, data), (200, {"quizzes": [{"title": "Sample Quiz", "questions": 2}]}))
+
+        status, data = await self.request('POST', '/sessions', {"quiz": "sample quiz"}, token)
+        self.assertEqual(status, 201)
+        session = data['session']
+        self.assertEqual(data['question'], {"number": 1, "text": "Q1?", "options": ["A", "B"]})
+
+        status, data = await self.request('POST', f'/sessions/{session}/answer', {"answer": [1]}, token)
+        self.assertEqual((status, data['correct'], data['question']['number']), (200, True, 2))
+        status, data = await self.request('POST', f'/sessions/{session}/answer', {"answer": [2]}, token)
+        self.assertEqual((data['score'], data['question']), (2, None))
+
+        status, data = await self.request('POST', f'/sessions/{session}/finish', token=token)
+        self.assertEqual(status, 200)
+        self.assertEqual((data['score'], data['question_count'], data['median']), (2, 2, 2))
+        self.result_service.save_result.assert_called_once()
+        status, _ = await self.request('GET', f'/sessions/{session}', token=token)
+        self.assertEqual(status, 404)
+
+    async def test_login_failure(self):
+        status, data = await self.request('POST', '/login', {"login": "testuser", "password": "wrong"})
+        self.assertEqual(status, 401)
+        self.assertIn("invalid password", data['error'])
+
+    async def test_sessions_require_login(self):
+        status, _ = await self.request('POST', '/sessions', {"quiz": "Sample Quiz"})
+        self.assertEqual(status, 401)
+
+    async def test_errors(self):
+        token = await self.login()
+        status, _ = await self.request('POST', '/sessions', {"quiz": "Missing"}, token)
+        self.assertEqual(status, 404)
+        _, data = await self.request('POST', '/sessions', {"quiz": "Sample Quiz"}, token)
+        session = data['session']
+        status, _ = await self.request('POST', f'/sessions/{session}/answer', {"answer": [3]}, token)
+        self.assertEqual(status, 400)
+        status, _ = await self.request('POST', f'/sessions/{session}/answer', {"answer": "1"}, token)
+        self.assertEqual(status, 400)
+        status, _ = await self.request('GET', '/quizzes/extra')
+        self.assertEqual(status, 404)
+        status, _ = await self.request('POST', '/quizzes')
+        self.assertEqual(status, 405)
+        self.writer.write(b"POST /login HTTP/1.1\r\nContent-Length: 3\r\n\r\n{x}")
+        status = int((await self.reader.readline()).split()[1])
+        self.assertEqual(status, 400)
+
+    async def test_sessions_are_private(self):
+        token = await self.login()
+        _, data = await self.request('POST', '/sessions', {"quiz": "Sample Quiz"}, token)
+        other = await self.login()
+        self.server.tokens[other] = (User("otheruser", "password", date(2000, 1, 1)), time.monotonic())
+        status, _ = await self.request('GET', f"/sessions/{data['session']}", token=other)
+        self.assertEqual(status, 404)
+
+    async def test_idle_tokens_expire(self):
+        token, idle = await self.login(), await self.login()
+        self.server.tokens[idle] = (self.user, time.monotonic() - 120)
+        status, _ = await self.request('GET', '/sessions/missing', token=token)
+        self.assertEqual(status, 404)
+        self.assertEqual(self.server.expire_tokens(60), 1)
+        self.assertEqual(list(self.server.tokens), [token])
+        status, _ = await self.request('POST', '/sessions', {"quiz": "Sample Quiz"}, idle)
+        self.assertEqual(status, 401)
+
+    async def test_register(self):
+        status, _ = await self.request('POST', '/register', {"login": "new", "password": "p",
+                                                             "birth_date": "2001-02-03"})
+        self.assertEqual(status, 201)
+        self.assertEqual(self.user_service.register_user.call_args.args[0].birth_date, date(2001, 2, 3))
+        self.user_service.register_user.side_effect = UserAlreadyExistsException()
+        status, _ = await self.request('POST', '/register', {"login": "new", "password": "p",
+                                                             "birth_date": "2001-02-03"})
+        self.assertEqual(status, 409)
+        status, _ = await self.request('POST', '/register', {"login": "new", "password": "p",
+                                                             "birth_date": "03.02.2001"})
+        self.assertEqual(status, 400)
+
+    async def test_leaderboard(self):
+        self.result_service.get_top_results.return_value = [{"user": "testuser", "quiz": "Sample Quiz",
+                                                             "score": 2, "timestamp": "2024-06-11T10:00:00"}]
+        self.result_service.get_distinct_total_top_results.return_value = []
+        status, data = await self.request('GET', '/leaderboard?quiz=Sample%20Quiz&window=week')
+        self.assertEqual((status, len(data['results'])), (200, 1))
+        self.result_service.get_top_results.assert_called_once_with("Sample Quiz", 'week')
+        status, data = await self.request('GET', '/leaderboard?window=players')
+        self.assertEqual((status, data['results']), (200, []))
+        status, _ = await self.request('GET', '/leaderboard?window=year')
+        self.assertEqual(status, 400)
+
+    async def test_many_concurrent_sessions(self):
+        token = await self.login()
+        connections = [await asyncio.open_connection('127.0.0.1', self.port) for _ in range(200)]
+
+        async def take(reader, writer):
+            _, data = await self.request('POST', '/sessions', {"quiz": "Sample Quiz"}, token, reader, writer)
+            session = data['session']
+            while data['question'] is not None:
+                _, data = await self.request('POST', f'/sessions/{session}/answer', {"answer": [1]}, token,
+                                             reader, writer)
+            _, data = await self.request('POST', f'/sessions/{session}/finish', token=token, reader=reader,
+                                         writer=writer)
+            writer.close()
+            return data['score']
+
+        scores = await asyncio.gather(*(take(reader, writer) for reader, writer in connections))
+        self.assertEqual(scores, [1] * 200)
+        self.assertEqual(self.result_service.save_result.call_count, 200)
+        self.assertEqual(len(self.server.session_engine), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -2,8 +2,18 @@ import unittest
 from unittest.mock import MagicMock, patch
 from datetime import date, datetime
 import os
+import sys
+import json
+import random
+import asyncio
+import tempfile
+import threading
 from models import User, Admin, Question, Quiz, Result
-from services import UserService, QuizService, ResultService
+from services import (UserService, QuizService, ResultService, AsyncUserService, AsyncResultService,
+                      QuizCatalogEntry)
+from repositories import QuizRepository, UserRepository, AdminRepository, JsonlResultRepository
+from sqlite_repositories import SqliteUserRepository, SqliteResultRepository
+from async_repositories import AsyncFileIO, AsyncUserRepository, AsyncAdminRepository, AsyncResultRepository
 from custom_exceptions import UserNotFoundException, UserAlreadyExistsException, QuizNotFoundException
 
 
@@ -53,37 +63,168 @@ class TestUserService(unittest.TestCase):
         with self.assertRaises(UserAlreadyExistsException):
             self.user_service.register_user(self.user)
 
+    def test_register_user_failure_case_insensitive(self):
+        self.user_service.users = [self.user]
+        with self.assertRaises(UserAlreadyExistsException):
+            self.user_service.register_user(User("TestUser", "other", date(2001, 1, 1)))
+
+    def test_register_user_taken_by_another_process(self):
+        self.user_repo.save.side_effect = UserAlreadyExistsException("User 'testuser' already exists.")
+        self.user_service.users = []
+        with patch("builtins.print") as mock_print:
+            with self.assertRaises(UserAlreadyExistsException):
+                self.user_service.register_user(self.user)
+        mock_print.assert_not_called()
+        self.assertEqual(self.user_service.users, [])
+        with self.assertRaises(UserNotFoundException):
+            self.user_service.get_user("testuser")
+
+    def test_register_user_across_services(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            admin_repo = AdminRepository(os.path.join(tmpdir, "admins.json"))
+            repos = [UserRepository(os.path.join(tmpdir, "users.json")),
+                     SqliteUserRepository(os.path.join(tmpdir, "quiz.db"))]
+            for user_repo in repos:
+                with self.subTest(type(user_repo).__name__), patch("builtins.print"):
+                    first = UserService(user_repo, admin_repo)
+                    second = UserService(user_repo, admin_repo)
+                    first.register_user(User("bob", "password", date(2000, 1, 1)))
+                    with self.assertRaises(UserAlreadyExistsException):
+                        second.register_user(User("Bob", "other", date(2001, 1, 1)))
+                    self.assertEqual([u.login for u in user_repo.load()], ["bob"])
+                    self.assertEqual(second.users, [])
+            repos[1].connection.close()
+
+    def test_authenticate_user_case_insensitive(self):
+        self.user_service.users = [self.user]
+        self.assertIs(self.user_service.authenticate_user("TESTUSER", "password"), self.user)
+
+    def test_authenticate_user_wrong_password(self):
+        self.user_service.users = [self.user]
+        with self.assertRaises(UserNotFoundException):
+            self.user_service.authenticate_user("testuser", "wrong")
+
+    def test_get_user(self):
+        self.user_service.users = []
+        self.user_service.register_user(self.user)
+        self.assertIs(self.user_service.get_user("TestUser"), self.user)
+        with self.assertRaises(UserNotFoundException):
+            self.user_service.get_user("nobody")
+
+    def test_save_user_replaces_record(self):
+        self.user_service.users = [self.user, User("other", "secret", date(1999, 1, 1))]
+        updated = User("testuser", "newpassword", date(2000, 1, 1))
+        self.user_service.save_user(updated)
+        self.assertIs(self.user_service.get_user("testuser"), updated)
+        self.assertEqual(len(self.user_service.users), 2)
+        self.user_repo.update.assert_called_once_with(updated)
+
 
 class TestQuizService(unittest.TestCase):
     def setUp(self):
         self.quiz_repo = MagicMock()
-        self.quiz_service = QuizService(self.quiz_repo)
         self.quiz = Quiz("Test Quiz")
         self.question = Question("Sample Question?", ["Option 1", "Option 2"], ["Option 1"])
         self.quiz.add_question(self.question)
-
-    def test_load_all_quizzes(self):
         self.quiz_repo.get_all_quiz_files.return_value = ["quiz_test.json"]
+        self.quiz_repo.read_header.return_value = ("Test Quiz", 1)
         self.quiz_repo.load.return_value = self.quiz
+        self.quiz_service = QuizService(self.quiz_repo)
+
+    def test_load_all_quizzes(self):
         quizzes = self.quiz_service.load_all_quizzes()
         self.assertEqual(len(quizzes), 1)
         self.assertEqual(quizzes[0].title, "Test Quiz")
+        self.assertEqual(quizzes[0].question_count, 1)
+
+    def test_load_all_quizzes_does_not_parse_questions(self):
+        self.quiz_service.load_all_quizzes()
+        self.quiz_repo.load.assert_not_called()
+        self.quiz_repo.read_header.assert_called_with("quiz_test.json")
 
     def test_get_quiz_by_title_success(self):
-        self.quiz_service.quizzes = [self.quiz]
         quiz = self.quiz_service.get_quiz_by_title("Test Quiz")
         self.assertEqual(quiz.title, "Test Quiz")
+        self.assertIs(self.quiz_service.get_quiz_by_title("test quiz"), quiz)
+        self.quiz_repo.load.assert_called_once_with("quiz_test.json")
 
     def test_get_quiz_by_title_failure(self):
-        self.quiz_service.quizzes = [self.quiz]
         with self.assertRaises(QuizNotFoundException):
             self.quiz_service.get_quiz_by_title("Non-existent Quiz")
 
+    def test_get_quiz_by_title_unreadable_file(self):
+        self.quiz_repo.load.return_value = None
+        with self.assertRaises(QuizNotFoundException):
+            self.quiz_service.get_quiz_by_title("Test Quiz")
+
+    @patch("builtins.print")
+    def test_get_quiz_by_title_invalid_answer(self, mock_print):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            with open(os.path.join(tmpdir, "quiz_bad.json"), 'w') as file:
+                json.dump({"title": "Bad Quiz", "questions": [
+                    {"text": "Q?", "options": ["Yes", "No"], "correct_answers": ["yes"]}]}, file)
+            quiz_service = QuizService(QuizRepository(tmpdir))
+            # the header scan accepts the file; the bad answer only shows up when the questions are read
+            self.assertEqual([entry.title for entry in quiz_service.quizzes], ["Bad Quiz"])
+            with self.assertRaises(QuizNotFoundException):
+                quiz_service.get_quiz_by_title("Bad Quiz")
+            with self.assertRaises(QuizNotFoundException):
+                quiz_service.iter_quiz_questions("Bad Quiz")
+            self.assertEqual(quiz_service.get_mixed_quiz_questions(), [])
+
+    def test_iter_quiz_questions_uses_cache_for_small_quizzes(self):
+        title, questions = self.quiz_service.iter_quiz_questions("test quiz")
+        self.assertEqual(title, "Test Quiz")
+        self.assertEqual(list(questions), [self.question])
+        self.assertIn("quiz_test.json", self.quiz_service.cache)
+        self.quiz_repo.iter_questions.assert_not_called()
+
+    def test_iter_quiz_questions_streams_large_quizzes(self):
+        self.quiz_repo.iter_questions.return_value = iter([self.question])
+        quiz_service = QuizService(self.quiz_repo, stream_threshold=0)
+        title, questions = quiz_service.iter_quiz_questions("Test Quiz")
+        self.assertEqual(list(questions), [self.question])
+        self.quiz_repo.load.assert_not_called()
+        self.assertEqual(len(quiz_service.cache), 0)
+
+    def test_iter_quiz_questions_read_error(self):
+        def broken(filepath):
+            yield self.question
+            raise json.JSONDecodeError("Expecting value", "", 0)
+
+        self.quiz_repo.iter_questions.side_effect = broken
+        quiz_service = QuizService(self.quiz_repo, stream_threshold=0)
+        _, questions = quiz_service.iter_quiz_questions("Test Quiz")
+        self.assertIs(next(questions), self.question)
+        with self.assertRaises(QuizNotFoundException):
+            next(questions)
+
+    def test_iter_quiz_questions_unknown_title(self):
+        with self.assertRaises(QuizNotFoundException):
+            self.quiz_service.iter_quiz_questions("Non-existent Quiz")
+
+    def test_materialized_quizzes_are_evicted(self):
+        files = {f"quiz_{i}.json": (f"Quiz {i}", 1) for i in range(3)}
+        self.quiz_repo.get_all_quiz_files.return_value = list(files)
+        self.quiz_repo.read_header.side_effect = lambda filepath: files[filepath]
+        self.quiz_repo.load.side_effect = lambda filepath: Quiz(files[filepath][0])
+        quiz_service = QuizService(self.quiz_repo, cache_size=2)
+        for i in (0, 1, 0, 2):
+            quiz_service.get_quiz_by_title(f"Quiz {i}")
+        self.assertEqual(list(quiz_service.cache), ["quiz_0.json", "quiz_2.json"])
+        self.assertEqual(self.quiz_repo.load.call_count, 3)
+
     def test_get_mixed_quiz_questions(self):
-        self.quiz_service.quizzes = [self.quiz]
+        self.quiz_repo.load_questions.side_effect = lambda filepath, offsets: [self.quiz.questions[i] for i in offsets]
         questions = self.quiz_service.get_mixed_quiz_questions()
         self.assertTrue(len(questions) <= 20)
         self.assertIn(self.question, questions)
+        self.quiz_repo.load.assert_not_called()
+
+    def test_get_mixed_quiz_questions_uses_cached_quiz(self):
+        self.quiz_service.get_quiz_by_title("Test Quiz")
+        self.assertEqual(self.quiz_service.get_mixed_quiz_questions(), [self.question])
+        self.quiz_repo.load_questions.assert_not_called()
 
     def test_save_quiz(self):
         self.quiz_repo.quizzes_dir = "test_quizzes"
@@ -92,9 +233,145 @@ class TestQuizService(unittest.TestCase):
         self.quiz_repo.save.assert_called_with(self.quiz, expected_filepath)
 
 
+class TestQuizServiceMixedSampler(unittest.TestCase):
+    def setUp(self):
+        self.sizes = {"quiz_a.json": 50, "quiz_b.json": 3, "quiz_c.json": 0, "quiz_d.json": 1000}
+        self.quiz_repo = MagicMock()
+        self.quiz_repo.get_all_quiz_files.return_value = list(self.sizes)
+        self.quiz_repo.read_header.side_effect = lambda filepath: (filepath, self.sizes[filepath])
+        self.quiz_repo.load_questions.side_effect = lambda filepath, offsets: [(filepath, i) for i in offsets]
+        self.quiz_service = QuizService(self.quiz_repo)
+
+    def test_samples_distinct_questions(self):
+        questions = self.quiz_service.get_mixed_quiz_questions(count=200)
+        self.assertEqual(len(questions), 200)
+        self.assertEqual(len(set(questions)), 200)
+        for filepath, offset in questions:
+            self.assertTrue(0 <= offset < self.sizes[filepath])
+
+    def test_count_is_capped_by_catalog_size(self):
+        self.assertEqual(len(self.quiz_service.get_mixed_quiz_questions(count=5000)), 1053)
+
+    def test_seed_is_reproducible(self):
+        first = self.quiz_service.get_mixed_quiz_questions(seed=42)
+        self.assertEqual(self.quiz_service.get_mixed_quiz_questions(seed=42), first)
+        self.assertNotEqual(self.quiz_service.get_mixed_quiz_questions(seed=43), first)
+
+    def test_stratified_gives_equal_shares(self):
+        questions = self.quiz_service.get_mixed_quiz_questions(count=21, stratified=True, seed=1)
+        per_quiz = {filepath: sum(1 for q in questions if q[0] == filepath) for filepath in self.sizes}
+        self.assertEqual(per_quiz["quiz_b.json"], 3)
+        self.assertEqual(per_quiz["quiz_c.json"], 0)
+        self.assertEqual(per_quiz["quiz_a.json"] + per_quiz["quiz_d.json"], 18)
+        self.assertEqual(per_quiz["quiz_a.json"], 9)
+
+    def test_stratified_shares_stay_balanced(self):
+        rng = random.Random(7)
+        for _ in range(200):
+            quizzes = [QuizCatalogEntry(f"quiz_{i}.json", None, None, f"Quiz {i}", rng.randint(0, 12))
+                       for i in range(rng.randint(1, 8))]
+            count = rng.randint(0, sum(entry.question_count for entry in quizzes))
+            counts = self.quiz_service._stratified_counts(count, rng, quizzes)
+            self.assertEqual(sum(counts), count)
+            open_counts = [n for n, entry in zip(counts, quizzes) if n < entry.question_count]
+            if open_counts:
+                self.assertLessEqual(max(open_counts) - min(open_counts), 1, (counts, quizzes))
+
+    def test_empty_catalog(self):
+        self.quiz_repo.get_all_quiz_files.return_value = []
+        self.quiz_service.refresh_quizzes()
+        self.assertEqual(self.quiz_service.get_mixed_quiz_questions(), [])
+
+
+class TestQuizServiceIncrementalRefresh(unittest.TestCase):
+    def setUp(self):
+        self.files = {"quiz_a.json": ((1, 10), "hash-a"), "quiz_b.json": ((1, 20), "hash-b")}
+        self.quiz_repo = MagicMock()
+        self.quiz_repo.get_all_quiz_files.side_effect = lambda: list(self.files)
+        self.quiz_repo.get_file_signature.side_effect = lambda filepath: self.files[filepath][0]
+        self.quiz_repo.get_file_hash.side_effect = lambda filepath: self.files[filepath][1]
+        self.quiz_repo.read_header.side_effect = lambda filepath: (filepath.split('.')[0], 1)
+        self.quiz_service = QuizService(self.quiz_repo)
+
+    def test_initial_load(self):
+        self.assertEqual([quiz.title for quiz in self.quiz_service.quizzes], ["quiz_a", "quiz_b"])
+        self.assertEqual(self.quiz_repo.read_header.call_count, 2)
+
+    def test_refresh_if_changed_without_changes(self):
+        self.assertFalse(self.quiz_service.refresh_if_changed())
+        self.assertEqual(self.quiz_repo.read_header.call_count, 2)
+        self.quiz_repo.get_file_hash.assert_any_call("quiz_a.json")
+        self.assertEqual(self.quiz_repo.get_file_hash.call_count, 2)
+
+    def test_refresh_reparses_only_changed_file(self):
+        self.quiz_repo.load.return_value = Quiz("quiz_b")
+        self.quiz_service.get_quiz_by_title("quiz_b")
+        self.files["quiz_b.json"] = ((2, 25), "hash-b2")
+        self.assertTrue(self.quiz_service.refresh_if_changed())
+        self.quiz_repo.read_header.assert_called_with("quiz_b.json")
+        self.assertEqual(self.quiz_repo.read_header.call_count, 3)
+        self.assertNotIn("quiz_b.json", self.quiz_service.cache)
+
+    def test_touched_file_with_same_content_is_not_reparsed(self):
+        self.files["quiz_a.json"] = ((5, 10), "hash-a")
+        self.assertFalse(self.quiz_service.refresh_if_changed())
+        self.assertEqual(self.quiz_repo.read_header.call_count, 2)
+        self.assertFalse(self.quiz_service.refresh_if_changed())
+        self.assertEqual(self.quiz_repo.get_file_hash.call_count, 3)
+
+    def test_refresh_handles_added_and_removed_files(self):
+        del self.files["quiz_a.json"]
+        self.files["quiz_c.json"] = ((1, 30), "hash-c")
+        self.quiz_service.refresh_quizzes()
+        self.assertEqual([quiz.title for quiz in self.quiz_service.quizzes], ["quiz_b", "quiz_c"])
+        self.assertEqual(self.quiz_repo.read_header.call_count, 3)
+        with self.assertRaises(QuizNotFoundException):
+            self.quiz_service.get_quiz_by_title("quiz_a")
+
+
+class TestQuizServiceParallelLoading(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        for i in range(12):
+            with open(os.path.join(self.tmpdir.name, f"quiz_{i:02}.json"), 'w') as file:
+                json.dump({"title": f"Quiz {i}", "questions": [
+                    {"text": "Q?", "options": ["A", "B"], "correct_answers": ["A"]}] * i}, file)
+        with open(os.path.join(self.tmpdir.name, "quiz_broken.json"), 'w') as file:
+            file.write("{not json")
+        self.quiz_repo = QuizRepository(self.tmpdir.name)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def assert_catalog(self, quiz_service):
+        serial = QuizService(self.quiz_repo)
+        self.assertEqual([(q.filepath, q.title, q.question_count) for q in quiz_service.quizzes],
+                         [(q.filepath, q.title, q.question_count) for q in serial.quizzes])
+        self.assertEqual(len(quiz_service.quizzes), 12)
+        self.assertEqual([filepath for filepath, _ in quiz_service.load_errors],
+                         [os.path.join(self.tmpdir.name, "quiz_broken.json")])
+        self.assertIsInstance(quiz_service.load_errors[0][1], json.JSONDecodeError)
+
+    def test_thread_pool(self):
+        with patch("builtins.print") as mock_print:
+            quiz_service = QuizService(self.quiz_repo, workers=4)
+        mock_print.assert_not_called()
+        self.assert_catalog(quiz_service)
+
+    def test_process_pool(self):
+        self.assert_catalog(QuizService(self.quiz_repo, workers=2, pool='process'))
+
+    def test_refresh_uses_pool(self):
+        quiz_service = QuizService(self.quiz_repo, workers=4)
+        os.remove(os.path.join(self.tmpdir.name, "quiz_broken.json"))
+        self.assertTrue(quiz_service.refresh_if_changed())
+        self.assertEqual(quiz_service.load_errors, [])
+
+
 class TestResultService(unittest.TestCase):
     def setUp(self):
         self.result_repo = MagicMock()
+        self.result_repo.iter_results.return_value = []
         self.result_service = ResultService(self.result_repo)
         self.user = User("testuser", "password", date(2000, 1, 1))
         self.quiz = Quiz("Test Quiz")
@@ -107,24 +384,293 @@ class TestResultService(unittest.TestCase):
         self.result_repo.save.assert_called()
 
     def test_get_user_results(self):
-        self.result_repo.load.return_value = [self.result.to_dict()]
+        self.result_repo.iter_results.return_value = [self.result.to_dict()]
+        self.result_service.rebuild_indexes()
         results = self.result_service.get_user_results(self.user, [self.quiz])
         self.assertEqual(len(results), 1)
         self.assertEqual(results[0]["user"], "testuser")
+        self.assertEqual(self.result_service.get_user_result_count(self.user), 1)
+
+    def test_get_user_results_pages_without_reading_repository(self):
+        for score in [3, 9, 1, 7]:
+            self.result_service.save_result(Result(self.user, self.quiz, score))
+        self.result_repo.iter_results.reset_mock()
+        page = self.result_service.get_user_results(self.user, offset=1, limit=2)
+        self.assertEqual([r["score"] for r in page], [7, 3])
+        by_date = self.result_service.get_user_results(self.user, sort='timestamp', descending=False, limit=2)
+        self.assertEqual([r["score"] for r in by_date], [3, 9])
+        self.result_repo.iter_results.assert_not_called()
 
     def test_get_top_results(self):
-        self.result_repo.load.return_value = [self.result.to_dict()]
+        self.result_repo.iter_results.return_value = [self.result.to_dict()]
+        self.result_service.rebuild_indexes()
         top_results = self.result_service.get_top_results("Test Quiz")
         self.assertEqual(len(top_results), 1)
         self.assertEqual(top_results[0]["quiz"], "Test Quiz")
 
     def test_get_total_top_results(self):
-        self.result_repo.load.return_value = [self.result.to_dict()]
+        self.result_repo.iter_results.return_value = [self.result.to_dict()]
+        self.result_service.rebuild_indexes()
         top_results = self.result_service.get_total_top_results()
         self.assertEqual(len(top_results), 1)
         self.assertEqual(top_results[0]["user"], "testuser")
 
+    def test_save_result_updates_leaderboard(self):
+        self.result_service.save_result(self.result)
+        top_results = self.result_service.get_top_results("test quiz")
+        self.assertEqual(top_results, [self.result.to_dict()])
+        self.assertEqual(self.result_service.get_total_top_results(), [self.result.to_dict()])
+
+    def test_windowed_top_results(self):
+        self.result_repo.iter_results.return_value = [
+            {"user": "old", "quiz": "Test Quiz", "score": 20, "timestamp": "2024-05-01T12:00:00"},
+            {"user": "new", "quiz": "Test Quiz", "score": 5, "timestamp": "2024-06-12T12:00:00"},
+        ]
+        self.result_service.rebuild_indexes()
+        at = "2024-06-12T13:00:00"
+        self.assertEqual([r["user"] for r in self.result_service.get_top_results("Test Quiz", 'day', at)], ["new"])
+        self.assertEqual([r["user"] for r in self.result_service.get_total_top_results('week', at)], ["new"])
+        self.assertEqual([r["user"] for r in self.result_service.get_top_results("Test Quiz")], ["old", "new"])
+        between = self.result_service.get_top_results_between("2024-05-01", "2024-06-01")
+        self.assertEqual([r["user"] for r in between], ["old"])
+
+    def test_distinct_top_results(self):
+        other = User("other", "password", date(2000, 1, 1))
+        for user, score in [(self.user, 10), (self.user, 12), (self.user, 11), (other, 9)]:
+            self.result_service.save_result(Result(user, self.quiz, score))
+        self.assertEqual([(r["user"], r["score"]) for r in self.result_service.get_distinct_top_results("Test Quiz")],
+                         [("testuser", 12), ("other", 9)])
+        self.assertEqual([r["user"] for r in self.result_service.get_distinct_total_top_results()],
+                         ["testuser", "other"])
+        self.assertEqual([r["score"] for r in self.result_service.get_user_best_results(self.user)], [12])
+
+    def test_score_distribution_follows_saves(self):
+        self.result_repo.iter_results.return_value = [
+            {"user": "a", "quiz": "Test Quiz", "score": 2, "timestamp": ""},
+            {"user": "b", "quiz": "test quiz", "score": 4, "timestamp": ""},
+        ]
+        self.result_service.rebuild_indexes()
+        self.assertEqual(self.result_service.get_score_distribution("Test Quiz")["median"], 3)
+        self.result_service.save_result(self.result)
+        distribution = self.result_service.get_score_distribution("Test Quiz")
+        self.assertEqual(distribution["median"], 4)
+        self.assertEqual(distribution["histogram"], [0, 0, 1, 0, 1, 0, 0, 0, 0, 0, 1])
+
+    def test_leaderboard_is_bounded(self):
+        self.result_repo.iter_results.return_value = [
+            {"user": f"user{i}", "quiz": "Test Quiz", "score": i % 30, "timestamp": ""} for i in range(100)
+        ]
+        self.result_service.rebuild_indexes()
+        top_results = self.result_service.get_top_results("Test Quiz")
+        self.assertEqual(len(top_results), self.result_service.top_num)
+        self.assertEqual([r["score"] for r in top_results[:4]], [29, 29, 29, 28])
+        self.assertEqual([r["user"] for r in top_results[:3]], ["user29", "user59", "user89"])
+
+    def test_get_rank_and_percentile(self):
+        self.result_repo.iter_results.return_value = [
+            {"user": f"user{i}", "quiz": "Test Quiz", "score": score, "timestamp": ""}
+            for i, score in enumerate([3, 7, 7, 10, 1])
+        ]
+        self.result_service.rebuild_indexes()
+        self.assertEqual(self.result_service.get_rank("test quiz", 10), 1)
+        self.assertEqual(self.result_service.get_rank("Test Quiz", 7), 2)
+        self.assertEqual(self.result_service.get_rank("Test Quiz", 5), 4)
+        self.assertEqual(self.result_service.get_percentile("Test Quiz", 7), 40.0)
+        self.assertEqual(self.result_service.get_result_count("Test Quiz"), 5)
+
+    def test_save_result_updates_rank(self):
+        self.result_service.save_result(self.result)
+        self.assertEqual(self.result_service.get_rank("Test Quiz", 10), 1)
+        self.assertEqual(self.result_service.get_rank("Test Quiz", 9), 2)
+        self.assertEqual(self.result_service.get_result_count("Test Quiz"), 1)
+
+
+class TestAsyncServices(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        for name in ('users.json', 'admins.json'):
+            with open(os.path.join(self.directory.name, name), 'w') as file:
+                json.dump([], file)
+        self.io = AsyncFileIO()
+        self.user_service = await AsyncUserService.create(
+            AsyncUserRepository(UserRepository(os.path.join(self.directory.name, 'users.json')), self.io),
+            AsyncAdminRepository(AdminRepository(os.path.join(self.directory.name, 'admins.json')), self.io))
+        self.result_filepath = os.path.join(self.directory.name, 'results.jsonl')
+        self.result_repository = AsyncResultRepository(JsonlResultRepository(), self.io)
+        self.result_service = await AsyncResultService.create(self.result_repository, self.result_filepath)
+
+    async def asyncTearDown(self):
+        self.io.shutdown()
+        self.directory.cleanup()
+
+    async def test_register_and_reload_users(self):
+        users = [User(f"user{i}", "password", date(2000, 1, 1)) for i in range(5)]
+        await asyncio.gather(*(self.user_service.register_user(user) for user in users))
+        with self.assertRaises(UserAlreadyExistsException):
+            await self.user_service.register_user(User("USER1", "password", date(2000, 1, 1)))
+        self.assertEqual(self.user_service.authenticate_user("user3", "password").login, "user3")
+
+        await self.user_service.save_user(User("user3", "changed", date(2000, 1, 1)))
+        await self.user_service.save_admin(Admin("admin", "secret"))
+        await self.user_service.reload()
+        self.assertEqual(len(self.user_service.users), 5)
+        self.assertEqual(self.user_service.get_user("user3").password, "changed")
+        self.assertEqual(self.user_service.authenticate_admin("admin", "secret").login, "admin")
+
+    async def test_save_results_and_rebuild(self):
+        user = User("testuser", "password", date(2000, 1, 1))
+        await asyncio.gather(*(self.result_service.save_result(Result(user, Quiz("Sample Quiz"), score))
+                               for score in (3, 7, 5)))
+        self.assertEqual(self.result_service.get_rank("Sample Quiz", 7), 1)
+        self.assertEqual([r['score'] for r in self.result_service.get_top_results("Sample Quiz")], [7, 5, 3])
+
+        reloaded = await AsyncResultService.create(self.result_repository, self.result_filepath)
+        self.assertEqual(reloaded.get_result_count("Sample Quiz"), 3)
+        self.assertEqual(reloaded.get_user_result_count(user), 3)
+
+
+class TestServicesUnderThreads(unittest.TestCase):
+    THREADS = 16
+
+    def setUp(self):
+        # switch threads as often as possible so unsynchronized sections actually interleave
+        self.switch_interval = sys.getswitchinterval()
+        sys.setswitchinterval(1e-6)
+
+    def tearDown(self):
+        sys.setswitchinterval(self.switch_interval)
+
+    def hammer(self, *workers):
+        errors = []
+        start = threading.Barrier(len(workers))
+
+        def run(worker):
+            try:
+                start.wait(timeout=10)
+                worker()
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=run, args=(worker,)) for worker in workers]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+
+    @patch('builtins.print')
+    def test_user_service(self, mock_print):
+        user_repo = MagicMock()
+        user_repo.load.return_value = []
+        user_service = UserService(user_repo, MagicMock())
+        duplicates = []
+
+        def register(thread):
+            def work():
+                for i in range(50):
+                    user_service.register_user(User(f"user{thread}-{i}", "password", date(2000, 1, 1)))
+                    try:
+                        # every thread races for the same shared logins; exactly one may win each
+                        user_service.register_user(User(f"shared{i}", "password", date(2000, 1, 1)))
+                    except UserAlreadyExistsException:
+                        duplicates.append(i)
+                    user_service.authenticate_user(f"user{thread}-{i}", "password")
+            return work
+
+        self.hammer(*(register(thread) for thread in range(self.THREADS)))
+        self.assertEqual(len(user_service.users), self.THREADS * 50 + 50)
+        self.assertEqual(len(duplicates), (self.THREADS - 1) * 50)
+        for login in ("user3-7", "shared7"):
+            self.assertEqual(user_service.get_user(login).login, login)
+
+    def test_quiz_service(self):
+        files = {f"quiz_{i}.json": ((1, i), f"hash-{i}") for i in range(4)}
+        quiz_repo = MagicMock()
+        quiz_repo.get_all_quiz_files.side_effect = lambda: list(files)
+        quiz_repo.get_file_signature.side_effect = lambda filepath: files[filepath][0]
+        quiz_repo.get_file_hash.side_effect = lambda filepath: files[filepath][1]
+        quiz_repo.read_header.side_effect = lambda filepath: (filepath.split('.')[0], 10)
+
+        def load(filepath):
+            quiz = Quiz(filepath.split('.')[0])
+            for i in range(10):
+                quiz.add_question(Question(f"{filepath} {i}?", ["A", "B"], ["A"]))
+            return quiz
+
+        quiz_repo.load.side_effect = load
+        quiz_repo.load_questions.side_effect = lambda filepath, offsets: [load(filepath).questions[o] for o in offsets]
+        quiz_service = QuizService(quiz_repo, cache_size=2)
+
+        def refresh():
+            for version in range(200):
+                files["quiz_0.json"] = ((2, version), f"hash-0-{version}")
+                quiz_service.refresh_quizzes()
+
+        def read():
+            for i in range(200):
+                title, questions = quiz_service.iter_quiz_questions(f"quiz_{i % 4}")
+                self.assertEqual(len(list(questions)), 10)
+                self.assertEqual(len(quiz_service.get_mixed_quiz_questions(count=8, stratified=i % 2)), 8)
+
+        self.hammer(refresh, *(read for _ in range(self.THREADS - 1)))
+        self.assertEqual(len(quiz_service.quizzes), 4)
+        self.assertLessEqual(len(quiz_service.cache), 2)
+
+    def test_result_service(self):
+        result_repo = MagicMock()
+        result_repo.iter_results.return_value = []
+        saved = []
+        # MagicMock's own call counting is not thread-safe, list.append is
+        result_repo.save.side_effect = lambda result, filepath: saved.append(result)
+        result_service = ResultService(result_repo)
+        users = [User(f"user{i}", "password", date(2000, 1, 1)) for i in range(self.THREADS)]
+
+        def save(user):
+            def work():
+                for i in range(300):
+                    result_service.save_result(Result(user, Quiz(f"Quiz {i % 3}"), i % 21))
+            return work
+
+        def read():
+            for i in range(300):
+                top = result_service.get_top_results("Quiz 0")
+                self.assertEqual([r['score'] for r in top], sorted((r['score'] for r in top), reverse=True))
+                result_service.get_rank("Quiz 1", 10)
+                result_service.get_score_distribution("Quiz 2")
+                result_service.get_user_results(users[i % self.THREADS], limit=5)
+                result_service.get_distinct_total_top_results()
+
+        half = self.THREADS // 2
+        self.hammer(*(save(user) for user in users[:half]), *(read for _ in range(half)))
+        self.assertEqual(sum(result_service.get_result_count(f"Quiz {i}") for i in range(3)), half * 300)
+        self.assertEqual(len(saved), half * 300)
+        self.assertEqual(result_service.get_user_result_count(users[0]), 300)
+
+    def test_sqlite_services(self):
+        with tempfile.TemporaryDirectory() as directory:
+            db_path = os.path.join(directory, "quiz.db")
+            user_service = UserService(SqliteUserRepository(db_path), MagicMock())
+            result_repo = SqliteResultRepository(db_path)
+            result_service = ResultService(result_repo)
+            users = [User(f"user{i}", "password", date(2000, 1, 1)) for i in range(self.THREADS)]
+
+            def work(user):
+                def run():
+                    for i in range(20):
+                        user_service.register_user(User(f"{user.login}-{i}", "password", date(2000, 1, 1)))
+                        result_service.save_result(Result(user, Quiz(f"Quiz {i % 3}"), i))
+                        result_service.get_top_results("Quiz 0")
+                        result_service.get_percentile("Quiz 1", 10)
+                return run
+
+            with patch('builtins.print') as mock_print:
+                self.hammer(*(work(user) for user in users))
+            # the repositories report failed statements by printing them
+            errors = [call.args[0] for call in mock_print.call_args_list if str(call.args[0]).startswith("Error")]
+            self.assertEqual(errors, [])
+            self.assertEqual(len(result_repo.load()), self.THREADS * 20)
+            self.assertEqual(len(SqliteUserRepository(db_path).load()), self.THREADS * 20)
+
 
 if __name__ == '__main__':
     unittest.main()
-
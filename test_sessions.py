@@ -0,0 +1,120 @@
+import unittest
+from unittest.mock import Mock
+from datetime import date
+from models import User, Question
+from services import QuizService, ResultService
+from sessions import SessionEngine, parse_answer
+from custom_exceptions import (QuizNotFoundException, InvalidInputException, InvalidAnswerException,
+                               SessionNotFoundException)
+
+
+class TestParseAnswer(unittest.TestCase):
+    def test_parse_answer(self):
+        self.assertEqual(parse_answer("1, 3"), [0, 2])
+
+    def test_parse_answer_invalid(self):
+        with self.assertRaises(InvalidInputException):
+            parse_answer("one")
+        with self.assertRaises(InvalidInputException):
+            parse_answer("")
+
+
+class TestSessionEngine(unittest.TestCase):
+    def setUp(self):
+        self.quiz_service = Mock(QuizService)
+        self.result_service = Mock(ResultService)
+        self.result_service.get_rank.return_value = 1
+        self.result_service.get_result_count.return_value = 5
+        self.result_service.get_percentile.return_value = 80.0
+        self.result_service.get_score_distribution.return_value = {"median": 1}
+        self.engine = SessionEngine(self.quiz_service, self.result_service)
+        self.user = User("testuser", "password", date(2000, 1, 1))
+        self.questions = [Question("Q1?", ["A", "B"], ["A"]), Question("Q2?", ["A", "B", "C"], ["B", "C"])]
+        self.quiz_service.iter_quiz_questions.return_value = ("Sample Quiz", iter(self.questions))
+
+    def test_full_session(self):
+        session = self.engine.start(self.user, "sample quiz")
+        self.assertEqual(session.quiz_title, "Sample Quiz")
+        self.assertIs(self.engine.next_question(session.session_id), self.questions[0])
+        # asking again before answering returns the same question
+        self.assertIs(self.engine.next_question(session.session_id), self.questions[0])
+        self.assertTrue(self.engine.submit_answer(session.session_id, [0]))
+        self.assertIs(self.engine.next_question(session.session_id), self.questions[1])
+        self.assertEqual(session.number, 2)
+        self.assertFalse(self.engine.submit_answer(session.session_id, [1]))
+        self.assertIsNone(self.engine.next_question(session.session_id))
+
+        summary = self.engine.finish(session.session_id)
+        self.assertEqual(summary, {"quiz": "Sample Quiz", "score": 1, "question_count": 2, "rank": 1,
+                                   "total": 5, "percentile": 80.0, "median": 1})
+        saved = self.result_service.save_result.call_args.args[0]
+        self.assertEqual((saved.login, saved.quiz_title, saved.score), ("testuser", "Sample Quiz", 1))
+        self.assertEqual(len(self.engine), 0)
+        with self.assertRaises(SessionNotFoundException):
+            self.engine.next_question(session.session_id)
+
+    def test_mixed_session(self):
+        self.quiz_service.get_mixed_quiz_questions.return_value = self.questions
+        session = self.engine.start(self.user, "MIX")
+        self.assertEqual(session.quiz_title, "Mix")
+        self.assertIs(self.engine.next_question(session.session_id), self.questions[0])
+
+    def test_start_unknown_quiz(self):
+        self.quiz_service.iter_quiz_questions.side_effect = QuizNotFoundException("Quiz 'x' not found.")
+        with self.assertRaises(QuizNotFoundException):
+            self.engine.start(self.user, "x")
+        self.assertEqual(len(self.engine), 0)
+
+    def test_invalid_answers(self):
+        session = self.engine.start(self.user, "Sample Quiz")
+        with self.assertRaises(InvalidAnswerException):
+            self.engine.submit_answer(session.session_id, [0])
+        self.engine.next_question(session.session_id)
+        with self.assertRaises(InvalidAnswerException):
+            self.engine.submit_answer(session.session_id, [2])
+        with self.assertRaises(InvalidAnswerException):
+            self.engine.submit_answer(session.session_id, [])
+        self.assertEqual(session.score, 0)
+        self.assertIsNotNone(session.question)
+
+    def test_finish_early_counts_answered_questions(self):
+        session = self.engine.start(self.user, "Sample Quiz")
+        self.engine.next_question(session.session_id)
+        self.engine.submit_answer(session.session_id, [0])
+        self.engine.next_question(session.session_id)
+        summary = self.engine.finish(session.session_id)
+        self.assertEqual((summary["score"], summary["question_count"]), (1, 1))
+
+    def test_stream_error_discards_session(self):
+        def questions():
+            yield self.questions[0]
+            raise QuizNotFoundException("Quiz 'Sample Quiz' could not be read: truncated")
+
+        self.quiz_service.iter_quiz_questions.return_value = ("Sample Quiz", questions())
+        session = self.engine.start(self.user, "Sample Quiz")
+        self.engine.next_question(session.session_id)
+        self.engine.submit_answer(session.session_id, [0])
+        with self.assertRaises(QuizNotFoundException):
+            self.engine.next_question(session.session_id)
+        self.assertEqual(len(self.engine), 0)
+        self.result_service.save_result.assert_not_called()
+
+    def test_concurrent_sessions_are_independent(self):
+        self.quiz_service.iter_quiz_questions.side_effect = lambda title: ("Sample Quiz", iter(self.questions))
+        sessions = [self.engine.start(self.user, "Sample Quiz") for _ in range(100)]
+        self.assertEqual(len({session.session_id for session in sessions}), 100)
+        for i, session in enumerate(sessions):
+            self.engine.next_question(session.session_id)
+            self.engine.submit_answer(session.session_id, [i % 2])
+        self.assertEqual(sum(session.score for session in sessions), 50)
+
+    def test_expire(self):
+        session = self.engine.start(self.user, "Sample Quiz")
+        self.assertEqual(self.engine.expire(3600), 0)
+        session.last_active -= 7200
+        self.assertEqual(self.engine.expire(3600), 1)
+        self.assertEqual(len(self.engine), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,239 @@
+import unittest
+import os
+import tempfile
+import threading
+from datetime import date
+from unittest.mock import MagicMock
+from models import User, Admin, Quiz, Question, Result
+from services import ResultService
+from sqlite_repositories import (SqliteUserRepository, SqliteAdminRepository, SqliteQuizRepository,
+                                 SqliteResultRepository, import_json)
+from custom_exceptions import UserAlreadyExistsException
+
+
+class SqliteTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.tmpdir.name, "test.db")
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+
+class TestSqliteUserRepository(SqliteTestCase):
+    def setUp(self):
+        super().setUp()
+        self.user_repo = SqliteUserRepository(self.db_path)
+        self.user = User("testuser", "password", date(2000, 1, 1))
+
+    def test_load_empty(self):
+        self.assertEqual(self.user_repo.load(), [])
+
+    def test_save_and_load(self):
+        self.user_repo.save(self.user)
+        users = self.user_repo.load()
+        self.assertEqual(len(users), 1)
+        self.assertEqual(users[0].to_dict(), self.user.to_dict())
+
+    def test_save_duplicate_login(self):
+        self.user_repo.save(self.user)
+        with self.assertRaises(UserAlreadyExistsException):
+            self.user_repo.save(User("TestUser", "other", date(2001, 1, 1)))
+        self.assertEqual(len(self.user_repo.load()), 1)
+
+    def test_save_all(self):
+        self.user_repo.save(self.user)
+        updated = User("testuser", "newpassword", date(2000, 1, 1))
+        self.user_repo.save_all([updated, User("other", "secret", date(1999, 1, 1))])
+        users = self.user_repo.load()
+        self.assertEqual([u.login for u in users], ["testuser", "other"])
+        self.assertEqual(users[0].password, "newpassword")
+
+    def test_update(self):
+        self.user_repo.save(self.user)
+        self.user_repo.save(User("other", "secret", date(1999, 1, 1)))
+        self.user_repo.update(User("TESTUSER", "newpassword", date(2000, 1, 1)))
+        users = self.user_repo.load()
+        self.assertEqual([(u.login, u.password) for u in users], [("testuser", "newpassword"), ("other", "secret")])
+
+
+class TestSqliteAdminRepository(SqliteTestCase):
+    def test_save_and_load(self):
+        admin_repo = SqliteAdminRepository(self.db_path)
+        admin_repo.save(Admin("admin", "password"))
+        admins = admin_repo.load()
+        self.assertEqual(len(admins), 1)
+        self.assertEqual(admins[0].login, "admin")
+
+
+class TestSqliteQuizRepository(SqliteTestCase):
+    def setUp(self):
+        super().setUp()
+        self.quiz_repo = SqliteQuizRepository(self.db_path, "test_quizzes")
+        self.quiz = Quiz("Test Quiz")
+        self.quiz.add_question(Question("Sample Question?", ["Option 1", "Option 2"], ["Option 1"]))
+        self.filepath = os.path.join("test_quizzes", "quiz_test quiz.json")
+
+    def test_load_quiz_not_found(self):
+        self.assertIsNone(self.quiz_repo.load("non_existent_quiz.json"))
+
+    def test_save_and_load(self):
+        self.quiz_repo.save(self.quiz, self.filepath)
+        quiz = self.quiz_repo.load(self.filepath)
+        self.assertEqual(quiz.to_dict(), self.quiz.to_dict())
+        self.assertEqual(self.quiz_repo.get_all_quiz_files(), [self.filepath])
+        self.assertEqual(self.quiz_repo.load_header(self.filepath), ("Test Quiz", 1))
+
+    def test_iter_questions(self):
+        self.quiz_repo.save(self.quiz, self.filepath)
+        self.assertEqual([q.text for q in self.quiz_repo.iter_questions(self.filepath)], ["Sample Question?"])
+
+    def test_load_questions(self):
+        self.quiz.add_question(Question("Second?", ["A", "B"], ["B"]))
+        self.quiz_repo.save(self.quiz, self.filepath)
+        questions = self.quiz_repo.load_questions(self.filepath, [1, 0, 5])
+        self.assertEqual([q.text for q in questions], ["Second?", "Sample Question?"])
+
+    def test_save_replaces_questions(self):
+        self.quiz_repo.save(self.quiz, self.filepath)
+        self.quiz.questions[0] = Question("Updated?", ["A", "B"], ["B"])
+        self.quiz_repo.save(self.quiz, self.filepath)
+        quiz = self.quiz_repo.load(self.filepath)
+        self.assertEqual(len(quiz.questions), 1)
+        self.assertEqual(quiz.questions[0].text, "Updated?")
+        self.assertEqual(len(self.quiz_repo.get_all_quiz_files()), 1)
+
+
+class TestSqliteResultRepository(SqliteTestCase):
+    def setUp(self):
+        super().setUp()
+        self.result_repo = SqliteResultRepository(self.db_path)
+        self.result_repo.save_dicts([
+            {"user": "user1", "quiz": "Python", "score": 10, "timestamp": "2024-01-01T00:00:00"},
+            {"user": "user2", "quiz": "python", "score": 15, "timestamp": "2024-01-02T00:00:00"},
+            {"user": "user1", "quiz": "IT", "score": 20, "timestamp": "2024-01-03T00:00:00"},
+            {"user": "user3", "quiz": "Python", "score": 10, "timestamp": "2024-01-04T00:00:00"},
+        ])
+
+    def test_save_and_iter_results(self):
+        user = User("user4", "password", date(2000, 1, 1))
+        self.result_repo.save(Result(user, Quiz("IT"), 5))
+        results = list(self.result_repo.iter_results())
+        self.assertEqual(len(results), 5)
+        self.assertEqual(results[-1]["user"], "user4")
+
+    def test_save_from_another_thread(self):
+        # the background result writer saves on its own thread
+        user = User("user4", "password", date(2000, 1, 1))
+        thread = threading.Thread(target=self.result_repo.save, args=(Result(user, Quiz("IT"), 5),))
+        thread.start()
+        thread.join()
+        self.assertEqual(len(list(self.result_repo.iter_results())), 5)
+
+    def test_save_many(self):
+        self.result_repo.save_many([{"user": "user4", "quiz": "IT", "score": 5, "timestamp": "2024-01-05T00:00:00"},
+                                    {"user": "user5", "quiz": "IT", "score": 6, "timestamp": "2024-01-06T00:00:00"}],
+                                   self.db_path, fsync=True)
+        self.assertEqual([r["user"] for r in self.result_repo.iter_results()][-2:], ["user4", "user5"])
+
+    def test_top_results(self):
+        top = self.result_repo.top_results("PYTHON", 2)
+        self.assertEqual([(r["user"], r["score"]) for r in top], [("user2", 15), ("user1", 10)])
+
+    def test_total_top_results(self):
+        top = self.result_repo.total_top_results(10)
+        self.assertEqual([r["score"] for r in top], [20, 15, 10, 10])
+
+    def test_windowed_top_results(self):
+        top = self.result_repo.top_results("Python", 10, window='day', at="2024-01-02T18:00:00")
+        self.assertEqual([r["user"] for r in top], ["user2"])
+        top = self.result_repo.total_top_results(10, window='week', at="2024-01-03T00:00:00")
+        self.assertEqual([r["score"] for r in top], [20, 15, 10, 10])
+        between = self.result_repo.top_results_between("python", 10, "2024-01-02", "2024-01-05")
+        self.assertEqual([r["user"] for r in between], ["user2", "user3"])
+
+    def test_best_score_view(self):
+        self.result_repo.save_dicts([{"user": "user2", "quiz": "Python", "score": 12, "timestamp": "2024-01-05T00:00:00"},
+                                     {"user": "user1", "quiz": "PYTHON", "score": 40, "timestamp": "2024-01-06T00:00:00"}])
+        top = self.result_repo.distinct_top_results("python", 10)
+        self.assertEqual([(r["user"], r["score"]) for r in top], [("user1", 40), ("user2", 15), ("user3", 10)])
+        top = self.result_repo.distinct_total_top_results(10)
+        self.assertEqual([(r["user"], r["score"]) for r in top], [("user1", 40), ("user2", 15), ("user3", 10)])
+        self.assertEqual([(r["quiz"], r["score"]) for r in self.result_repo.user_best_results("user1")],
+                         [("PYTHON", 40), ("IT", 20)])
+
+    def test_best_score_view_is_backfilled(self):
+        # a database from before the view: no best scores and schema version 0
+        self.result_repo.connection.execute("DELETE FROM best_scores")
+        self.result_repo.connection.execute("PRAGMA user_version = 0")
+        self.result_repo.connection.commit()
+        reopened = SqliteResultRepository(self.db_path)
+        top = reopened.distinct_top_results("Python", 10)
+        self.assertEqual([(r["user"], r["score"]) for r in top], [("user2", 15), ("user1", 10), ("user3", 10)])
+
+    def test_backfill_runs_once(self):
+        self.result_repo.connection.execute("DELETE FROM best_scores")
+        self.result_repo.connection.commit()
+        reopened = SqliteResultRepository(self.db_path)
+        self.assertEqual(reopened.distinct_top_results("Python", 10), [])
+
+    def test_score_distribution(self):
+        distribution = self.result_repo.score_distribution("python")
+        self.assertEqual(distribution["total"], 3)
+        self.assertEqual(distribution["median"], 10)
+        self.assertEqual(distribution["histogram"][10], 2)
+        self.assertEqual(self.result_repo.score_distribution("Unknown")["total"], 0)
+
+    def test_user_results(self):
+        results = self.result_repo.user_results("user1")
+        self.assertEqual([r["quiz"] for r in results], ["IT", "Python"])
+        self.assertEqual([r["quiz"] for r in self.result_repo.user_results("user1", sort='timestamp', limit=1)],
+                         ["IT"])
+        self.assertEqual([r["quiz"] for r in self.result_repo.user_results("user1", offset=1)], ["Python"])
+        self.assertEqual(self.result_repo.user_result_count("user1"), 2)
+        with self.assertRaises(ValueError):
+            self.result_repo.user_results("user1", sort='quiz')
+
+    def test_rank_and_percentile(self):
+        self.assertEqual(self.result_repo.count_results("Python"), 3)
+        self.assertEqual(self.result_repo.rank("Python", 10), 2)
+        self.assertAlmostEqual(self.result_repo.percentile("Python", 15), 200 / 3)
+        self.assertEqual(self.result_repo.percentile("Unknown", 15), 0.0)
+
+    def test_result_service_pushes_queries_down(self):
+        result_service = ResultService(self.result_repo, self.db_path)
+        self.assertTrue(result_service.pushdown)
+        user = User("user4", "password", date(2000, 1, 1))
+        result_service.save_result(Result(user, Quiz("Python"), 30))
+        self.assertEqual(result_service.get_top_results("Python")[0]["user"], "user4")
+        self.assertEqual(result_service.get_rank("Python", 15), 2)
+        self.assertEqual(len(result_service.get_user_results(user, [])), 1)
+
+
+class TestImportJson(SqliteTestCase):
+    def test_import_json(self):
+        user_repo = MagicMock()
+        user_repo.load.return_value = [User("user1", "123", date(1970, 1, 1))]
+        admin_repo = MagicMock()
+        admin_repo.load.return_value = [Admin("admin", "password")]
+        quiz = Quiz("Test Quiz")
+        quiz.add_question(Question("Sample Question?", ["Option 1", "Option 2"], ["Option 1"]))
+        quiz_repo = MagicMock()
+        quiz_repo.quizzes_dir = "test_quizzes"
+        quiz_repo.get_all_quiz_files.return_value = ["test_quizzes/quiz_test.json"]
+        quiz_repo.load.return_value = quiz
+        result_repo = MagicMock()
+        result_repo.iter_results.return_value = [{"user": "user1", "quiz": "Test Quiz", "score": 1, "timestamp": ""}]
+
+        for _ in range(2):
+            import_json(self.db_path, user_repo, admin_repo, quiz_repo, result_repo, "results.json")
+
+        self.assertEqual(len(SqliteUserRepository(self.db_path).load()), 1)
+        self.assertEqual(len(SqliteAdminRepository(self.db_path).load()), 1)
+        self.assertEqual(SqliteQuizRepository(self.db_path).load("test_quizzes/quiz_test.json").title, "Test Quiz")
+        self.assertEqual(len(SqliteResultRepository(self.db_path).load()), 1)
+        result_repo.iter_results.assert_called_with("results.json")
+
+
+if __name__ == '__main__':
+    unittest.main()